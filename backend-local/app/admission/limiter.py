@@ -0,0 +1,98 @@
+"""Per-client request budgets.
+
+Every client (IP address) has two budgets, "read" (GET/HEAD) and "write"
+(everything else), so a dashboard polling GET /seats can't use up the
+budget needed to book or check in, and a booking bot can't starve readers.
+
+  MemoryLimiter — token bucket per (budget, client) in this process. Refills
+                  continuously at `rate` per second up to `burst`. Buckets
+                  are kept in LRU order and the least recently seen are
+                  dropped past `max_clients`.
+  MongoLimiter  — fixed window counter per (budget, client) in the
+                  rate_limits collection, one atomic $inc per request, so
+                  all workers behind a load balancer share one budget.
+                  Windows expire through a TTL index. If Mongo is
+                  unreachable the request is let through.
+
+Both return the number of seconds the client should wait (0 = allowed).
+"""
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float   # requests per second, sustained
+    burst: int    # requests allowed back to back
+
+
+class MemoryLimiter:
+    def __init__(self, budgets: dict[str, Budget], max_clients: int = 100_000):
+        self.budgets = budgets
+        self.max_clients = max_clients
+        # (budget, client) -> [tokens, last refill (monotonic)]
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def check(self, budget: str, client: str) -> float:
+        spec = self.budgets[budget]
+        now = time.monotonic()
+        key = (budget, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(spec.burst), now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(spec.burst, bucket[0] + (now - bucket[1]) * spec.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / spec.rate
+
+
+class MongoLimiter:
+    def __init__(self, budgets: dict[str, Budget], window_seconds: int = 10):
+        self.budgets = budgets
+        self.window_seconds = window_seconds
+
+    def __len__(self) -> int:
+        return 0  # state lives in Mongo
+
+    async def check(self, budget: str, client: str) -> float:
+        from app.models.ratelimit import RateLimitWindowDocument
+
+        spec = self.budgets[budget]
+        now = time.time()
+        window = int(now // self.window_seconds) * self.window_seconds
+        # Same long-run rate as the token bucket; the burst rides on top.
+        limit = spec.burst + math.ceil(spec.rate * self.window_seconds)
+        try:
+            doc = await RateLimitWindowDocument.get_motor_collection().find_one_and_update(
+                {"_id": f"{budget}:{client}:{window}"},
+                {
+                    "$inc": {"hits": 1},
+                    "$setOnInsert": {
+                        "expires_at": datetime.fromtimestamp(window, timezone.utc)
+                        + timedelta(seconds=2 * self.window_seconds)
+                    },
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                projection={"hits": 1},
+            )
+        except Exception as e:
+            print(f"[RateLimit] Shared limiter unavailable, allowing request: {e}")
+            return 0.0
+        if doc["hits"] <= limit:
+            return 0.0
+        return window + self.window_seconds - now
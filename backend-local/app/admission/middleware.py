@@ -0,0 +1,130 @@
+"""Admission control in front of every route.
+
+In order, for each HTTP request:
+
+  1. Load shedding — if the event loop is already lagging by more than
+     SHED_MAX_LOOP_LAG_MS, or SHED_MAX_IN_FLIGHT requests are being
+     served, answer 503 straight away. Rejecting early is what keeps
+     latency bounded for requests that are admitted.
+  2. Rate limiting — the client's read or write budget (see limiter.py);
+     429 with Retry-After when it is used up.
+
+Probes and metrics (/health, /ready, /metrics) always pass, so an
+overloaded instance still reports why. While the instance drains for a
+restart (app/lifecycle.py) responses carry `Connection: close`, so
+keep-alive clients reconnect through the load balancer; once it is
+stopping, new requests get 503 whatever the settings. The long-lived GET /events streams
+are rate limited on connect but not counted as in flight.
+
+Written as a plain ASGI middleware: no per-request Request object, and
+streaming responses pass through untouched.
+"""
+import math
+
+from app import lifecycle, metrics, readiness
+from app.admission.limiter import Budget, MemoryLimiter, MongoLimiter
+from app.admission.shedding import loop_lag_ms
+from app.config import get_settings
+from app.responses import api_response
+
+EXEMPT_PATHS = {"/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json"}
+STREAMING_PATHS = {"/events"}
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        self._configured = False
+        metrics.register_gauge("http_in_flight", lambda: self.in_flight)
+        metrics.register_gauge("loop_lag_ms", lambda: round(loop_lag_ms(), 2))
+
+    def _configure(self) -> None:
+        # Settings are read on the first request, not at import/app creation.
+        settings = get_settings()
+        self.enabled = settings.admission_enabled
+        self.max_in_flight = settings.shed_max_in_flight
+        self.max_loop_lag_ms = settings.shed_max_loop_lag_ms
+        self.trust_forwarded_for = settings.rate_limit_trust_forwarded_for
+        self._warned_forwarded = False
+        budgets = {
+            "read": Budget(settings.rate_limit_read_per_second, settings.rate_limit_read_burst),
+            "write": Budget(settings.rate_limit_write_per_second, settings.rate_limit_write_burst),
+        }
+        if settings.rate_limit_backend == "mongo":
+            self.limiter = MongoLimiter(budgets, settings.rate_limit_window_seconds)
+        else:
+            self.limiter = MemoryLimiter(budgets)
+        metrics.register_gauge("rate_limit_clients", lambda: len(self.limiter))
+        self._configured = True
+
+    def _client(self, scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                if self.trust_forwarded_for:
+                    # The last hop is the one our proxy appended; earlier ones
+                    # are whatever the client chose to send.
+                    return value.decode("latin-1").split(",")[-1].strip()
+                if not self._warned_forwarded:
+                    self._warned_forwarded = True
+                    print(
+                        "[Admission] Requests carry X-Forwarded-For but "
+                        "RATE_LIMIT_TRUST_FORWARDED_FOR is off: everyone behind the proxy shares one budget"
+                    )
+                break
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if not self._configured:
+            self._configure()
+        path = scope["path"]
+        if readiness.is_draining():
+            if lifecycle.is_stopping() and path not in EXEMPT_PATHS:
+                metrics.inc("shed_stopping")
+                return await _reject(503, "Server is restarting, please retry", 1, scope, receive, send)
+            send = _closing(send)
+        if not self.enabled or path in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        streaming = path in STREAMING_PATHS
+        if not streaming:
+            if self.in_flight >= self.max_in_flight:
+                metrics.inc("shed_in_flight")
+                return await _reject(503, "Server busy, please retry", 1, scope, receive, send)
+            if loop_lag_ms() > self.max_loop_lag_ms:
+                metrics.inc("shed_loop_lag")
+                return await _reject(503, "Server busy, please retry", 1, scope, receive, send)
+
+        budget = "read" if scope["method"] in READ_METHODS else "write"
+        wait = await self.limiter.check(budget, self._client(scope))
+        if wait > 0:
+            metrics.inc(f"rate_limited_{budget}")
+            return await _reject(429, "Too many requests", wait, scope, receive, send)
+
+        metrics.inc(f"admitted_{budget}")
+        if streaming:
+            return await self.app(scope, receive, send)
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def _closing(send):
+    """`send` that adds Connection: close to the response."""
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (b"connection", b"close")]}
+        await send(message)
+    return wrapped
+
+
+async def _reject(status_code: int, message: str, retry_after: float, scope, receive, send) -> None:
+    response = api_response(False, message, status_code=status_code)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    await response(scope, receive, send)
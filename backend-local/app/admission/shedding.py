@@ -0,0 +1,43 @@
+"""Event-loop lag monitor used for load shedding.
+
+A background task asks to be woken every INTERVAL seconds and records how
+late it actually woke up. With one event loop serving every request, that
+delay is how long any request currently waits just to be scheduled. It is
+kept as a moving average so one slow garbage collection doesn't trip
+shedding.
+"""
+import asyncio
+import time
+
+INTERVAL = 0.05
+SMOOTHING = 0.3  # weight of the newest sample
+
+_lag_ms = 0.0
+_task: asyncio.Task | None = None
+
+
+def loop_lag_ms() -> float:
+    return _lag_ms
+
+
+async def _monitor() -> None:
+    global _lag_ms
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(INTERVAL)
+        late_ms = max(0.0, (time.perf_counter() - started - INTERVAL) * 1000)
+        _lag_ms += SMOOTHING * (late_ms - _lag_ms)
+
+
+def start_lag_monitor() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_monitor())
+
+
+def stop_lag_monitor() -> None:
+    global _task, _lag_ms
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    _lag_ms = 0.0
@@ -0,0 +1,121 @@
+"""Best-fit seat choice for POST /bookings/auto.
+
+Letting students pick any free seat leaves "swiss-cheese" timelines: short
+gaps between bookings that nobody can use. Bookings may not touch (see
+slots_overlap), so a booking [s, e) blocks slots s..e inclusive and a gap
+of a single slot is dead. The allocator places a request on the seat where
+it fits most snugly:
+
+    1. fewest dead one-slot gaps left on either side,
+    2. then the least free time left around it (best fit),
+    3. then seat id, so the choice is deterministic.
+
+Each seat's blocked slots today are one int bitmask (bit i = slot i), kept
+in memory and updated from the seat event log's change feed. Ranking is a
+few bit operations per seat, so scoring thousands of seats is a single
+pass without touching Mongo. The index is only a hint: the chosen seat is
+re-checked against the database by the booking path, and the next
+candidate is tried if it turned out to be taken.
+"""
+import heapq
+import re
+from typing import Collection
+
+from app.allocation.recurring import slot_footprint
+from app.eventlog.seats import seat_log
+from app.models.seat import SeatDocument
+from app.utils.slots import SLOTS_PER_DAY
+
+_ZONE_PREFIX = re.compile(r"[A-Za-z]+")
+
+
+def zone_of(seat_id: str, zone: str | None = None) -> str:
+    """A seat's zone: its `zone` field, else the letters its id starts with (A3 → A)."""
+    if zone:
+        return zone
+    m = _ZONE_PREFIX.match(seat_id)
+    return m.group(0) if m else ""
+
+
+class SeatTimelines:
+    def __init__(self):
+        self._blocked: dict[str, int] = {}
+        # Seats someone is sitting at → their bookings as (start, end), sorted.
+        self._occupied: dict[str, list[tuple[int, int]]] = {}
+        self._zones: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._blocked)
+
+    async def load(self) -> None:
+        """Rebuild from the seat log's states plus each seat's zone."""
+        self._blocked.clear()
+        self._occupied.clear()
+        self._zones.clear()
+        async for d in SeatDocument.get_motor_collection().find({}, {"_id": 0, "seat_id": 1, "zone": 1}):
+            self._zones[d["seat_id"]] = zone_of(d["seat_id"], d.get("zone"))
+        for seat_id, state in seat_log.states.items():
+            self.update(seat_id, state)
+        print(f"[Allocator] Indexed {len(self._blocked)} seat timeline(s)")
+
+    def update(self, seat_id: str, state: dict) -> None:
+        bookings = sorted((b["start_slot"], b["end_slot"]) for b in state.get("today_bookings") or ())
+        mask = 0
+        for start, end in bookings:
+            mask |= slot_footprint(start, end)
+        self._blocked[seat_id] = mask
+        if state.get("physical_status") == "occupied":
+            self._occupied[seat_id] = bookings
+        else:
+            self._occupied.pop(seat_id, None)
+        if seat_id not in self._zones:
+            self._zones[seat_id] = zone_of(seat_id)
+
+    def zone(self, seat_id: str) -> str:
+        return self._zones.get(seat_id) or zone_of(seat_id)
+
+    def on_events(self, events: list[dict]) -> None:
+        """Change-feed subscriber (seat_log.subscribe)."""
+        for seat_id in dict.fromkeys(e["seat_id"] for e in events):
+            self.update(seat_id, seat_log.states[seat_id])
+
+    def rank(
+        self,
+        start_slot: int,
+        end_slot: int,
+        now_slot: int,
+        zone: str | None = None,
+        limit: int = 8,
+        exclude: Collection[str] = (),
+    ) -> list[str]:
+        """Up to `limit` seat ids that can take [start_slot, end_slot), best
+        first. Seats in `exclude` (closed ones, see allocation/blocks.py) are
+        skipped."""
+        need = slot_footprint(start_slot, end_slot)
+        past = (1 << (now_slot + 1)) - 1  # slots up to now can't be booked
+        below_mask = (1 << start_slot) - 1
+        scored = []
+        for seat_id, mask in self._blocked.items():
+            if zone is not None and self._zones[seat_id] != zone:
+                continue
+            if seat_id in exclude:
+                continue
+            occupied = self._occupied.get(seat_id)
+            if occupied is not None:
+                # Someone is sitting there: blocked until the end of the next
+                # booking that hasn't ended, else all day (as in seat_conflict).
+                blocked_end = next((end for _, end in occupied if end > now_slot), SLOTS_PER_DAY)
+                mask |= (1 << (blocked_end + 1)) - 1
+            mask |= past
+            if mask & need:
+                continue
+            # Free run around the request: up to the nearest blocked slot each side.
+            left = start_slot - (mask & below_mask).bit_length()
+            above = mask >> (end_slot + 1)
+            right = (above & -above).bit_length() - 1 if above else SLOTS_PER_DAY - end_slot
+            scored.append(((left == 1) + (right == 1), left + right, seat_id))
+        return [seat_id for _, _, seat_id in heapq.nsmallest(limit, scored)]
+
+
+seat_timelines = SeatTimelines()
+seat_log.subscribe(seat_timelines.on_events)
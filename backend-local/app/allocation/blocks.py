@@ -0,0 +1,42 @@
+"""Seat blocks: staff closing seats for a while.
+
+A block closes its seats for the slots [start_slot, end_slot) on every day
+from start_date to end_date. Nothing can be booked on a closed seat then:
+POST /bookings refuses it, POST /bookings/auto and relocation rank around
+it, and recurring occurrences on it are not materialised. Existing bookings
+are moved or cancelled when the block is created (app/allocation/displace.py).
+
+A block only has to avoid real overlap: a booking that ends as the room
+closes is unaffected, so the test is strict, not slots_overlap (whose
+touching-is-a-conflict rule is about turnover between two students).
+"""
+from datetime import date
+
+from app.models.block import SeatBlockDocument
+from app.utils.slots import slot_clock
+
+
+def block_overlaps(start_slot: int, end_slot: int, block: dict) -> bool:
+    return start_slot < block["end_slot"] and block["start_slot"] < end_slot
+
+
+async def blocks_on(day: date | None = None) -> list[dict]:
+    """Active blocks covering `day` (default today). There are only ever a
+    handful, so callers filter them in memory."""
+    iso = (day or slot_clock.today()).isoformat()
+    return await SeatBlockDocument.get_motor_collection().find(
+        {"status": "active", "start_date": {"$lte": iso}, "end_date": {"$gte": iso}}, {"_id": 0}
+    ).to_list(None)
+
+
+def closed_during(blocks: list[dict], start_slot: int, end_slot: int) -> set[str]:
+    closed: set[str] = set()
+    for block in blocks:
+        if block_overlaps(start_slot, end_slot, block):
+            closed.update(block["seat_ids"])
+    return closed
+
+
+async def closed_seats(start_slot: int, end_slot: int, day: date | None = None) -> set[str]:
+    """Seats closed at any point of [start_slot, end_slot) on `day`."""
+    return closed_during(await blocks_on(day), start_slot, end_slot)
@@ -0,0 +1,159 @@
+"""Placing and releasing single bookings, shared by the booking routes.
+
+POST /bookings (the student picked the seat) and POST /bookings/auto (the
+allocator picked it) differ only in how the seat is chosen; the checks on
+the seat, the quota, the writes and the hardware/live updates are the same
+and live here. Cancellation paths (POST /bookings/cancel, recurring skips)
+share release_booking().
+"""
+from datetime import datetime
+
+from app.allocation.claims import claim_slot, release_slot, set_seat_state
+from app.allocation.recurring import skip_occurrence
+from app.allocation.waitlist import reallocate_freed
+from app.cache.students import student_bookings
+from app.config import get_settings
+from app.eventlog.seats import seat_log, seat_state
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument, TimeSlotEmbed
+from app.mqtt.client import publish_booking_status
+from app.responses import api_response, student_booking_out
+from app.scheduler.pool import UPCOMING_LEAD
+from app.utils.ids import new_booking_id
+from app.utils.slots import slot_clock, slot_to_datetime, slots_overlap
+
+
+def seat_conflict(seat: SeatDocument, start_slot: int, end_slot: int, now_slot: int) -> bool:
+    """Whether [start_slot, end_slot) can't be booked on `seat`."""
+    for existing in seat.today_bookings:
+        if slots_overlap(start_slot, end_slot, existing.start_slot, existing.end_slot):
+            return True
+
+    # Physical occupancy: if someone is detected at the seat, block bookings from
+    # now until the end of the nearest upcoming/active booking period.
+    # If no bookings exist today, the entire rest of the day is blocked.
+    if seat.physical_status == "occupied":
+        future_bookings = sorted(
+            [b for b in seat.today_bookings if b.end_slot > now_slot],
+            key=lambda b: b.start_slot,
+        )
+        blocked_end = future_bookings[0].end_slot if future_bookings else 48
+        if slots_overlap(start_slot, end_slot, now_slot + 1, blocked_end):
+            return True
+    return False
+
+
+async def book_seat(
+    seat: SeatDocument,
+    student_id: str,
+    start_slot: int,
+    end_slot: int,
+    pin_code_hash: str,
+    now: datetime,
+):
+    """Book a seat already checked with seat_conflict(). Returns the new
+    BookingDocument, an error response if the student is at the quota, or
+    None if another request took the slot since `seat` was read."""
+    # Quota is claimed synchronously (no await between check and increment),
+    # so concurrent requests from the same student can't both slip through.
+    limit = get_settings().max_active_bookings_per_student
+    if not student_bookings.try_reserve(student_id, limit):
+        return api_response(
+            False,
+            f"Student {student_id} already has {limit} active booking(s)",
+            status_code=409,
+        )
+
+    # Claim the slot in one conditional update: of two requests that read
+    # the seat free, only one matches. The loser books nothing.
+    claimed = await claim_slot(seat.seat_id, start_slot, end_slot)
+    if claimed is None:
+        student_bookings.release(student_id)
+        return None
+
+    booking_id = new_booking_id()
+    booking = BookingDocument(
+        booking_id=booking_id,
+        seat_id=seat.seat_id,
+        student_id=student_id,
+        start_slot=start_slot,
+        end_slot=end_slot,
+        pin_code_hash=pin_code_hash,
+        created_at=now,
+        status="confirmed",
+    )
+    try:
+        await booking.insert()
+    except Exception:
+        await release_slot(seat.seat_id, start_slot, end_slot)
+        student_bookings.release(student_id)
+        raise
+    student_bookings.add(student_id, student_booking_out(booking.model_dump()))
+
+    # Continue from the seat as claimed, not as read before.
+    seat.today_bookings = [TimeSlotEmbed(**b) for b in claimed["today_bookings"]]
+    seat.status = claimed.get("status", "free")
+    seat.physical_status = claimed.get("physical_status", "free")
+
+    # next_booking_start_time = earliest future booking's start time (ISO 8601 for hardware)
+    now_slot = slot_clock.datetime_to_slot(now)
+    upcoming = [b for b in seat.today_bookings if b.start_slot > now_slot]
+    seat.next_booking_start_time = slot_to_datetime(upcoming[0].start_slot) if upcoming else None
+
+    # Transitions are driven by the per-slot boundary jobs (scheduler/pool.py);
+    # only a booking made inside the 10-minute lead has already missed its
+    # "upcoming" boundary and is marked here.
+    starts_soon = slot_to_datetime(start_slot) - UPCOMING_LEAD <= now
+    if seat.status == "free" or (starts_soon and seat.status == "reserved"):
+        seat.status = "upcoming" if starts_soon else "reserved"
+    # Only if today_bookings is still as claimed: otherwise a later booking
+    # has written status from a newer state, and the log records that one.
+    seat = await set_seat_state(seat, claimed["today_bookings"])
+    await seat_log.record(
+        seat.seat_id, "booked", seat_state(seat),
+        booking_id=booking_id, start_slot=start_slot, end_slot=end_slot,
+    )
+    if starts_soon and seat.status == "upcoming":
+        publish_booking_status(seat.seat_id, "upcoming")
+    return booking
+
+
+async def release_booking(booking: BookingDocument) -> None:
+    """Delete a booking and give its time back: seat state, waitlist, hardware."""
+    # Hard-delete the booking document
+    await booking.delete()
+    if booking.rule_id:
+        # Occurrence of a recurring booking: don't materialise it again today.
+        await skip_occurrence(booking.rule_id, slot_clock.today())
+    # Only a confirmed booking holds a slot on the seat; another with the
+    # same times may hold it now.
+    if booking.status != "confirmed":
+        return
+    student_bookings.remove(booking.student_id, booking.booking_id)
+
+    # Update the seat: remove only this slot, then recompute status and
+    # next_booking_start_time from the seat as released.
+    released = await release_slot(booking.seat_id, booking.start_slot, booking.end_slot)
+    if released:
+        seat = SeatDocument.model_validate(released)
+        now_slot = slot_clock.now_slot()
+
+        is_active = booking.start_slot <= now_slot < booking.end_slot
+        remaining_future = [b for b in seat.today_bookings if b.end_slot > now_slot]
+        remaining_upcoming = [b for b in seat.today_bookings if b.start_slot > now_slot]
+
+        seat.next_booking_start_time = (
+            slot_to_datetime(remaining_upcoming[0].start_slot) if remaining_upcoming else None
+        )
+        # Free the seat if no future bookings remain, or if this was the currently-active booking
+        if not remaining_future or (is_active and seat.status in ("awaiting_checkin", "occupied")):
+            seat.status = "free"
+        seat = await set_seat_state(seat, released["today_bookings"])
+        await seat_log.record(
+            seat.seat_id, "cancelled", seat_state(seat),
+            booking_id=booking.booking_id, start_slot=booking.start_slot, end_slot=booking.end_slot,
+        )
+
+        # Offer the freed time to the waitlist before telling the hardware.
+        reassigned = await reallocate_freed([(seat.seat_id, booking.start_slot, booking.end_slot)])
+        publish_booking_status(booking.seat_id, reassigned.get(seat.seat_id, seat.status))
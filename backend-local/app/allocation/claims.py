@@ -0,0 +1,59 @@
+"""Conditional writes to a seat's today_bookings, shared by every path that
+adds or removes a slot (bookings, waitlist, recurring, displacement).
+
+Each one changes only its own slot: a $push that matches only if nothing
+already on the seat overlaps it, or a $pull of exactly that slot. Writing
+the whole array back from an earlier read would erase slots claimed by
+other requests in between.
+"""
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from app.models.seat import SeatDocument
+
+
+def overlap_free_filter(seat_id: str, start_slot: int, end_slot: int) -> dict:
+    """Matches the seat only if no entry of today_bookings overlaps (or
+    touches) [start_slot, end_slot), the same test as slots_overlap."""
+    return {
+        "seat_id": seat_id,
+        "today_bookings": {"$not": {"$elemMatch": {
+            "start_slot": {"$lte": end_slot},
+            "end_slot": {"$gte": start_slot},
+        }}},
+    }
+
+
+async def claim_slot(seat_id: str, start_slot: int, end_slot: int) -> Optional[dict]:
+    """Add [start_slot, end_slot) to the seat if it is still free. Returns
+    the seat document as claimed, or None if another write took the slot."""
+    slot = {"start_slot": start_slot, "end_slot": end_slot}
+    return await SeatDocument.get_motor_collection().find_one_and_update(
+        overlap_free_filter(seat_id, start_slot, end_slot),
+        {"$push": {"today_bookings": {"$each": [slot], "$sort": {"start_slot": 1}}}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def release_slot(seat_id: str, start_slot: int, end_slot: int) -> Optional[dict]:
+    """Remove [start_slot, end_slot) from the seat. Returns the seat document
+    as released, or None if the seat doesn't exist."""
+    return await SeatDocument.get_motor_collection().find_one_and_update(
+        {"seat_id": seat_id},
+        {"$pull": {"today_bookings": {"start_slot": start_slot, "end_slot": end_slot}}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def set_seat_state(seat: SeatDocument, claimed: list[dict]) -> SeatDocument:
+    """Write seat.status and seat.next_booking_start_time, computed from the
+    `claimed` today_bookings, only if the array is still as claimed. If not,
+    a later write has set them from a newer state: returns that seat, re-read."""
+    result = await SeatDocument.get_motor_collection().update_one(
+        {"seat_id": seat.seat_id, "today_bookings": claimed},
+        {"$set": {"status": seat.status, "next_booking_start_time": seat.next_booking_start_time}},
+    )
+    if result.matched_count == 0:
+        return await SeatDocument.find_one(SeatDocument.seat_id == seat.seat_id) or seat
+    return seat
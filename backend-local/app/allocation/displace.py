@@ -0,0 +1,197 @@
+"""Cancelling or moving many bookings at once, when staff close seats.
+
+Cancelling a room's bookings with POST /bookings/cancel costs a delete, a
+seat read and save, a seat event and an MQTT publish per booking. A
+displacement reads the affected bookings and their seats once, writes the
+bookings in one bulk_write, appends all seat events at once and sends one
+batch of MQTT publishes and one live update per student. Seats are written
+slot by slot ($push / $pull, allocation/claims.py) so that bookings made
+on them meanwhile are kept, then their status once per seat.
+
+Relocation keeps the booking (id, PIN, times) and moves it to another seat,
+chosen like POST /bookings/auto chooses (allocation/autoassign.py): best
+fit, same zone first, never a closed seat, and never on top of another
+booking moved in the same batch (slots_overlap). Each target is re-checked
+against its document and its slot claimed conditionally before the
+booking moves. Bookings that have already started, or for which no seat
+is (still) free, are cancelled instead.
+
+There are no per-booking scheduler jobs to clean up: slot boundaries read
+the bookings collection (scheduler/pool.py), so a cancelled booking simply
+stops being seen, and a moved one is seen on its new seat. Cancelled
+bookings are kept with status "cancelled" rather than deleted, so a
+recurring occurrence is not materialised again the same day.
+"""
+from typing import Collection
+
+from pymongo import UpdateMany, UpdateOne
+
+from app import push
+from app.allocation.autoassign import seat_timelines
+from app.allocation.blocks import blocks_on, closed_during
+from app.allocation.booking import seat_conflict
+from app.allocation.claims import claim_slot, release_slot, set_seat_state
+from app.cache.students import student_bookings
+from app.eventlog.seats import seat_log, seat_state
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument
+from app.mqtt.client import publish_booking_statuses
+from app.responses import student_booking_out
+from app.scheduler.pool import UPCOMING_LEAD
+from app.utils.slots import slot_clock, slot_to_datetime, slots_overlap
+
+
+def _choose_seats(affected: list[dict], closed: set[str], now_slot: int, blocks: list[dict]) -> dict[str, str]:
+    """booking_id → new seat for each booking that has somewhere to go."""
+    moves: dict[str, str] = {}
+    planned: dict[str, list[tuple[int, int]]] = {}
+    for booking in affected:
+        start, end = booking["start_slot"], booking["end_slot"]
+        if start <= now_slot:
+            continue
+        exclude = closed | closed_during(blocks, start, end)
+        # The index doesn't know about this batch's placements yet: ask for
+        # enough candidates that those can be skipped.
+        limit = 8 + len(planned)
+        for zone in (seat_timelines.zone(booking["seat_id"]), None):
+            choice = next(
+                (
+                    seat_id
+                    for seat_id in seat_timelines.rank(start, end, now_slot, zone, limit, exclude)
+                    if not any(slots_overlap(start, end, s, e) for s, e in planned.get(seat_id, ()))
+                ),
+                None,
+            )
+            if choice is not None:
+                moves[booking["booking_id"]] = choice
+                planned.setdefault(choice, []).append((start, end))
+                break
+    return moves
+
+
+async def _write_seat_state(doc: dict, now_slot: int, freed_active: bool = False) -> SeatDocument:
+    """Recompute status and next_booking_start_time after today_bookings
+    changed, as release_booking() and book_seat() do for one booking, and
+    write them (see set_seat_state)."""
+    seat = SeatDocument.model_validate(doc)
+    upcoming = [b for b in seat.today_bookings if b.start_slot > now_slot]
+    seat.next_booking_start_time = slot_to_datetime(upcoming[0].start_slot) if upcoming else None
+    remaining = [b for b in seat.today_bookings if b.end_slot > now_slot]
+    if not remaining or (freed_active and seat.status in ("awaiting_checkin", "occupied")):
+        seat.status = "free"
+    elif upcoming and seat.status in ("free", "reserved"):
+        starts_soon = seat.next_booking_start_time - UPCOMING_LEAD <= slot_clock.now()
+        if seat.status == "free" or starts_soon:
+            seat.status = "upcoming" if starts_soon else "reserved"
+    return await set_seat_state(seat, doc["today_bookings"])
+
+
+async def displace_bookings(
+    seat_ids: Collection[str], start_slot: int, end_slot: int, relocate: bool, reason: str = ""
+) -> dict[str, list[dict]]:
+    """Cancel, or move elsewhere, every confirmed booking on `seat_ids` that
+    overlaps [start_slot, end_slot) today and hasn't ended. The seats count
+    as closed for the whole window, whether or not a block says so.
+
+    Returns {"moved": [...], "cancelled": [...]}, bookings in the
+    StudentBookingOut shape plus studentId (and fromSeatId when moved)."""
+    now_slot = slot_clock.now_slot()
+    bookings = BookingDocument.get_motor_collection()
+    affected = await bookings.find(
+        {
+            "seat_id": {"$in": list(seat_ids)},
+            "status": "confirmed",
+            "start_slot": {"$lt": end_slot},
+            "end_slot": {"$gt": max(start_slot, now_slot)},
+        },
+        {"_id": 0},
+    ).sort("start_slot", 1).to_list(None)
+    if not affected:
+        return {"moved": [], "cancelled": []}
+
+    moves = _choose_seats(affected, set(seat_ids), now_slot, await blocks_on()) if relocate else {}
+    seats = {
+        seat.seat_id: seat
+        for seat in await SeatDocument.find(
+            {"seat_id": {"$in": list({b["seat_id"] for b in affected} | set(moves.values()))}}
+        ).to_list()
+    }
+    # Re-check each target against its document, then claim the slot on it
+    # conditionally: a move whose slot was taken since becomes a cancellation.
+    claimed: dict[str, dict] = {}  # target seat_id -> document after its last claim
+    for booking in affected:
+        target = seats.get(moves.get(booking["booking_id"], ""))
+        if target is None:
+            moves.pop(booking["booking_id"], None)
+            continue
+        if seat_conflict(target, booking["start_slot"], booking["end_slot"], now_slot):
+            del moves[booking["booking_id"]]
+            continue
+        doc = await claim_slot(target.seat_id, booking["start_slot"], booking["end_slot"])
+        if doc is None:
+            del moves[booking["booking_id"]]
+            continue
+        claimed[target.seat_id] = doc
+
+    booking_ops = [UpdateOne({"booking_id": b_id}, {"$set": {"seat_id": seat_id}}) for b_id, seat_id in moves.items()]
+    cancelled_ids = [b["booking_id"] for b in affected if b["booking_id"] not in moves]
+    if cancelled_ids:
+        booking_ops.append(UpdateMany(
+            {"booking_id": {"$in": cancelled_ids}, "status": "confirmed"}, {"$set": {"status": "cancelled"}}
+        ))
+    await bookings.bulk_write(booking_ops, ordered=False)
+
+    # Seats: the closed ones lose their bookings ($pull), the targets have
+    # gained them above. Status is recomputed from each seat as last written.
+    by_source: dict[str, list[dict]] = {}
+    for booking in affected:
+        by_source.setdefault(booking["seat_id"], []).append(booking)
+    before = {seat_id: seat.status for seat_id, seat in seats.items()}
+    seat_events = []
+    for seat_id, gone in by_source.items():
+        doc = None
+        for b in gone:
+            doc = await release_slot(seat_id, b["start_slot"], b["end_slot"])
+        if doc is None:
+            continue
+        freed_active = any(b["start_slot"] <= now_slot < b["end_slot"] for b in gone)
+        seat = await _write_seat_state(doc, now_slot, freed_active)
+        seats[seat_id] = seat
+        seat_events.append(seat_log.event(
+            seat_id, "cancelled", seat_state(seat), booking_ids=[b["booking_id"] for b in gone], source="admin",
+        ))
+    arrivals: dict[str, list[str]] = {}
+    for booking_id, seat_id in moves.items():
+        arrivals.setdefault(seat_id, []).append(booking_id)
+    for seat_id, booking_ids in arrivals.items():
+        seat = await _write_seat_state(claimed[seat_id], now_slot)
+        seats[seat_id] = seat
+        seat_events.append(seat_log.event(seat_id, "booked", seat_state(seat), booking_ids=booking_ids, source="admin"))
+    await seat_log.append(seat_events)
+
+    moved, cancelled = [], []
+    per_student: dict[str, dict[str, list[dict]]] = {}
+    for booking in affected:
+        student_id = booking["student_id"]
+        new_seat = moves.get(booking["booking_id"])
+        if new_seat is not None:
+            out = student_booking_out({**booking, "seat_id": new_seat})
+            student_bookings.replace(student_id, out)
+            out = {**out, "studentId": student_id, "fromSeatId": booking["seat_id"]}
+            moved.append(out)
+            per_student.setdefault(student_id, {"moved": [], "cancelled": []})["moved"].append(out)
+        else:
+            student_bookings.remove(student_id, booking["booking_id"])
+            out = {**student_booking_out({**booking, "status": "cancelled"}), "studentId": student_id}
+            cancelled.append(out)
+            per_student.setdefault(student_id, {"moved": [], "cancelled": []})["cancelled"].append(out)
+    for student_id, changed in per_student.items():
+        push.publish({"type": "bookings_displaced", "studentId": student_id, "reason": reason, **changed})
+    publish_booking_statuses(
+        (seat_id, seat.status) for seat_id, seat in seats.items() if seat.status != before[seat_id]
+    )
+    print(
+        f"[Admin] Displaced {len(affected)} booking(s) from {len(by_source)} seat(s): "
+        f"{len(moved)} moved, {len(cancelled)} cancelled"
+    )
+    return {"moved": moved, "cancelled": cancelled}
@@ -0,0 +1,256 @@
+"""Recurring bookings: one weekly rule, materialised a day at a time.
+
+A rule ("every Tuesday and Thursday, 14:00–16:00, until the end of term")
+is stored once as a RecurringBookingDocument. Nothing is expanded up front:
+the slot grid, today_bookings and the boundary jobs only ever describe the
+current day, so each occurrence becomes an ordinary BookingDocument on its
+own day, when the scheduler rolls over to it (materialize_day). From then on
+the slot-boundary engine, check-in and cancellation treat it like any other
+booking.
+
+Conflicts between rules are bit tests. A rule has a 7-bit weekday mask and a
+49-bit slot footprint (slots start..end inclusive, so bookings that merely
+touch also collide, as in slots_overlap). Two rules on a seat clash iff both
+masks intersect and their date ranges share a day on a common weekday.
+
+Skipping one occurrence adds its date to `exceptions`; cancelling the series
+flips `status`. Both are single-document writes, whatever the series length.
+Occurrence booking ids are derived from (rule, date), so materialising the
+same day twice (restart, two instances) inserts nothing new.
+"""
+from datetime import date, timedelta
+from typing import Iterable
+
+from pymongo.errors import BulkWriteError
+
+from app import push
+from app.allocation.blocks import blocks_on, closed_during
+from app.allocation.claims import claim_slot, set_seat_state
+from app.cache.students import student_bookings
+from app.config import get_settings
+from app.eventlog.seats import seat_log, seat_state
+from app.models.booking import BookingDocument
+from app.models.recurring import RecurringBookingDocument
+from app.models.seat import SeatDocument
+from app.mqtt.client import publish_booking_statuses
+from app.responses import student_booking_out
+from app.scheduler.pool import UPCOMING_LEAD
+from app.utils.slots import slot_clock, slots_overlap
+
+ALL_WEEKDAYS = 0b111_1111
+
+
+def weekday_mask(weekdays: Iterable[int]) -> int:
+    """0 = Monday … 6 = Sunday, as date.weekday()."""
+    mask = 0
+    for d in weekdays:
+        mask |= 1 << d
+    return mask
+
+
+def slot_footprint(start_slot: int, end_slot: int) -> int:
+    return ((1 << (end_slot - start_slot + 1)) - 1) << start_slot
+
+
+def occurrence_id(rule_id: str, day: date) -> str:
+    return f"{rule_id}-{day:%Y%m%d}"
+
+
+def occurs_on(rule: dict, day: date) -> bool:
+    iso = day.isoformat()
+    return (
+        rule["start_date"] <= iso <= rule["end_date"]
+        and rule["weekdays"] >> day.weekday() & 1
+        and iso not in rule.get("exceptions", ())
+    )
+
+
+def shared_weekdays(start: str, end: str) -> int:
+    """Weekdays that occur in [start, end]; a range of a week or more has all."""
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    if (last - first).days >= 6:
+        return ALL_WEEKDAYS
+    return weekday_mask((first + timedelta(days=i)).weekday() for i in range((last - first).days + 1))
+
+
+def rules_conflict(a: dict, b: dict) -> bool:
+    if not (a["footprint"] & b["footprint"] and a["weekdays"] & b["weekdays"]):
+        return False
+    start, end = max(a["start_date"], b["start_date"]), min(a["end_date"], b["end_date"])
+    return start <= end and bool(a["weekdays"] & b["weekdays"] & shared_weekdays(start, end))
+
+
+async def find_conflict(rule: dict) -> dict | None:
+    """An active rule on the same seat that would clash with `rule`."""
+    candidates = RecurringBookingDocument.get_motor_collection().find(
+        {
+            "seat_id": rule["seat_id"],
+            "status": "active",
+            "start_date": {"$lte": rule["end_date"]},
+            "end_date": {"$gte": rule["start_date"]},
+        },
+        {"_id": 0, "rule_id": 1, "weekdays": 1, "footprint": 1, "start_date": 1, "end_date": 1},
+    )
+    async for other in candidates:
+        if rules_conflict(rule, other):
+            return other
+    return None
+
+
+async def skip_occurrence(rule_id: str, day: date) -> None:
+    await RecurringBookingDocument.get_motor_collection().update_one(
+        {"rule_id": rule_id}, {"$addToSet": {"exceptions": day.isoformat()}}
+    )
+
+
+def _skipped(rule: dict, day: date, reason: str, detail: str) -> None:
+    """Tell the student an occurrence was not booked today, and why."""
+    print(f"[Recurring] {occurrence_id(rule['rule_id'], day)}: {detail}, skipped")
+    push.publish({
+        "type": "recurring_skipped",
+        "studentId": rule["student_id"],
+        "ruleId": rule["rule_id"],
+        "date": day.isoformat(),
+        "reason": reason,
+    })
+
+
+async def materialize_day(day: date | None = None, rules: list[dict] | None = None) -> int:
+    """Turn the given rules' (default: every active rule's) occurrences on
+    `day` into bookings. `day` is the current day (the scheduler passes the
+    day it just rolled over to): seats' today_bookings must describe it.
+    Occurrences that already exist, have already started, collide with a
+    booking made by hand, fall on a closed seat or would exceed the student's
+    booking limit are skipped; the last three get a recurring_skipped event.
+    Returns the number of bookings created."""
+    day = day or slot_clock.today()
+    iso = day.isoformat()
+    if rules is None:
+        rules = await RecurringBookingDocument.get_motor_collection().find(
+            {"status": "active", "start_date": {"$lte": iso}, "end_date": {"$gte": iso}},
+            {"_id": 0},
+        ).to_list(None)
+    rules = [r for r in rules if occurs_on(r, day)]
+    if not rules:
+        return 0
+
+    now = slot_clock.now()
+    now_slot = slot_clock.datetime_to_slot(now) if day == slot_clock.today() else -1
+    ids = {r["rule_id"]: occurrence_id(r["rule_id"], day) for r in rules}
+    bookings = BookingDocument.get_motor_collection()
+    existing = {
+        d["booking_id"]
+        async for d in bookings.find({"booking_id": {"$in": list(ids.values())}}, {"_id": 0, "booking_id": 1})
+    }
+    seats = SeatDocument.get_motor_collection()
+    seat_docs = {
+        d["seat_id"]: d
+        async for d in seats.find(
+            {"seat_id": {"$in": list({r["seat_id"] for r in rules})}},
+            {"_id": 0, "seat_id": 1, "status": 1, "today_bookings": 1},
+        )
+    }
+
+    blocks = await blocks_on(day)
+    limit = get_settings().max_active_bookings_per_student
+    placed: dict[str, list[dict]] = {}
+    for rule in sorted(rules, key=lambda r: r["created_at"]):
+        booking_id = ids[rule["rule_id"]]
+        seat = seat_docs.get(rule["seat_id"])
+        if booking_id in existing or seat is None or rule["start_slot"] <= now_slot:
+            continue
+        taken = seat.get("today_bookings", []) + placed.get(rule["seat_id"], [])
+        if any(slots_overlap(rule["start_slot"], rule["end_slot"], b["start_slot"], b["end_slot"]) for b in taken):
+            _skipped(rule, day, "seat_booked", f"seat {rule['seat_id']} already booked then")
+            continue
+        if rule["seat_id"] in closed_during(blocks, rule["start_slot"], rule["end_slot"]):
+            _skipped(rule, day, "seat_closed", f"seat {rule['seat_id']} is closed then")
+            continue
+        if not student_bookings.try_reserve(rule["student_id"], limit):
+            _skipped(rule, day, "booking_limit", f"student {rule['student_id']} is at the booking limit")
+            continue
+        placed.setdefault(rule["seat_id"], []).append({
+            "booking_id": booking_id,
+            "seat_id": rule["seat_id"],
+            "student_id": rule["student_id"],
+            "start_slot": rule["start_slot"],
+            "end_slot": rule["end_slot"],
+            "pin_code_hash": rule["pin_code_hash"],
+            "created_at": now,
+            "status": "confirmed",
+            "rule_id": rule["rule_id"],
+        })
+    if not placed:
+        return 0
+
+    new_bookings = [b for seat_bookings in placed.values() for b in seat_bookings]
+    try:
+        await bookings.insert_many(new_bookings, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(err["code"] != 11000 for err in errors):
+            raise
+        # Another instance materialised these first and updated their seats.
+        clashed = {new_bookings[err["index"]]["booking_id"] for err in errors}
+        for b in new_bookings:
+            if b["booking_id"] in clashed:
+                student_bookings.release(b["student_id"])
+        new_bookings = [b for b in new_bookings if b["booking_id"] not in clashed]
+        placed = {
+            seat_id: kept
+            for seat_id, seat_bookings in placed.items()
+            if (kept := [b for b in seat_bookings if b["booking_id"] not in clashed])
+        }
+        if not placed:
+            return 0
+
+    # Claim each occurrence's slot on its seat (allocation/claims.py). A
+    # booking made by hand since the seats were read keeps the slot; the
+    # occurrence is withdrawn and skipped. Then the same seat bookkeeping as
+    # book_seat, from the seat as claimed.
+    by_rule = {r["rule_id"]: r for r in rules}
+    lost: list[dict] = []
+    seat_events, statuses = [], []
+    for seat_id, seat_bookings in placed.items():
+        latest, kept = None, []
+        for b in seat_bookings:
+            claimed = await claim_slot(seat_id, b["start_slot"], b["end_slot"])
+            if claimed is None:
+                lost.append(b)
+                continue
+            latest = claimed
+            kept.append(b)
+        if latest is None:
+            continue
+        seat = SeatDocument.model_validate(latest)
+        before = seat.status
+        upcoming = [b.start_slot for b in seat.today_bookings if b.start_slot > now_slot]
+        seat.next_booking_start_time = slot_clock.slot_to_datetime(upcoming[0], day) if upcoming else None
+        starts_soon = (
+            seat.next_booking_start_time is not None
+            and seat.next_booking_start_time - UPCOMING_LEAD <= now
+        )
+        if seat.status == "free" or (starts_soon and seat.status == "reserved"):
+            seat.status = "upcoming" if starts_soon else "reserved"
+        seat = await set_seat_state(seat, latest["today_bookings"])
+        seat_events.append(seat_log.event(
+            seat_id, "booked", seat_state(seat),
+            booking_ids=[b["booking_id"] for b in kept], source="recurring",
+        ))
+        if seat.status != before:
+            statuses.append((seat_id, seat.status))
+    if lost:
+        await bookings.delete_many({"booking_id": {"$in": [b["booking_id"] for b in lost]}})
+        for b in lost:
+            student_bookings.release(b["student_id"])
+            _skipped(by_rule[b["rule_id"]], day, "seat_booked", f"seat {b['seat_id']} already booked then")
+        new_bookings = [b for b in new_bookings if b not in lost]
+    await seat_log.append(seat_events)
+
+    for booking in new_bookings:
+        out = student_booking_out(booking)
+        student_bookings.add(booking["student_id"], out)
+        push.publish({"type": "recurring_materialized", "studentId": booking["student_id"], "booking": out})
+    publish_booking_statuses(statuses)
+    print(f"[Recurring] {iso}: materialised {len(new_bookings)} occurrence(s) on {len(seat_events)} seat(s)")
+    return len(new_bookings)
@@ -0,0 +1,368 @@
+"""Waitlist and automatic reallocation of freed seat time.
+
+Students who couldn't get a seat join the waitlist for a slot interval. When
+a booking is cancelled or auto-cancelled for a no-show, the freed gap on that
+seat is offered to the waitlist straight away, inside the same transition
+that freed it.
+
+Matching: waiting requests live in memory in one FIFO per (start_slot,
+end_slot) pair. With a 48-slot day that is at most 1,176 queues, so finding
+the longest-waiting request that fits a gap means checking at most that
+many queue heads, however many students are waiting. After a request is
+placed, the space left on either side of it is filled the same way.
+
+The index is only a guide to what is waiting: every instance keeps one,
+so a chosen request is claimed in the database (status still "waiting")
+before it is booked, and requests joined on other instances are picked up
+at the start of each pass.
+"""
+import itertools
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+from app import push
+from app.allocation.blocks import blocks_on, closed_during
+from app.allocation.claims import claim_slot, release_slot, set_seat_state
+from app.cache.students import student_bookings
+from app.config import get_settings
+from app.eventlog.seats import seat_log, seat_state
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument
+from app.models.waitlist import WaitlistDocument
+from app.responses import student_booking_out
+from app.scheduler.pool import UPCOMING_LEAD
+from app.utils.ids import new_booking_id
+from app.utils.slots import slot_clock, slots_overlap
+
+LAST_SLOT = 48
+
+
+@dataclass(slots=True)
+class WaitEntry:
+    request_id: str
+    student_id: str
+    start_slot: int
+    end_slot: int
+    pin_code_hash: str
+    seq: int = 0
+    active: bool = field(default=True, compare=False)
+
+
+class WaitlistIndex:
+    def __init__(self):
+        self._buckets: dict[tuple[int, int], deque[WaitEntry]] = defaultdict(deque)
+        self._by_id: dict[str, WaitEntry] = {}
+        self._by_student: dict[str, set[str]] = defaultdict(set)
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, request_id: str) -> bool:
+        return request_id in self._by_id
+
+    def add(self, entry: WaitEntry) -> None:
+        if entry.request_id in self._by_id:
+            return  # already picked up by sync_waitlist()
+        entry.seq = next(self._seq)
+        self._buckets[(entry.start_slot, entry.end_slot)].append(entry)
+        self._by_id[entry.request_id] = entry
+        self._by_student[entry.student_id].add(entry.request_id)
+
+    def discard(self, request_id: str) -> WaitEntry | None:
+        """Remove a request. Its queue slot is dropped lazily when it reaches the head."""
+        entry = self._by_id.pop(request_id, None)
+        if entry is not None:
+            entry.active = False
+            ids = self._by_student[entry.student_id]
+            ids.discard(request_id)
+            if not ids:
+                del self._by_student[entry.student_id]
+        return entry
+
+    def restore(self, entry: WaitEntry) -> None:
+        """Put a request taken out by match() back in its place in line."""
+        entry.active = True
+        queue = self._buckets[(entry.start_slot, entry.end_slot)]
+        if not any(queued is entry for queued in queue):
+            at = next((i for i, queued in enumerate(queue) if queued.seq > entry.seq), len(queue))
+            queue.insert(at, entry)
+        self._by_id[entry.request_id] = entry
+        self._by_student[entry.student_id].add(entry.request_id)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._by_id.clear()
+        self._by_student.clear()
+
+    def _head(self, queue: deque[WaitEntry], eligible: Callable[[WaitEntry], bool]) -> WaitEntry | None:
+        while queue and not queue[0].active:
+            queue.popleft()
+        for entry in queue:
+            if entry.active and eligible(entry):
+                return entry
+        return None
+
+    def match(
+        self,
+        lo: int,
+        hi: int,
+        eligible: Callable[[WaitEntry], bool] = lambda e: True,
+        claim: Callable[[WaitEntry], bool] = lambda e: True,
+        superseded: dict[str, list[WaitEntry]] | None = None,
+    ) -> list[WaitEntry]:
+        """Fill the free gap [lo, hi] (a booking [s, e) fits iff lo <= s < e <= hi).
+
+        Returns the chosen requests (already removed from the index). Bookings
+        may not touch, so after placing [s, e) the remaining gaps are
+        [lo, s - 1] and [e + 1, hi]. `claim` is called on a request before it
+        is taken out (e.g. to reserve quota); if it refuses, the request keeps
+        its place in line and the next one is tried. The winners' other
+        requests dropped as overlapping go in `superseded`, by winner id.
+        """
+        chosen: list[WaitEntry] = []
+        refused: set[str] = set()
+
+        def candidate(entry: WaitEntry) -> bool:
+            return entry.request_id not in refused and eligible(entry)
+
+        gaps = [(lo, hi)]
+        while gaps and self._by_id:
+            a, b = gaps.pop()
+            best: WaitEntry | None = None
+            for s in range(a, b):
+                for e in range(s + 1, b + 1):
+                    queue = self._buckets.get((s, e))
+                    if not queue:
+                        continue
+                    head = self._head(queue, candidate)
+                    if head is not None and (best is None or head.seq < best.seq):
+                        best = head
+            if best is None:
+                continue
+            if not claim(best):
+                refused.add(best.request_id)
+                gaps.append((a, b))
+                continue
+            chosen.append(best)
+            self.discard(best.request_id)
+            # The student has a seat for this time now; their other requests
+            # that overlap it would only double-book them.
+            for other_id in list(self._by_student.get(best.student_id, ())):
+                other = self._by_id[other_id]
+                if slots_overlap(other.start_slot, other.end_slot, best.start_slot, best.end_slot):
+                    self.discard(other_id)
+                    if superseded is not None:
+                        superseded.setdefault(best.request_id, []).append(other)
+            gaps.append((a, best.start_slot - 1))
+            gaps.append((best.end_slot + 1, b))
+        return chosen
+
+    def overlapping_for_student(self, student_id: str, start_slot: int, end_slot: int) -> list[str]:
+        return [
+            rid for rid in self._by_student.get(student_id, ())
+            if slots_overlap(
+                self._by_id[rid].start_slot, self._by_id[rid].end_slot, start_slot, end_slot
+            )
+        ]
+
+
+waitlist = WaitlistIndex()
+
+# Requests joined on another instance reach this index through
+# sync_waitlist(): those created since the last sync, less SYNC_OVERLAP in
+# case an insert was still in flight (or that instance's clock is behind).
+SYNC_OVERLAP = timedelta(seconds=60)
+_synced_at: datetime | None = None
+
+
+async def _add_waiting(since: datetime) -> int:
+    """Add requests waiting since `since`, oldest first, that the index
+    doesn't hold yet. Returns how many were added."""
+    docs = WaitlistDocument.get_motor_collection().find(
+        {"status": "waiting", "created_at": {"$gte": since}}, {"_id": 0, "pin_code_hash": 1, "request_id": 1,
+                               "student_id": 1, "start_slot": 1, "end_slot": 1},
+    ).sort("created_at", 1)
+    added = 0
+    async for d in docs:
+        if d["request_id"] not in waitlist:
+            waitlist.add(WaitEntry(
+                d["request_id"], d["student_id"], d["start_slot"], d["end_slot"], d["pin_code_hash"]
+            ))
+            added += 1
+    return added
+
+
+async def load_waitlist() -> None:
+    """Rebuild the in-memory index from today's waiting requests, oldest first.
+    Requests are for today's slots only, so earlier days' are left out."""
+    global _synced_at
+    waitlist.clear()
+    _synced_at = slot_clock.now()
+    await _add_waiting(slot_clock.midnight())
+    print(f"[Waitlist] Loaded {len(waitlist)} waiting request(s)")
+
+
+async def sync_waitlist() -> int:
+    """Add the requests joined on other instances since the last sync."""
+    global _synced_at
+    since = slot_clock.midnight()
+    if _synced_at is not None:
+        since = max(since, _synced_at - SYNC_OVERLAP)
+    _synced_at = slot_clock.now()
+    return await _add_waiting(since)
+
+
+async def expire_waitlist() -> int:
+    """Mark requests from before today that are still waiting as expired."""
+    result = await WaitlistDocument.get_motor_collection().update_many(
+        {"status": "waiting", "created_at": {"$lt": slot_clock.midnight()}},
+        {"$set": {"status": "expired"}},
+    )
+    if result.modified_count:
+        print(f"[Waitlist] Expired {result.modified_count} request(s) from earlier days")
+    return result.modified_count
+
+
+def _free_gap(bookings: list[dict], start_slot: int, end_slot: int, now_slot: int) -> tuple[int, int]:
+    """The bookable gap around a freed [start_slot, end_slot) on a seat."""
+    lo, hi = now_slot + 1, LAST_SLOT
+    for b in bookings:
+        if b["end_slot"] <= start_slot:
+            lo = max(lo, b["end_slot"] + 1)
+        elif b["start_slot"] >= end_slot:
+            hi = min(hi, b["start_slot"] - 1)
+    return lo, hi
+
+
+async def reallocate_freed(freed: Iterable[tuple[str, int, int]]) -> dict[str, str]:
+    """Offer freed (seat_id, start_slot, end_slot) intervals to the waitlist.
+
+    Call after the freeing write. Returns {seat_id: new status} for seats
+    that got a new booking, so the caller can publish the final state in
+    the same MQTT batch. Winners are also notified on the push channel.
+
+    Each winner's slot is claimed on the seat and its request in the
+    database, both conditionally: a slot booked, or a request cancelled or
+    assigned (by another instance), since the index was read is skipped.
+    """
+    freed = list(freed)
+    if not freed:
+        return {}
+    await sync_waitlist()
+    if not len(waitlist):
+        return {}
+
+    now = slot_clock.now()
+    now_slot = slot_clock.datetime_to_slot(now)
+    limit = get_settings().max_active_bookings_per_student
+
+    seats = SeatDocument.get_motor_collection()
+    requests = WaitlistDocument.get_motor_collection()
+    seat_docs = {
+        d["seat_id"]: d
+        async for d in seats.find(
+            {"seat_id": {"$in": list({f[0] for f in freed})}},
+            {"_id": 0, "seat_id": 1, "status": 1, "physical_status": 1, "today_bookings": 1},
+        )
+    }
+    # The freed gap can reach into a window where staff closed the seat.
+    blocks = await blocks_on()
+
+    def eligible(entry: WaitEntry, seat_id: str) -> bool:
+        return (
+            entry.start_slot > now_slot
+            and student_bookings.active_count(entry.student_id) < limit
+            and seat_id not in closed_during(blocks, entry.start_slot, entry.end_slot)
+        )
+
+    new_bookings: list[BookingDocument] = []
+    seat_events = []
+    statuses: dict[str, str] = {}
+    for seat_id, start_slot, end_slot in freed:
+        seat = seat_docs.get(seat_id)
+        if seat is None or seat.get("physical_status") == "occupied":
+            continue  # someone is sitting there: create_booking would refuse too
+        lo, hi = _free_gap(seat.get("today_bookings", []), start_slot, end_slot, now_slot)
+        if lo >= hi:
+            continue
+
+        placed = []
+        latest = None  # the seat document after our last write to it
+        superseded: dict[str, list[WaitEntry]] = {}
+        # Quota is claimed before a request leaves the line, so a student who
+        # wins twice in this pass and hits the limit keeps the other request.
+        claim = lambda entry: student_bookings.try_reserve(entry.student_id, limit)  # noqa: E731
+        fits = lambda entry: eligible(entry, seat_id)  # noqa: E731
+        for entry in waitlist.match(lo, hi, fits, claim, superseded):
+            others = superseded.get(entry.request_id, [])
+            claimed = await claim_slot(seat_id, entry.start_slot, entry.end_slot)
+            if claimed is None:
+                # Booked since the seat was read: the request keeps its place.
+                student_bookings.release(entry.student_id)
+                for kept in (entry, *others):
+                    waitlist.restore(kept)
+                continue
+            latest = claimed
+            booking = BookingDocument(
+                booking_id=new_booking_id(),
+                seat_id=seat_id,
+                student_id=entry.student_id,
+                start_slot=entry.start_slot,
+                end_slot=entry.end_slot,
+                pin_code_hash=entry.pin_code_hash,
+                created_at=now,
+                status="confirmed",
+            )
+            taken = await requests.find_one_and_update(
+                {"request_id": entry.request_id, "status": "waiting"},
+                {"$set": {"status": "assigned", "booking_id": booking.booking_id}},
+            )
+            if taken is None:
+                # Cancelled, or assigned by another instance: give the slot back.
+                latest = await release_slot(seat_id, entry.start_slot, entry.end_slot) or latest
+                student_bookings.release(entry.student_id)
+                for kept in others:
+                    waitlist.restore(kept)
+                continue
+            placed.append(booking)
+            if others:
+                # The winner's overlapping requests, already gone from memory.
+                await requests.update_many(
+                    {"request_id": {"$in": [o.request_id for o in others]}, "status": "waiting"},
+                    {"$set": {"status": "superseded"}},
+                )
+        if not placed:
+            continue
+        new_bookings.extend(placed)
+
+        # Same seat bookkeeping as book_seat, from the seat as last written.
+        state = SeatDocument.model_validate(latest)
+        upcoming = [b.start_slot for b in state.today_bookings if b.start_slot > now_slot]
+        state.next_booking_start_time = slot_clock.slot_to_datetime(upcoming[0]) if upcoming else None
+        starts_soon = (
+            state.next_booking_start_time is not None
+            and state.next_booking_start_time - UPCOMING_LEAD <= now
+        )
+        if state.status == "free" or (starts_soon and state.status == "reserved"):
+            state.status = "upcoming" if starts_soon else "reserved"
+        state = await set_seat_state(state, latest["today_bookings"])
+        seat_events.append(seat_log.event(
+            seat_id, "booked", seat_state(state),
+            booking_ids=[b.booking_id for b in placed], source="waitlist",
+        ))
+        statuses[seat_id] = state.status
+
+    if not new_bookings:
+        return {}
+    await BookingDocument.insert_many(new_bookings)
+    await seat_log.append(seat_events)
+
+    for booking in new_bookings:
+        out = student_booking_out(booking.model_dump())
+        student_bookings.add(booking.student_id, out)
+        push.publish({"type": "waitlist_assigned", "studentId": booking.student_id, "booking": out})
+    print(f"[Waitlist] Reallocated {len(new_bookings)} booking(s) across {len(statuses)} seat(s)")
+    return statuses
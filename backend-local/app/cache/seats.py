@@ -0,0 +1,54 @@
+"""In-process copy of every seat, kept current by the seats change stream.
+
+Loaded once in full when the watcher starts, then patched from each change
+event's full document. While it is live, GET /seats is served from here
+with no query at all, and every API instance sees a write made on any other
+within one change-stream round trip.
+"""
+from app.models.seat import SeatDocument
+from app.responses import SEAT_PROJECTION, seat_out
+
+
+class SeatStateCache:
+    def __init__(self):
+        self._seats: dict[str, dict] = {}   # seat_id -> SeatOut-shaped dict
+        self._ids: dict[object, str] = {}   # Mongo _id -> seat_id (deletes only carry _id)
+        self.ready = False
+
+    def values(self) -> list[dict]:
+        return list(self._seats.values())
+
+    def get(self, seat_id: str) -> dict | None:
+        return self._seats.get(seat_id)
+
+    async def load(self) -> None:
+        """Full reload. Call after the change stream is open, so nothing
+        written in between is missed."""
+        seats, ids = {}, {}
+        async for doc in SeatDocument.get_motor_collection().find({}, {**SEAT_PROJECTION, "_id": 1}):
+            seats[doc["seat_id"]] = seat_out(doc)
+            ids[doc["_id"]] = doc["seat_id"]
+        self._seats, self._ids = seats, ids
+        self.ready = True
+        print(f"[Cache] Seat state loaded for {len(seats)} seat(s)")
+
+    def apply(self, doc: dict) -> dict:
+        """Store a seat's current full document; returns its SeatOut shape."""
+        out = seat_out(doc)
+        self._seats[doc["seat_id"]] = out
+        self._ids[doc["_id"]] = doc["seat_id"]
+        return out
+
+    def remove(self, _id) -> str | None:
+        seat_id = self._ids.pop(_id, None)
+        if seat_id is not None:
+            self._seats.pop(seat_id, None)
+        return seat_id
+
+    def clear(self) -> None:
+        self._seats.clear()
+        self._ids.clear()
+        self.ready = False
+
+
+seat_states = SeatStateCache()
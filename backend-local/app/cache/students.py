@@ -0,0 +1,154 @@
+"""Per-student active-booking cache and booking quota.
+
+GET /bookings/student/{id} is hit constantly around exam time. Each
+student's confirmed bookings are cached for a short TTL and patched in place
+on every write (create, cancel, check-in timeout, expiry), so a refresh is
+a dict lookup instead of a Mongo query.
+
+The active-booking *count* per student is kept separately, is never evicted,
+and is warmed with one aggregation when the database comes up; that makes
+the quota check at create time O(1) with no query at all.
+
+A reservation (try_reserve) is counted at once but is *pending* until its
+booking is stored (add) or given up (release). A Mongo read can't see a
+pending booking yet, so while a student has one, fill() and refresh() leave
+the in-process count alone instead of overwriting it with a number that
+misses the reservation.
+"""
+import time
+
+from app.config import get_settings
+from app.models.booking import BookingDocument
+
+
+class StudentBookingCache:
+    def __init__(self, ttl_seconds: float | None = None, max_entries: int = 50_000):
+        # None → read Settings.student_cache_ttl_seconds on first use, so
+        # importing this module doesn't require the environment to be loaded.
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # student_id -> (expires_at, {booking_id: StudentBookingOut-shaped dict})
+        self._entries: dict[str, tuple[float, dict[str, dict]]] = {}
+        self._active_counts: dict[str, int] = {}  # stored + pending
+        self._pending: dict[str, int] = {}
+
+    # --- reads -------------------------------------------------------------
+
+    def get(self, student_id: str) -> list[dict] | None:
+        """Cached bookings for a student, or None on a miss / expired entry."""
+        entry = self._entries.get(student_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[student_id]
+            return None
+        return list(entry[1].values())
+
+    def active_count(self, student_id: str) -> int:
+        return self._active_counts.get(student_id, 0)
+
+    # --- writes ------------------------------------------------------------
+
+    def fill(self, student_id: str, bookings: list[dict]) -> None:
+        """Store a fresh result from Mongo; it is authoritative for the count too."""
+        if self.ttl_seconds is None:
+            self.ttl_seconds = get_settings().student_cache_ttl_seconds
+        if len(self._entries) >= self.max_entries:
+            self._evict()
+        self._entries[student_id] = (
+            time.monotonic() + self.ttl_seconds,
+            {b["bookingId"]: b for b in bookings},
+        )
+        self._set_count(student_id, len(bookings))
+
+    def try_reserve(self, student_id: str, limit: int) -> bool:
+        """Claim one unit of quota. Synchronous, so no other request can
+        interleave between the check and the increment."""
+        count = self._active_counts.get(student_id, 0)
+        if count >= limit:
+            return False
+        self._active_counts[student_id] = count + 1
+        self._pending[student_id] = self._pending.get(student_id, 0) + 1
+        return True
+
+    def release(self, student_id: str) -> None:
+        """Give back quota claimed by try_reserve() for a booking that never got stored."""
+        self._settle(student_id)
+        _decrement(self._active_counts, student_id)
+
+    def add(self, student_id: str, booking: dict) -> None:
+        """Record a confirmed booking whose quota was reserved with try_reserve()."""
+        self._settle(student_id)
+        self.replace(student_id, booking)
+
+    def replace(self, student_id: str, booking: dict) -> None:
+        """Update a stored booking in the cached list (e.g. it moved seat); quota unchanged."""
+        entry = self._entries.get(student_id)
+        if entry is not None:
+            entry[1][booking["bookingId"]] = booking
+
+    def remove(self, student_id: str, booking_id: str) -> None:
+        """A confirmed booking stopped being active (cancelled, timed out, expired)."""
+        _decrement(self._active_counts, student_id)
+        entry = self._entries.get(student_id)
+        if entry is not None:
+            entry[1].pop(booking_id, None)
+
+    async def warm(self) -> None:
+        """Load every student's active-booking count with a single aggregation."""
+        pipeline = [
+            {"$match": {"status": "confirmed"}},
+            {"$group": {"_id": "$student_id", "n": {"$sum": 1}}},
+        ]
+        collection = BookingDocument.get_motor_collection()
+        counts = {row["_id"]: row["n"] async for row in collection.aggregate(pipeline)}
+        for student_id, pending in self._pending.items():
+            counts[student_id] = self._active_counts.get(student_id, pending)
+        self._active_counts = counts
+        self._entries.clear()
+        print(f"[Cache] Active booking counts loaded for {len(counts)} student(s)")
+
+    async def refresh(self, student_ids: list[str]) -> None:
+        """Re-read the counts of some students (changed by another instance)
+        and drop their cached lists, with one aggregation."""
+        pipeline = [
+            {"$match": {"status": "confirmed", "student_id": {"$in": student_ids}}},
+            {"$group": {"_id": "$student_id", "n": {"$sum": 1}}},
+        ]
+        collection = BookingDocument.get_motor_collection()
+        counts = {row["_id"]: row["n"] async for row in collection.aggregate(pipeline)}
+        for student_id in student_ids:
+            self._entries.pop(student_id, None)
+            self._set_count(student_id, counts.get(student_id, 0))
+
+    def _set_count(self, student_id: str, stored: int) -> None:
+        """Take a count read from Mongo, unless a reservation is in flight."""
+        if self._pending.get(student_id):
+            return
+        if stored:
+            self._active_counts[student_id] = stored
+        else:
+            self._active_counts.pop(student_id, None)
+
+    def _settle(self, student_id: str) -> None:
+        _decrement(self._pending, student_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for student_id in [s for s, (exp, _) in self._entries.items() if exp < now]:
+            del self._entries[student_id]
+        # Still full: drop the oldest fills (dicts keep insertion order).
+        overflow = len(self._entries) - self.max_entries + 1
+        for student_id in list(self._entries)[:max(0, overflow)]:
+            del self._entries[student_id]
+
+
+def _decrement(counts: dict[str, int], student_id: str) -> None:
+    count = counts.get(student_id, 0)
+    if count > 1:
+        counts[student_id] = count - 1
+    else:
+        counts.pop(student_id, None)
+
+
+student_bookings = StudentBookingCache()
@@ -0,0 +1,243 @@
+"""Change-stream watchers: every API instance converges on every write.
+
+With several API instances, a write on one is invisible to the others'
+caches and live-update streams until they re-query. When
+CHANGE_STREAMS_ENABLED is set, each instance tails MongoDB change streams on:
+
+  seats     full documents (updateLookup) → the seat-state cache
+            (app/cache/seats.py), and a seat_changed live update per change.
+            This replaces the seat log's local push, so a write made here is
+            announced once, the same way as one made elsewhere. The seat
+            fields are also handed to seat_log.observe(), so the in-process
+            seat states and the auto-assign index follow other instances.
+  bookings  the student_id of each change → those students' cached bookings
+            are dropped and their quota counts re-read in one aggregation,
+            batched until the stream goes idle. Cancelling deletes the
+            booking, so the collection gets changeStreamPreAndPostImages
+            (MongoDB 6.0+) at startup: a delete then still says whose
+            booking it was. Without pre-images every delete reloads all
+            students' counts.
+
+Each stream's resume token is saved (at most once a second, and on shutdown)
+in change_stream_tokens under this instance's id, so a restarted instance
+picks up where it stopped. If the token has aged out of the oplog the stream
+restarts from now; the seat cache is fully reloaded every time a stream
+opens, so state is right either way.
+
+Change streams need a replica set. A single node is enough for development:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+    MONGO_URI="mongodb://localhost:27017/?replicaSet=rs0" CHANGE_STREAMS_ENABLED=true uvicorn main:app
+"""
+import asyncio
+import socket
+import time
+from typing import Awaitable, Callable
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app import push
+from app.cache.seats import seat_states
+from app.cache.students import student_bookings
+from app.config import get_settings
+from app.eventlog.seats import STATE_FIELDS, push_seat_changes, seat_log
+from app.models.booking import BookingDocument
+from app.models.resume_token import ResumeTokenDocument
+from app.models.seat import SeatDocument
+from app.utils.slots import slot_clock
+
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost:
+# the saved position can't be resumed from, start again from now.
+UNRESUMABLE = {260, 280, 286}
+MAX_AWAIT_MS = 100          # how long an idle getMore waits for new changes
+TOKEN_SAVE_INTERVAL = 1.0   # seconds between resume-token writes
+RETRY_DELAY = 2.0
+MAX_PENDING_STUDENTS = 500  # refresh student counts at least this often under load
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+def _instance_id() -> str:
+    return get_settings().instance_id or socket.gethostname()
+
+
+class CollectionWatcher:
+    def __init__(
+        self,
+        collection: str,
+        get_collection: Callable,
+        on_change: Handler,
+        on_open: Callable[[], Awaitable[None]] | None = None,
+        on_idle: Callable[[], Awaitable[None]] | None = None,
+        on_close: Callable[[], None] | None = None,
+        **watch_options,
+    ):
+        self.collection = collection
+        self.get_collection = get_collection
+        self.on_change = on_change
+        self.on_open = on_open
+        self.on_idle = on_idle
+        self.on_close = on_close
+        self.watch_options = watch_options
+        self.key = f"{_instance_id()}:{collection}"
+        self._token: dict | None = None
+        self._saved_token: dict | None = None
+        self._saved_at = 0.0
+
+    async def _load_token(self) -> None:
+        doc = await ResumeTokenDocument.get_motor_collection().find_one({"_id": self.key})
+        self._token = self._saved_token = doc["token"] if doc else None
+
+    async def _save_token(self, force: bool = False) -> None:
+        if self._token == self._saved_token:
+            return
+        if not force and time.monotonic() - self._saved_at < TOKEN_SAVE_INTERVAL:
+            return
+        await ResumeTokenDocument.get_motor_collection().update_one(
+            {"_id": self.key},
+            {"$set": {"token": self._token, "updated_at": slot_clock.now()}},
+            upsert=True,
+        )
+        self._saved_token, self._saved_at = self._token, time.monotonic()
+
+    async def run(self) -> None:
+        await self._load_token()
+        while True:
+            try:
+                async with self.get_collection().watch(
+                    resume_after=self._token, max_await_time_ms=MAX_AWAIT_MS, **self.watch_options
+                ) as stream:
+                    if self.on_open:
+                        await self.on_open()
+                    print(f"[ChangeStream] Watching {self.collection} ({'resumed' if self._token else 'from now'})")
+                    while stream.alive:
+                        change = await stream.try_next()
+                        if change is not None:
+                            if change["operationType"] == "invalidate":
+                                self._token = None  # collection dropped/renamed: start over
+                                break
+                            await self.on_change(change)
+                        elif self.on_idle:
+                            await self.on_idle()
+                        self._token = stream.resume_token
+                        await self._save_token()
+            except asyncio.CancelledError:
+                await self._save_token(force=True)
+                raise
+            except OperationFailure as e:
+                if e.code in UNRESUMABLE:
+                    print(f"[ChangeStream] {self.collection}: cannot resume ({e}); restarting from now")
+                    self._token = None
+                else:
+                    print(f"[ChangeStream] {self.collection} failed ({e}); retrying in {RETRY_DELAY:.0f}s")
+                    await asyncio.sleep(RETRY_DELAY)
+            except PyMongoError as e:
+                print(f"[ChangeStream] {self.collection} failed ({e}); retrying in {RETRY_DELAY:.0f}s")
+                await asyncio.sleep(RETRY_DELAY)
+            finally:
+                if self.on_close:
+                    self.on_close()
+
+
+# --- seats -----------------------------------------------------------------
+
+async def _seat_changed(change: dict) -> None:
+    if change["operationType"] == "delete":
+        seat_states.remove(change["documentKey"]["_id"])
+        return
+    doc = change.get("fullDocument")
+    if doc is None:
+        return  # deleted again before the lookup; the delete event follows
+    push.publish({"type": "seat_changed", "seat": seat_states.apply(doc)})
+    seat_log.observe({doc["seat_id"]: _seat_fields(doc)})
+
+
+def _seat_fields(doc: dict) -> dict:
+    return {field: doc.get(field) for field in STATE_FIELDS}
+
+
+async def _seats_opened() -> None:
+    await seat_states.load()
+    # Writes made elsewhere while the stream was closed: resync the seat log's
+    # states (and the auto-assign index) too.
+    seat_log.observe({
+        doc["seat_id"]: _seat_fields(doc)
+        async for doc in SeatDocument.get_motor_collection().find(
+            {}, {"_id": 0, "seat_id": 1, **{field: 1 for field in STATE_FIELDS}}
+        )
+    })
+
+
+# --- bookings --------------------------------------------------------------
+
+_pending_students: set[str] = set()
+_reload_all = False
+
+
+async def _booking_changed(change: dict) -> None:
+    global _reload_all
+    doc = change.get("fullDocument") or change.get("fullDocumentBeforeChange")
+    if doc is None:
+        # A delete without a pre-image (collection lacks
+        # changeStreamPreAndPostImages): we can't tell whose booking it was.
+        _reload_all = True
+    else:
+        _pending_students.add(doc["student_id"])
+    if len(_pending_students) >= MAX_PENDING_STUDENTS:
+        await _flush_students()
+
+
+async def _flush_students() -> None:
+    global _reload_all
+    if _reload_all:
+        _reload_all = False
+        _pending_students.clear()
+        await student_bookings.warm()
+    elif _pending_students:
+        students = list(_pending_students)
+        _pending_students.clear()
+        await student_bookings.refresh(students)
+
+
+# --- lifecycle -------------------------------------------------------------
+
+async def enable_pre_images() -> None:
+    """Turn on pre-images for bookings, so deletes carry the student_id."""
+    collection = BookingDocument.get_motor_collection()
+    try:
+        await collection.database.command(
+            {"collMod": collection.name, "changeStreamPreAndPostImages": {"enabled": True}}
+        )
+    except PyMongoError as e:
+        print(f"[ChangeStream] Can't enable pre-images on bookings ({e}); every cancellation reloads all quotas")
+
+
+_tasks: list[asyncio.Task] = []
+
+
+def start_change_streams() -> None:
+    if _tasks:
+        return
+    # Seat pushes now come from the seats stream, for local and remote writes alike.
+    seat_log.unsubscribe(push_seat_changes)
+    watchers = [
+        CollectionWatcher(
+            "seats", SeatDocument.get_motor_collection, _seat_changed,
+            on_open=_seats_opened, on_close=seat_states.clear,
+            full_document="updateLookup",
+        ),
+        CollectionWatcher(
+            "bookings", BookingDocument.get_motor_collection, _booking_changed,
+            on_idle=_flush_students,
+            full_document="updateLookup", full_document_before_change="whenAvailable",
+        ),
+    ]
+    _tasks.extend(asyncio.create_task(w.run()) for w in watchers)
+
+
+async def stop_change_streams() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -8,11 +8,86 @@ class Settings(BaseSettings):
     mongo_uri: str
     db_name: str = "library_seats"
 
+    # Mongo client (one per process, see app/database.get_client)
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int = 60_000
+    mongo_wait_queue_timeout_ms: int = 2_000  # fail fast rather than queue forever
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_connect_timeout_ms: int = 5_000
+    mongo_socket_timeout_ms: int | None = 20_000
+    mongo_compressors: str = "zstd,snappy"  # wire compression, first one the server supports
+    # Read preference for endpoints that tolerate slightly stale data (GET /seats, GET /bookings)
+    mongo_read_preference: str = "secondaryPreferred"
+
     hivemq_host: str
     hivemq_port: int = 8883
     hivemq_username: str
     hivemq_password: str
 
+    # Slots are half-hours of the library's local day (DST-aware)
+    library_timezone: str = "Europe/London"
+
+    # Bookings
+    max_active_bookings_per_student: int = 3
+    # Recurring bookings: active rules per student, longest series (a term)
+    max_recurring_per_student: int = 2
+    recurring_max_days: int = 120
+    student_cache_ttl_seconds: float = 30.0
+
+    # Idempotency-Key replay window for POST /bookings and check-in
+    idempotency_ttl_seconds: float = 24 * 60 * 60
+    idempotency_max_entries: int = 10_000
+    # Binary check-in frames seen again, and text PINs repeated after being
+    # accepted, are dropped inside this window
+    mqtt_checkin_dedupe_seconds: float = 5.0
+
+    # Desk wire format (app/mqtt/protocol.py): "text" | "binary" | "both"
+    mqtt_protocol: str = "text"
+    # Backend ingest uses $share/{group}/... so instances split device traffic;
+    # "" subscribes normally (every instance gets every message)
+    mqtt_shared_group: str = "library-backend"
+
+    # Change streams (needs a replica set): converge caches and live updates
+    # across API instances. instance_id names this instance's resume tokens.
+    change_streams_enabled: bool = False
+    instance_id: str = ""  # default: hostname
+
+    # Only the instance holding the scheduler lease runs slot boundaries, the
+    # status broadcast and recurring materialisation; it renews every third
+    # of this, and another instance takes over within this long if it dies.
+    scheduler_lease_seconds: float = 15.0
+
+    # Shutdown (app/lifecycle.py): on SIGTERM, report not-ready and keep
+    # serving for drain_grace_seconds so the load balancer moves traffic
+    # away; then finish in-flight work within shutdown_timeout_seconds.
+    drain_grace_seconds: float = 5.0
+    shutdown_timeout_seconds: float = 20.0
+
+    # Admin routes (/admin/...) require this in the X-Admin-Token header;
+    # empty disables them
+    admin_token: str = ""
+
+    # Seat event log: how often changed seats are snapshotted
+    seat_snapshot_interval_seconds: int = 300
+
+    # Admission control (app/admission): per-client budgets and load shedding
+    admission_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" | "mongo" (shared across workers)
+    rate_limit_window_seconds: int = 10  # mongo backend only
+    # Budgets are per client IP, and a campus NAT puts hundreds of students
+    # behind one address: these are sized for that, not for a single device.
+    rate_limit_read_per_second: float = 100.0
+    rate_limit_read_burst: int = 300
+    rate_limit_write_per_second: float = 10.0
+    rate_limit_write_burst: int = 50
+    # Behind a reverse proxy every request comes from the proxy's address, so
+    # all clients share one budget. Set this when (and only when) exactly one
+    # trusted proxy appends the client address to X-Forwarded-For.
+    rate_limit_trust_forwarded_for: bool = False
+    shed_max_in_flight: int = 256
+    shed_max_loop_lag_ms: float = 250.0
+
 
 @lru_cache
 def get_settings() -> Settings:
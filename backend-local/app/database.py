@@ -1,36 +1,139 @@
-import motor.motor_asyncio
+import asyncio
+
 import beanie
-from datetime import datetime, timezone
+import motor.motor_asyncio
+from pymongo.read_preferences import (
+    Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred,
+)
 
+from app import readiness
+from app.allocation.autoassign import seat_timelines
+from app.allocation.recurring import materialize_day
+from app.allocation.waitlist import load_waitlist
+from app.cache.students import student_bookings
 from app.config import get_settings
+from app.eventlog.seats import seat_log, seat_state
 from app.models.seat import SeatDocument, TimeSlotEmbed
 from app.models.booking import BookingDocument
-from app.utils.slots import hash_pin, slot_to_datetime
+from app.models.waitlist import WaitlistDocument
+from app.models.ratelimit import RateLimitWindowDocument
+from app.models.seat_event import SeatEventDocument, SeatSnapshotDocument
+from app.models.resume_token import ResumeTokenDocument
+from app.models.recurring import RecurringBookingDocument
+from app.models.lease import SchedulerLeaseDocument
+from app.models.block import SeatBlockDocument
+from app.pool_metrics import PoolMetricsListener
+from app.utils.slots import hash_pin, slot_clock, slot_to_datetime
 
 SEAT_IDS = [f"{row}{num}" for row in ("A", "B") for num in range(1, 7)]
 
+DOCUMENT_MODELS = [
+    SeatDocument, BookingDocument, WaitlistDocument, RateLimitWindowDocument,
+    SeatEventDocument, SeatSnapshotDocument, ResumeTokenDocument, RecurringBookingDocument,
+    SchedulerLeaseDocument, SeatBlockDocument,
+]
+
+# The process-wide Mongo client. Motor clients own a connection pool and
+# background monitor threads, so there is exactly one, created on first use
+# and closed on shutdown.
+_client = None
+
+_READ_PREFERENCES = {
+    "primary": Primary(),
+    "primaryPreferred": PrimaryPreferred(),
+    "secondary": Secondary(),
+    "secondaryPreferred": SecondaryPreferred(),
+    "nearest": Nearest(),
+}
+
+
+def get_client():
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = motor.motor_asyncio.AsyncIOMotorClient(
+            settings.mongo_uri,
+            appname="library-seats",
+            maxPoolSize=settings.mongo_max_pool_size,
+            minPoolSize=settings.mongo_min_pool_size,
+            maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+            waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+            serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+            connectTimeoutMS=settings.mongo_connect_timeout_ms,
+            socketTimeoutMS=settings.mongo_socket_timeout_ms,
+            compressors=settings.mongo_compressors,
+            event_listeners=[PoolMetricsListener()],
+        )
+    return _client
+
+
+def close_db() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        readiness.mark("database", False)
+
+
+def read_collection(model):
+    """`model`'s raw collection with the configured read preference.
+
+    For read-only endpoints that can serve data a replication lag behind
+    (listings). Anything that must see its own writes — booking, check-in,
+    a student's own bookings right after booking — reads the primary.
+    """
+    preference = _READ_PREFERENCES[get_settings().mongo_read_preference]
+    return model.get_motor_collection().with_options(read_preference=preference)
+
+
+async def init_db() -> None:
+    """Connect Beanie to MongoDB. Seeding is a separate step (see seed.py)."""
+    db = get_client()[get_settings().db_name]
+    await beanie.init_beanie(
+        database=db,
+        document_models=DOCUMENT_MODELS,
+    )
+    await seat_log.replay()
+    if await SeatDocument.find_all().count() > len(seat_log.states):
+        await seat_log.adopt(await SeatDocument.find_all().to_list())
+    await student_bookings.warm()
+    await load_waitlist()
+    await seat_timelines.load()
+    if get_settings().change_streams_enabled:
+        from app.cache.watcher import enable_pre_images, start_change_streams
+        await enable_pre_images()
+        start_change_streams()
+    readiness.mark("database")
 
-async def init_db(use_demo_data: bool = False) -> None:
-    settings = get_settings()
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.mongo_uri)
-    db = client[settings.db_name]
-    await beanie.init_beanie(database=db, document_models=[SeatDocument, BookingDocument])
 
-    if use_demo_data:
-        await _seed_demo_data()
-    else:
-        await _seed_seats()
+async def init_db_with_retry(retry_delay: float = 5.0) -> None:
+    """Background startup task: keep trying init_db() until MongoDB answers."""
+    while True:
+        try:
+            await init_db()
+            print("[DB] Connected.")
+            break
+        except Exception as e:
+            print(f"[DB] Connection failed ({e}); retrying in {retry_delay:.0f}s")
+            await asyncio.sleep(retry_delay)
+    # The scheduler's startup run skipped today's recurring bookings while
+    # the database was still coming up.
+    try:
+        await materialize_day()
+    except Exception as e:
+        print(f"[Recurring] Materialising today failed: {e}")
 
 
 # ---------------------------------------------------------------------------
 # Production path: seed 12 clean seats only when the collection is empty.
 # ---------------------------------------------------------------------------
 
-async def _seed_seats() -> None:
+async def seed_seats() -> None:
     count = await SeatDocument.find_all().count()
     if count == 0:
         seats = [SeatDocument(seat_id=sid) for sid in SEAT_IDS]
         await SeatDocument.insert_many(seats)
+        await seat_log.adopt(seats)
         print(f"[DB] Seeded {len(seats)} clean seats.")
 
 
@@ -51,12 +154,15 @@ async def _seed_seats() -> None:
 #   s1234007 → 7777  (B5)
 # ---------------------------------------------------------------------------
 
-async def _seed_demo_data() -> None:
-    # Always start fresh so every server restart gives a consistent demo state.
+async def seed_demo_data() -> None:
+    # Always start fresh so every `seed.py --demo` run gives the same demo state.
     await SeatDocument.find_all().delete()
     await BookingDocument.find_all().delete()
+    await seat_log.reset()
 
-    now = datetime.now(timezone.utc)
+    now = slot_clock.now()
+    # Several students share a PIN across bookings — hash each one once.
+    pin_hashes = {pin: hash_pin(pin) for pin in ("1111", "2222", "3333", "4444", "5555", "6666", "7777")}
 
     seats = [
         # ------------------------------------------------------------------
@@ -140,57 +246,58 @@ async def _seed_demo_data() -> None:
         SeatDocument(seat_id="B6"),  # completely free
     ]
     await SeatDocument.insert_many(seats)
+    await seat_log.adopt(seats)
 
     bookings = [
         # BK_SEED_001 (A1) intentionally omitted — A1 is the live MQTT demo seat.
         BookingDocument(
             booking_id="BK_SEED_002", seat_id="A2", student_id="s1234001",
-            start_slot=20, end_slot=24, pin_code_hash=hash_pin("1111"),
+            start_slot=20, end_slot=24, pin_code_hash=pin_hashes["1111"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_003", seat_id="A3", student_id="s1234002",
-            start_slot=19, end_slot=22, pin_code_hash=hash_pin("2222"),
+            start_slot=19, end_slot=22, pin_code_hash=pin_hashes["2222"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_004", seat_id="A4", student_id="s1234003",
-            start_slot=19, end_slot=23, pin_code_hash=hash_pin("3333"),
+            start_slot=19, end_slot=23, pin_code_hash=pin_hashes["3333"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_005", seat_id="A5", student_id="s1234004",
-            start_slot=19, end_slot=24, pin_code_hash=hash_pin("4444"),
+            start_slot=19, end_slot=24, pin_code_hash=pin_hashes["4444"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_006", seat_id="A5", student_id="s1234005",
-            start_slot=28, end_slot=32, pin_code_hash=hash_pin("5555"),
+            start_slot=28, end_slot=32, pin_code_hash=pin_hashes["5555"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_007", seat_id="A6", student_id="s1234001",
-            start_slot=30, end_slot=34, pin_code_hash=hash_pin("1111"),
+            start_slot=30, end_slot=34, pin_code_hash=pin_hashes["1111"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_008", seat_id="B2", student_id="s1234002",
-            start_slot=22, end_slot=25, pin_code_hash=hash_pin("2222"),
+            start_slot=22, end_slot=25, pin_code_hash=pin_hashes["2222"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_009", seat_id="B3", student_id="s1234003",
-            start_slot=16, end_slot=19, pin_code_hash=hash_pin("3333"),
+            start_slot=16, end_slot=19, pin_code_hash=pin_hashes["3333"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_010", seat_id="B3", student_id="s1234006",
-            start_slot=26, end_slot=30, pin_code_hash=hash_pin("6666"),
+            start_slot=26, end_slot=30, pin_code_hash=pin_hashes["6666"],
             created_at=now, status="confirmed",
         ),
         BookingDocument(
             booking_id="BK_SEED_011", seat_id="B5", student_id="s1234007",
-            start_slot=28, end_slot=32, pin_code_hash=hash_pin("7777"),
+            start_slot=28, end_slot=32, pin_code_hash=pin_hashes["7777"],
             created_at=now, status="confirmed",
         ),
     ]
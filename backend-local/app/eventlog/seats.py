@@ -0,0 +1,226 @@
+"""Append-only seat event log with per-seat snapshots.
+
+Every change to a seat (booked, cancelled, upcoming, activated, checked in,
+IR changed, expired, no-show) is appended to `seat_events` as an event
+carrying the seat fields it set. A seat's current state is the fold of its
+events in append order:
+
+    state = {}
+    for event in events:           # _id (ULID) order
+        state = fold(state, event)  # {**state, **event["changes"]}
+
+`seats` (SeatDocument) is kept as the read projection of this log: the
+routes and scheduler still write it, in the same step that appends the
+event, so queries and indexes on seats stay as they were.
+
+Replay: a snapshot job periodically folds the persisted log, not this
+process's view of it, forward from the previous pass: the events after the
+stored watermark, on top of their seats' stored snapshots. Each changed
+seat's folded state is stored with the id of the last event in it and the
+new watermark, the last event folded. Seats that were not rewritten had no
+events since their previous snapshot, so after a pass every seat's snapshot
+covers the log up to the watermark. Only the scheduler lease holder runs it
+(instances append concurrently, so none of them has folded every event),
+and it leaves out the last SNAPSHOT_SETTLE_SECONDS of the log: another
+instance may still be inserting an event with an older id, which a watermark
+past it would skip forever. On startup, replay() loads all snapshots in one
+query and then folds only events after the latest watermark (a range scan on
+_id). Startup cost is about one document per seat, however long the log is.
+
+Change feed: each append folds the new events into the in-process state map
+(seat_log.states), then hands them, in order, to every subscriber registered
+with subscribe(). Subscribers run on the event loop. The live-update stream
+(app/push.py) is one of them, unless the change-stream watcher
+(app/cache/watcher.py) has taken over seat pushes. That watcher also hands
+seats written by other instances to observe(), so `states` and the
+subscribers see every instance's writes, not only this one's.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable
+
+from pymongo import UpdateOne
+
+from app import push
+from app.models.seat_event import SeatEventDocument, SeatSnapshotDocument
+from app.responses import seat_out
+from app.utils.ids import id_floor, ulid
+from app.utils.slots import slot_clock
+
+# Fields of SeatDocument that make up a seat's state.
+STATE_FIELDS = ("status", "physical_status", "today_bookings", "next_booking_start_time")
+
+Subscriber = Callable[[list[dict]], None]
+
+# Snapshots stop this far behind the newest events; see the module docstring.
+SNAPSHOT_SETTLE_SECONDS = 60.0
+
+
+def seat_state(seat) -> dict[str, Any]:
+    """State fields of a SeatDocument, as stored in an event's `changes`."""
+    return seat.model_dump(include=set(STATE_FIELDS))
+
+
+def fold(state: dict[str, Any], event: dict) -> dict[str, Any]:
+    return {**state, **event["changes"]}
+
+
+class SeatEventLog:
+    def __init__(self):
+        self.states: dict[str, dict[str, Any]] = {}
+        self._last_event: dict[str, str] = {}  # seat_id -> last folded event id
+        self._subscribers: list[Subscriber] = []
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def state(self, seat_id: str) -> dict[str, Any] | None:
+        return self.states.get(seat_id)
+
+    @staticmethod
+    def event(seat_id: str, type: str, changes: dict[str, Any], **data) -> dict:
+        return {
+            "_id": ulid(),
+            "seat_id": seat_id,
+            "type": type,
+            "at": slot_clock.now(),
+            "changes": changes,
+            "data": data,
+        }
+
+    def _apply(self, event: dict) -> None:
+        seat_id = event["seat_id"]
+        self.states[seat_id] = fold(self.states.get(seat_id, {}), event)
+        self._last_event[seat_id] = event["_id"]
+
+    async def append(self, events: Iterable[dict]) -> None:
+        """Append events (one insert), fold them in, and notify subscribers."""
+        events = list(events)
+        if not events:
+            return
+        try:
+            await SeatEventDocument.get_motor_collection().insert_many(events, ordered=True)
+        except Exception as e:
+            # The seats projection is already written; failing the request now
+            # would not undo that. Keep the in-memory state and say so loudly.
+            print(f"[SeatLog] Append of {len(events)} event(s) failed: {e}")
+        for event in events:
+            self._apply(event)
+        for subscriber in self._subscribers:
+            subscriber(events)
+
+    def observe(self, states: dict[str, dict[str, Any]]) -> None:
+        """Take seats' current state as written by another instance (from the
+        seats change stream) and notify subscribers. Nothing is appended: the
+        writer already logged it."""
+        if not states:
+            return
+        events = [self.event(seat_id, "observed", state) for seat_id, state in states.items()]
+        for event in events:
+            self.states[event["seat_id"]] = fold(self.states.get(event["seat_id"], {}), event)
+        for subscriber in self._subscribers:
+            subscriber(events)
+
+    async def record(self, seat_id: str, type: str, changes: dict[str, Any], **data) -> None:
+        await self.append([self.event(seat_id, type, changes, **data)])
+
+    async def replay(self) -> None:
+        """Rebuild every seat's state from snapshots plus the events after them."""
+        started = time.perf_counter()
+        self.states.clear()
+        self._last_event.clear()
+
+        floor = ""
+        async for snap in SeatSnapshotDocument.get_motor_collection().find({}):
+            self.states[snap["_id"]] = snap["state"]
+            self._last_event[snap["_id"]] = snap["last_event_id"]
+            floor = max(floor, snap["watermark"])
+        n_snapshots = len(self.states)
+
+        query = {"_id": {"$gt": floor}} if floor else {}
+        n_events = 0
+        async for event in SeatEventDocument.get_motor_collection().find(query).sort("_id", 1):
+            if event["_id"] <= self._last_event.get(event["seat_id"], ""):
+                continue  # already in this seat's snapshot
+            self._apply(event)
+            n_events += 1
+        print(
+            f"[SeatLog] Replayed {len(self.states)} seat(s) from {n_snapshots} snapshot(s) "
+            f"+ {n_events} event(s) in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    async def adopt(self, seats: Iterable) -> None:
+        """Start the log for seats it has never seen (e.g. a database that
+        predates it) with one "created" event each, from the projection."""
+        await self.append(
+            self.event(seat.seat_id, "created", seat_state(seat))
+            for seat in seats if seat.seat_id not in self.states
+        )
+
+    async def snapshot(self, settle_seconds: float = SNAPSHOT_SETTLE_SECONDS) -> int:
+        """Fold the stored log forward from the last pass and store the
+        changed seats. Run on the scheduler lease holder only."""
+        snapshots = SeatSnapshotDocument.get_motor_collection()
+        newest = await snapshots.find_one({}, {"watermark": 1}, sort=[("watermark", -1)])
+        watermark = newest["watermark"] if newest else ""
+        until = id_floor("", datetime.now(timezone.utc) - timedelta(seconds=settle_seconds))
+        query = {"_id": {"$gt": watermark, "$lt": until}} if watermark else {"_id": {"$lt": until}}
+        events = await SeatEventDocument.get_motor_collection().find(query).sort("_id", 1).to_list(None)
+        if not events:
+            return 0
+
+        changed = list(dict.fromkeys(e["seat_id"] for e in events))
+        states, last_event = {}, {}
+        async for snap in snapshots.find({"_id": {"$in": changed}}):
+            states[snap["_id"]] = snap["state"]
+            last_event[snap["_id"]] = snap["last_event_id"]
+        for event in events:
+            if event["_id"] <= last_event.get(event["seat_id"], ""):
+                continue
+            states[event["seat_id"]] = fold(states.get(event["seat_id"], {}), event)
+            last_event[event["seat_id"]] = event["_id"]
+
+        now = slot_clock.now()
+        watermark = events[-1]["_id"]
+        await snapshots.bulk_write([
+            UpdateOne(
+                {"_id": seat_id},
+                {"$set": {
+                    "state": states[seat_id],
+                    "last_event_id": last_event[seat_id],
+                    "watermark": watermark,
+                    "taken_at": now,
+                }},
+                upsert=True,
+            )
+            for seat_id in changed
+        ], ordered=False)
+        print(f"[SeatLog] Snapshot of {len(changed)} seat(s), {len(events)} event(s) folded")
+        return len(changed)
+
+    async def reset(self) -> None:
+        """Drop the whole log (demo re-seed)."""
+        await SeatEventDocument.get_motor_collection().delete_many({})
+        await SeatSnapshotDocument.get_motor_collection().delete_many({})
+        self.states.clear()
+        self._last_event.clear()
+
+
+seat_log = SeatEventLog()
+
+
+def push_seat_changes(events: list[dict]) -> None:
+    """Change-feed subscriber: one live update per changed seat."""
+    for seat_id in dict.fromkeys(e["seat_id"] for e in events):
+        state = seat_log.states[seat_id]
+        push.publish({
+            "type": "seat_changed",
+            "seat": seat_out({"seat_id": seat_id, **state}),
+        })
+
+
+seat_log.subscribe(push_seat_changes)
@@ -0,0 +1,98 @@
+"""Graceful drain for rolling restarts.
+
+Shutdown happens in this order, each step bounded by one overall deadline
+(Settings.shutdown_timeout_seconds):
+
+  1. Drain. On SIGTERM the instance reports not-ready (GET /ready → 503),
+     ends its GET /events streams and answers every response with
+     `Connection: close`. It keeps serving for drain_grace_seconds, until
+     the load balancer has seen the 503 and moved traffic away. Then
+     uvicorn's own handler runs: it stops accepting connections, lets
+     in-flight requests finish and calls the lifespan shutdown.
+  2. Stop. The admission middleware answers anything still arriving with
+     503. The MQTT ingest subscriptions are dropped, so the broker hands
+     device messages to the other instances in the shared group. Work
+     those messages already started (tracked here) runs to completion.
+  3. Scheduler. No new jobs start; running ones finish; the scheduler
+     lease is released so another instance takes over the slot boundaries
+     at once (app/scheduler/lease.py).
+  4. MQTT. Queued publishes are flushed before disconnecting.
+
+See main.py's lifespan for the sequence.
+"""
+import asyncio
+import concurrent.futures
+import signal
+import time
+
+from app import push, readiness
+
+_signalled = False
+_stopping = False
+_pending: set[concurrent.futures.Future] = set()
+
+
+def track(future: concurrent.futures.Future) -> None:
+    """Register work started outside an HTTP request (an MQTT message's
+    handler), so shutdown waits for it."""
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+
+
+def stop_accepting() -> None:
+    global _stopping
+    readiness.start_draining()
+    _stopping = True
+
+
+def is_stopping() -> bool:
+    return _stopping
+
+
+async def wait_idle(deadline: float) -> int:
+    """Wait for tracked work until `deadline` (time.monotonic()). Returns how
+    many were still running when it passed."""
+    while _pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.wait([asyncio.wrap_future(f) for f in list(_pending)], timeout=remaining)
+    return len(_pending)
+
+
+def start_draining() -> None:
+    """Stop attracting new work: not-ready, and live-update streams end so
+    browsers reconnect to another instance."""
+    if readiness.is_draining():
+        return
+    readiness.start_draining()
+    push.close_all()
+    print("[App] Draining")
+
+
+def install_signal_handlers(grace_seconds: float) -> None:
+    """Put the drain in front of uvicorn's SIGTERM/SIGINT handling.
+
+    Must run inside the lifespan startup, after uvicorn installed its own
+    handlers. SIGTERM (a deploy) waits `grace_seconds` before passing the
+    signal on; SIGINT (Ctrl-C) passes it on at once. A second signal is
+    passed on straight away, so uvicorn's force-exit still works.
+    """
+    loop = asyncio.get_running_loop()
+    for sig, grace in ((signal.SIGTERM, grace_seconds), (signal.SIGINT, 0.0)):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous, grace=grace):
+            global _signalled
+            if _signalled:
+                previous(signum, frame)
+                return
+            _signalled = True
+            loop.call_soon_threadsafe(start_draining)
+            if grace > 0:
+                print(f"[App] Shutting down in {grace:g}s")
+            loop.call_soon_threadsafe(loop.call_later, grace, previous, signum, frame)
+
+        signal.signal(sig, handler)
@@ -0,0 +1,291 @@
+"""Streaming bulk loader for provisioning seats and importing bookings.
+
+    python seed.py --seats seats.csv
+    python seed.py --bookings history.jsonl --chunk-size 2000 --concurrency 8
+
+Input is CSV (header row) or JSON Lines, picked by file extension, and is
+read lazily one row at a time. Rows are validated in chunks against the
+schemas in app/schemas/imports.py. Each valid chunk becomes one unordered
+write: a bulk_write of upserts for seats, an insert_many for bookings. At
+most `concurrency` chunk writes are in flight; the reader waits for a free
+slot before reading further. Memory therefore stays around
+(concurrency + 1) × chunk_size rows, however big the file is.
+
+Writes are idempotent: seats are upserted on seat_id with $setOnInsert, and
+bookings with a bookingId that already exists are counted as skipped (unique
+index). So a crashed or interrupted run can repeat the tail of its work
+safely. Progress is checkpointed to "<input>.checkpoint": the number of rows
+whose chunks have all been written. A rerun skips that many rows; --restart
+ignores the checkpoint.
+
+New seats also get a "created" entry in the seat event log. Bookings are
+written as they are, with status "completed" unless a row says otherwise;
+the seats' today_bookings are not touched, because imported history is
+about past days.
+"""
+import asyncio
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from typing import Awaitable, Callable, Iterator
+
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.eventlog.seats import seat_log
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument
+from app.models.seat_event import SeatEventDocument
+from app.schemas.imports import BookingImportRow, SeatImportRow
+from app.utils.ids import new_booking_id
+from app.utils.slots import hash_pin, slot_clock
+
+DUPLICATE_KEY = 11000
+PROGRESS_INTERVAL = 2.0  # seconds
+MAX_REPORTED_ERRORS = 20
+
+
+# --- input -----------------------------------------------------------------
+
+def read_rows(path: str) -> Iterator[tuple[int, dict | ValueError]]:
+    """(line number, raw row) pairs. Empty CSV cells are dropped so the
+    schema defaults apply. A JSONL line that doesn't parse is passed on as
+    its JSONDecodeError, to be counted with the invalid rows."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, e
+        elif path.endswith(".csv"):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}
+        else:
+            raise ValueError(f"{path}: expected a .csv or .jsonl file")
+
+
+# --- writers ---------------------------------------------------------------
+
+# 4-digit PINs: at most 10,000 distinct hashes, each computed once per run.
+_hash_pin = lru_cache(maxsize=10_000)(hash_pin)
+
+
+def _count_duplicates(e: BulkWriteError) -> int:
+    errors = e.details.get("writeErrors", [])
+    other = [err for err in errors if err.get("code") != DUPLICATE_KEY]
+    if other:
+        raise e
+    return len(errors)
+
+
+async def write_seats(rows: list[SeatImportRow]) -> tuple[int, int]:
+    ops = [
+        UpdateOne(
+            {"seat_id": r.seat_id},
+            {"$setOnInsert": {
+                "seat_id": r.seat_id,
+                "status": r.status,
+                "physical_status": r.physical_status,
+                "zone": r.zone,
+                "next_booking_start_time": None,
+                "today_bookings": [],
+            }},
+            upsert=True,
+        )
+        for r in rows
+    ]
+    try:
+        result = await SeatDocument.get_motor_collection().bulk_write(ops, ordered=False)
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        _count_duplicates(e)  # the same seat twice in one chunk
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+    events = [
+        seat_log.event(rows[i].seat_id, "created", {
+            "status": rows[i].status,
+            "physical_status": rows[i].physical_status,
+            "today_bookings": [],
+            "next_booking_start_time": None,
+        })
+        for i in upserted
+    ]
+    if events:
+        # Straight to the log: the API process folds it in on its next replay.
+        await SeatEventDocument.get_motor_collection().insert_many(events, ordered=False)
+    return len(upserted), len(rows) - len(upserted)
+
+
+async def write_bookings(rows: list[BookingImportRow]) -> tuple[int, int]:
+    now = slot_clock.now()
+    docs = [
+        {
+            "booking_id": r.booking_id or new_booking_id(),
+            "seat_id": r.seat_id,
+            "student_id": r.student_id,
+            "start_slot": r.start_slot,
+            "end_slot": r.end_slot,
+            "pin_code_hash": r.pin_code_hash or _hash_pin(r.pin_code),
+            "created_at": r.created_at or now,
+            "status": r.status,
+        }
+        for r in rows
+    ]
+    try:
+        await BookingDocument.get_motor_collection().insert_many(docs, ordered=False)
+        return len(docs), 0
+    except BulkWriteError as e:
+        duplicates = _count_duplicates(e)  # imported by an earlier run
+        return len(docs) - duplicates, duplicates
+
+
+KINDS: dict[str, tuple[type[BaseModel], Callable[[list], Awaitable[tuple[int, int]]]]] = {
+    "seats": (SeatImportRow, write_seats),
+    "bookings": (BookingImportRow, write_bookings),
+}
+
+
+# --- checkpoint ------------------------------------------------------------
+
+class Checkpoint:
+    def __init__(self, input_path: str):
+        self.path = input_path + ".checkpoint"
+        stat = os.stat(input_path)
+        self.fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load(self) -> int:
+        """Rows already done, or 0 if there is no checkpoint for this exact file."""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if saved.get("input") != self.fingerprint:
+            print(f"[Loader] {self.path} is for a different version of the input; starting over")
+            return 0
+        return saved["rows_done"]
+
+    def save(self, rows_done: int, complete: bool = False) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"input": self.fingerprint, "rows_done": rows_done, "complete": complete}, f)
+        os.replace(tmp, self.path)  # atomic: a crash never leaves half a checkpoint
+
+
+# --- loader ----------------------------------------------------------------
+
+@dataclass
+class LoadStats:
+    read: int = 0
+    written: int = 0
+    skipped: int = 0   # already present
+    invalid: int = 0
+    resumed_from: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def line(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = (self.read - self.resumed_from) / elapsed if elapsed else 0.0
+        return (
+            f"read {self.read}, written {self.written}, skipped {self.skipped}, "
+            f"invalid {self.invalid} ({rate:,.0f} rows/s)"
+        )
+
+
+async def load(
+    kind: str,
+    path: str,
+    chunk_size: int = 1000,
+    concurrency: int = 4,
+    restart: bool = False,
+) -> LoadStats:
+    schema, write = KINDS[kind]
+    checkpoint = Checkpoint(path)
+    stats = LoadStats()
+    skip = 0 if restart else checkpoint.load()
+    stats.read = stats.resumed_from = skip
+    if skip:
+        print(f"[Loader] Resuming {path} after {skip} row(s)")
+
+    slots = asyncio.Semaphore(concurrency)
+    in_flight: set[asyncio.Task] = set()
+    failures: list[BaseException] = []
+    # Chunks finish out of order; the checkpoint only advances over a
+    # contiguous run of finished chunks. chunk index -> rows it ends at
+    chunk_ends: dict[int, int] = {}
+    finished: set[int] = set()
+    next_to_commit = 0
+    last_progress = time.perf_counter()
+
+    def commit_finished() -> None:
+        nonlocal next_to_commit
+        advanced = False
+        while next_to_commit in finished:
+            finished.discard(next_to_commit)
+            rows_done = chunk_ends.pop(next_to_commit)
+            next_to_commit += 1
+            advanced = True
+        if advanced:
+            checkpoint.save(rows_done)
+
+    async def write_chunk(index: int, rows: list) -> None:
+        try:
+            written, skipped = await write(rows) if rows else (0, 0)
+            stats.written += written
+            stats.skipped += skipped
+            finished.add(index)
+            commit_finished()
+        except Exception as e:
+            # Never marked finished, so the checkpoint stops before this chunk.
+            failures.append(e)
+        finally:
+            slots.release()
+
+    rows = islice(read_rows(path), skip, None)
+    index = 0
+    while not failures:
+        raw = list(islice(rows, chunk_size))
+        if not raw:
+            break
+        valid = []
+        for line_no, row in raw:
+            if isinstance(row, ValueError):
+                reason = f"not valid JSON ({row})"
+            else:
+                try:
+                    valid.append(schema.model_validate(row))
+                    continue
+                except ValidationError as e:
+                    reason = "; ".join(err["msg"] for err in e.errors())
+            stats.invalid += 1
+            if stats.invalid <= MAX_REPORTED_ERRORS:
+                print(f"[Loader] {path}:{line_no}: {reason}")
+        stats.read += len(raw)
+        chunk_ends[index] = stats.read
+
+        await slots.acquire()  # backpressure: wait for a free write slot
+        task = asyncio.create_task(write_chunk(index, valid))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        index += 1
+
+        if time.perf_counter() - last_progress >= PROGRESS_INTERVAL:
+            last_progress = time.perf_counter()
+            print(f"[Loader] {kind}: {stats.line()}")
+
+    await asyncio.gather(*in_flight)
+    if failures:
+        print(f"[Loader] {kind} stopped: a chunk write failed after {stats.line()}")
+        raise failures[0]
+    checkpoint.save(stats.read, complete=True)
+    if stats.invalid > MAX_REPORTED_ERRORS:
+        print(f"[Loader] ... {stats.invalid - MAX_REPORTED_ERRORS} more invalid row(s) not shown")
+    print(f"[Loader] {kind} done: {stats.line()}")
+    return stats
@@ -0,0 +1,27 @@
+"""Process-wide counters and gauges, served by GET /metrics.
+
+Counters are plain integers bumped with inc(). Gauges are callables
+registered once and read when a snapshot is taken, so the owner of a value
+(the admission middleware, the loop-lag monitor, ...) doesn't have to push
+updates anywhere.
+"""
+from collections import defaultdict
+from typing import Callable
+
+_counters: dict[str, int] = defaultdict(int)
+_gauges: dict[str, Callable[[], float]] = {}
+
+
+def inc(name: str, amount: int = 1) -> None:
+    _counters[name] += amount
+
+
+def register_gauge(name: str, read: Callable[[], float]) -> None:
+    _gauges[name] = read
+
+
+def snapshot() -> dict:
+    return {
+        "counters": dict(sorted(_counters.items())),
+        "gauges": {name: read() for name, read in sorted(_gauges.items())},
+    }
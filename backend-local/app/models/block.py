@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import List, Optional
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+
+class SeatBlockDocument(Document):
+    """Seats closed by staff (an exam, maintenance) for a slot window on
+    each day from start_date to end_date. Nothing can be booked on them
+    then (app/allocation/blocks.py)."""
+    block_id: str
+    seat_ids: List[str]      # resolved when the block is created
+    zone: Optional[str] = None
+    start_slot: int
+    end_slot: int
+    start_date: str          # ISO dates, inclusive; compare as strings
+    end_date: str
+    reason: str = ""
+    created_at: datetime
+    status: str = "active"   # "active" | "lifted"
+
+    class Settings:
+        name = "seat_blocks"
+        indexes = [
+            IndexModel([("block_id", ASCENDING)], unique=True),
+            IndexModel([("status", ASCENDING), ("end_date", ASCENDING)]),
+        ]
@@ -1,5 +1,7 @@
 from datetime import datetime
+from typing import Optional
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 
 
 class BookingDocument(Document):
@@ -10,7 +12,15 @@ class BookingDocument(Document):
     end_slot: int
     pin_code_hash: str
     created_at: datetime
-    status: str = "confirmed"  # "confirmed" | "pending" | "cancelled"
+    status: str = "confirmed"  # "confirmed" | "pending" | "cancelled" | "completed" (imported history)
+    rule_id: Optional[str] = None  # set on occurrences of a recurring booking
 
     class Settings:
         name = "bookings"
+        indexes = [
+            # Booking ids are ULIDs (app/utils/ids.py): unique, and ordered by
+            # creation time, so this index also serves creation-time range scans.
+            IndexModel([("booking_id", ASCENDING)], unique=True),
+            # GET /bookings/student/{id} and the quota warm-up filter on both.
+            IndexModel([("student_id", ASCENDING), ("status", ASCENDING)]),
+        ]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from beanie import Document
+
+
+class SchedulerLeaseDocument(Document):
+    """Which API instance runs the scheduled seat transitions.
+
+    `id` names the lease ("scheduler"); `holder` is the instance holding it
+    until `expires_at` (see app/scheduler/lease.py).
+    """
+
+    id: str
+    holder: str
+    expires_at: datetime
+
+    class Settings:
+        name = "scheduler_leases"
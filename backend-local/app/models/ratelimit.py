@@ -0,0 +1,22 @@
+from datetime import datetime
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+
+class RateLimitWindowDocument(Document):
+    """Request count for one client, budget and fixed time window.
+
+    Only used when RATE_LIMIT_BACKEND=mongo, so several API workers share one
+    budget per client. `id` is "{budget}:{client}:{window start}"; Mongo's TTL
+    monitor deletes windows once they have expired.
+    """
+
+    id: str
+    hits: int = 0
+    expires_at: datetime
+
+    class Settings:
+        name = "rate_limits"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
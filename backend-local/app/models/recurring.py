@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+
+class RecurringBookingDocument(Document):
+    """A weekly booking rule, stored once. Occurrences become ordinary
+    BookingDocuments only on their own day (app/allocation/recurring.py)."""
+    rule_id: str
+    seat_id: str
+    student_id: str
+    weekdays: int            # bit 0 = Monday … bit 6 = Sunday
+    start_slot: int
+    end_slot: int
+    footprint: int           # slot bits start_slot..end_slot inclusive, see slot_footprint()
+    start_date: str          # ISO dates, inclusive; compare as strings
+    end_date: str
+    exceptions: List[str] = []  # skipped occurrence dates
+    pin_code_hash: str
+    created_at: datetime
+    status: str = "active"   # "active" | "cancelled"
+
+    class Settings:
+        name = "recurring_bookings"
+        indexes = [
+            IndexModel([("rule_id", ASCENDING)], unique=True),
+            # Conflict checks (per seat) and the daily materialisation (by date).
+            IndexModel([("seat_id", ASCENDING), ("status", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("start_date", ASCENDING)]),
+            IndexModel([("student_id", ASCENDING), ("status", ASCENDING)]),
+        ]
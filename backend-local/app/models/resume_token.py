@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any
+from beanie import Document
+
+
+class ResumeTokenDocument(Document):
+    """Last processed change-stream position of one watcher.
+
+    `id` is "{instance}:{collection}", so every API instance resumes its own
+    streams where it stopped (see app/cache/watcher.py).
+    """
+
+    id: str
+    token: dict[str, Any]
+    updated_at: datetime
+
+    class Settings:
+        name = "change_stream_tokens"
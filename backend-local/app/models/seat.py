@@ -2,6 +2,7 @@ from typing import List, Optional
 from datetime import datetime
 from beanie import Document
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 
 
 class TimeSlotEmbed(BaseModel):
@@ -17,6 +18,12 @@ class SeatDocument(Document):
     today_bookings: List[TimeSlotEmbed] = []
     # Hardware-detected physical occupancy (IR sensor)
     physical_status: str = "free"  # "free" | "occupied"
+    # Area for POST /bookings/auto; unset means the letters of seat_id (A3 → "A").
+    zone: Optional[str] = None
 
     class Settings:
         name = "seats"
+        indexes = [
+            # Every route looks seats up by seat_id; the bulk loader upserts on it.
+            IndexModel([("seat_id", ASCENDING)], unique=True),
+        ]
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Any
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+
+class SeatEventDocument(Document):
+    """One entry of the append-only seat log (see app/eventlog/seats.py).
+
+    `id` is a ULID, so _id order is append order. `changes` holds the seat
+    fields the event set; folding `changes` over a seat's events in _id
+    order gives its current state.
+    """
+
+    id: str
+    seat_id: str
+    type: str  # created | booked | cancelled | upcoming | activated | checked_in | ir_changed | expired | no_show
+    at: datetime
+    changes: dict[str, Any]
+    data: dict[str, Any] = {}  # booking_id, slots, ... for auditing
+
+    class Settings:
+        name = "seat_events"
+        indexes = [
+            IndexModel([("seat_id", ASCENDING), ("_id", ASCENDING)]),
+        ]
+
+
+class SeatSnapshotDocument(Document):
+    """Folded state of one seat as of `last_event_id` (`id` is the seat_id).
+
+    `watermark` is the last event the snapshot pass folded (the pass covers
+    the whole log up to it); replay starts after the highest one.
+    """
+
+    id: str
+    state: dict[str, Any]
+    last_event_id: str
+    watermark: str
+    taken_at: datetime
+
+    class Settings:
+        name = "seat_snapshots"
+        indexes = [
+            IndexModel([("watermark", ASCENDING)]),
+        ]
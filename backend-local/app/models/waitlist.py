@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+
+class WaitlistDocument(Document):
+    request_id: str
+    student_id: str
+    start_slot: int
+    end_slot: int
+    pin_code_hash: str
+    created_at: datetime
+    # "waiting" | "assigned" | "cancelled" | "superseded" (the student got an
+    # overlapping request instead) | "expired" (a previous day's)
+    status: str = "waiting"
+    booking_id: Optional[str] = None  # set once assigned
+
+    class Settings:
+        name = "waitlist"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("request_id", ASCENDING)], unique=True),
+        ]
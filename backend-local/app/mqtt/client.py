@@ -1,9 +1,22 @@
 import asyncio
 import ssl
+import time
+from collections import deque
+from typing import Iterable
+
 import paho.mqtt.client as mqtt
+
 from app.config import get_settings
+from app.mqtt import protocol
 
 _client: mqtt.Client | None = None
+# Publishes queued in paho, oldest first, until written to the broker;
+# flush() waits on all of them. Waiting on the last one isn't enough: paho
+# refuses a publish while disconnected, and marks what it had queued as
+# lost when it reconnects.
+_pending: deque[mqtt.MQTTMessageInfo] = deque()
+# Publishes refused or lost since the last flush().
+_unsent = 0
 
 
 def get_mqtt_client() -> mqtt.Client:
@@ -13,6 +26,12 @@ def get_mqtt_client() -> mqtt.Client:
 
 
 def connect_and_loop_start() -> None:
+    """Start the MQTT client without waiting for the broker.
+
+    connect_async() only records the target; paho's network thread performs
+    the actual connect and keeps retrying with back-off if the broker is slow
+    or down, so a broker outage never holds up API startup.
+    """
     global _client
     settings = get_settings()
 
@@ -25,34 +44,100 @@ def connect_and_loop_start() -> None:
     client.username_pw_set(settings.hivemq_username, settings.hivemq_password)
     client.tls_set(tls_version=ssl.PROTOCOL_TLS_CLIENT)
     client.user_data_set(loop)
+    client.reconnect_delay_set(min_delay=1, max_delay=60)
 
-    from app.mqtt.handlers import on_connect, on_message
+    from app.mqtt.handlers import on_connect, on_disconnect, on_message
     client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
     client.on_message = on_message
 
-    client.connect(settings.hivemq_host, settings.hivemq_port)
+    client.connect_async(settings.hivemq_host, settings.hivemq_port)
     client.loop_start()
     _client = client
-    print(f"[MQTT] Connecting to {settings.hivemq_host}:{settings.hivemq_port}")
+    print(f"[MQTT] Connecting to {settings.hivemq_host}:{settings.hivemq_port} in background")
+
+
+def stop_ingest() -> None:
+    """Unsubscribe from device topics; with a shared subscription the broker
+    sends them to the group's other instances from now on."""
+    if _client:
+        from app.mqtt.handlers import ingest_topics
+        _client.unsubscribe(ingest_topics())
+        print("[MQTT] Stopped ingesting device messages")
+
 
+def flush(timeout: float) -> bool:
+    """Wait until queued publishes have been written to the broker. False if
+    any publish since the last flush was refused, lost or is still not out."""
+    global _unsent
+    sent = _unsent == 0
+    _unsent = 0
+    deadline = time.monotonic() + timeout
+    while _pending:
+        info = _pending.popleft()
+        try:
+            info.wait_for_publish(max(0.0, deadline - time.monotonic()))
+            sent = info.is_published() and sent
+        except (RuntimeError, ValueError):
+            sent = False  # lost with the connection
+    return sent
 
-def disconnect() -> None:
+
+def disconnect(timeout: float = 5.0) -> None:
     global _client
     if _client:
-        _client.loop_stop()
+        if not flush(timeout):
+            print("[MQTT] Some status updates were not sent before disconnecting")
+        # disconnect() before loop_stop(), so the network thread still sends
+        # the DISCONNECT packet.
         _client.disconnect()
+        _client.loop_stop()
         _client = None
         print("[MQTT] Disconnected.")
 
 
+def _status_messages(seat_id: str, status: str) -> list[tuple[str, str | bytes]]:
+    """(topic, payload) for one status in each wire format the fleet speaks
+    (Settings.mqtt_protocol: text, binary or both during a migration)."""
+    mode = get_settings().mqtt_protocol
+    messages = []
+    if mode in ("text", "both"):
+        messages.append((protocol.status_topic(seat_id), status))
+    if mode in ("binary", "both"):
+        messages.append((protocol.status_topic(seat_id, binary=True), protocol.encode_status(status)))
+    return messages
+
+
 def publish_booking_status(seat_id: str, status: str) -> None:
     """Broadcast booking-driven seat state to hardware.
     status: 'free' | 'reserved' | 'upcoming' | 'awaiting_checkin' | 'occupied'
-    Topic: library/seat/{seatId}/booking_status
+    Topic: library/seat/{seatId}/booking_status (text) or ls/{seatId}/s (binary)
+    """
+    publish_booking_statuses([(seat_id, status)])
+
+
+def publish_booking_statuses(updates: Iterable[tuple[str, str]]) -> None:
+    """Publish many (seat_id, status) pairs in one go, e.g. for a slot boundary.
+    paho only queues the packets here; its network thread sends them back to back.
     """
-    client = get_mqtt_client()
-    topic = f"library/seat/{seat_id}/booking_status"
-    client.publish(topic, status)
+    global _unsent
+    client = _client
+    if client is None:
+        # Not started (seed.py, scripts) or already shut down: the next
+        # 30-second broadcast from a running instance carries the state.
+        print("[MQTT] Not connected; status update(s) not published")
+        return
+    for seat_id, status in updates:
+        for topic, payload in _status_messages(seat_id, status):
+            info = client.publish(topic, payload)
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                _pending.append(info)
+            else:
+                _unsent += 1
+    # Keep only what is still on its way out (paho settles them in order).
+    while _pending and (_pending[0].rc != mqtt.MQTT_ERR_SUCCESS or _pending[0].is_published()):
+        if _pending.popleft().rc != mqtt.MQTT_ERR_SUCCESS:
+            _unsent += 1
 
 
 # --- Future stubs ---
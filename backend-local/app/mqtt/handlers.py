@@ -1,58 +1,159 @@
 import asyncio
-from datetime import datetime, timezone
 
 import paho.mqtt.client as mqtt
+from pymongo import UpdateOne
 
+from app import lifecycle, readiness
+from app.config import get_settings
+from app.eventlog.seats import seat_log
 from app.models.seat import SeatDocument
 from app.models.booking import BookingDocument
+from app.mqtt import protocol
 from app.mqtt.client import publish_booking_status
-from app.utils.slots import verify_pin
+from app.utils.idempotency import TTLCache
+from app.utils.slots import now_slot, verify_pin
 
-TOPIC_PREFIX = "library/seat/"
-SUFFIX_IR = "/ir"                # Hardware → Backend: IR presence detection
-SUFFIX_CHECKIN = "/check-in"     # Hardware → Backend: PIN entry from keypad
+# Keypads publish at QoS 1, so the broker redelivers a check-in whose PUBACK
+# was lost. Binary frames carry a sequence number: (seat, ts, seq) seen within
+# the window are dropped here. Only touched from paho's network thread.
+_recent_checkins: TTLCache | None = None
+
+# Text frames don't, and a student retyping a PIN sends the same bytes as a
+# redelivery. So a (seat, PIN) is only dropped while it is being handled or
+# after it was accepted; a rejected PIN can be retried at once. Only touched
+# from the event loop.
+_accepted_pins: TTLCache | None = None
+_pins_in_flight: set[tuple[str, str]] = set()
+
+# Last accepted (ts, seq) of binary IR frames per seat, to drop redeliveries
+# and frames overtaken by a newer reading. Only touched from paho's thread.
+_last_ir: dict[str, tuple[int, int]] = {}
+
+
+def _is_duplicate_checkin(seat_id: str, key) -> bool:
+    global _recent_checkins
+    if _recent_checkins is None:
+        _recent_checkins = TTLCache(get_settings().mqtt_checkin_dedupe_seconds, max_entries=10_000)
+    return _recent_checkins.seen((seat_id, key))
+
+
+def _is_repeat_pin(seat_id: str, pin_code: str) -> bool:
+    global _accepted_pins
+    if _accepted_pins is None:
+        _accepted_pins = TTLCache(get_settings().mqtt_checkin_dedupe_seconds, max_entries=10_000)
+    key = (seat_id, pin_code)
+    return key in _pins_in_flight or _accepted_pins.get(key) is not None
+
+
+def ingest_topics() -> list[str]:
+    return protocol.subscriptions(get_settings().mqtt_shared_group)
 
 
 def on_connect(client: mqtt.Client, userdata, flags, reason_code, properties) -> None:
     if reason_code == 0:
-        client.subscribe("library/seat/+/ir")
-        client.subscribe("library/seat/+/check-in")
-        print("[MQTT] Connected — subscribed to library/seat/+/ir and library/seat/+/check-in")
+        readiness.mark("mqtt")
+        if lifecycle.is_stopping():
+            return  # reconnected during shutdown: publish only, don't take device traffic
+        topics = ingest_topics()
+        client.subscribe([(topic, 0) for topic in topics])
+        print(f"[MQTT] Connected — subscribed to {', '.join(topics)}")
     else:
         print(f"[MQTT] Connection failed, reason code: {reason_code}")
 
 
+def on_disconnect(client: mqtt.Client, userdata, flags, reason_code, properties) -> None:
+    # paho reconnects on its own (loop_start + reconnect_delay_set); on_connect
+    # re-subscribes and flips readiness back once the broker is reachable.
+    readiness.mark("mqtt", False)
+    print(f"[MQTT] Disconnected, reason code: {reason_code}")
+
+
 def on_message(client: mqtt.Client, userdata, msg: mqtt.MQTTMessage) -> None:
-    topic: str = msg.topic
-    payload: str = msg.payload.decode("utf-8").strip()
+    route = protocol.route(msg.topic)
+    if route is None:
+        return
+    seat_id = route.seat_id
     # userdata holds the asyncio event loop captured at startup.
     # run_coroutine_threadsafe is required because this callback runs in paho's thread.
+    # Shutdown waits for the tracked futures (app/lifecycle.py).
     loop: asyncio.AbstractEventLoop = userdata
 
-    if topic.startswith(TOPIC_PREFIX) and topic.endswith(SUFFIX_CHECKIN):
-        seat_id = topic[len(TOPIC_PREFIX):-len(SUFFIX_CHECKIN)]
-        print(f"[MQTT] Check-in request: seat={seat_id}")
-        asyncio.run_coroutine_threadsafe(_handle_checkin_message(seat_id, payload), loop)
+    if route.kind == "batch":
+        _on_gateway_batch(route.seat_id, msg.payload, loop)
+        return
 
-    elif topic.startswith(TOPIC_PREFIX) and topic.endswith(SUFFIX_IR):
-        seat_id = topic[len(TOPIC_PREFIX):-len(SUFFIX_IR)]
+    if route.binary:
+        try:
+            if route.kind == "check-in":
+                frame = protocol.decode_checkin(msg.payload)
+            else:
+                frame = protocol.decode_status(msg.payload)
+        except ValueError as e:
+            print(f"[MQTT] Seat {seat_id}: {e}, ignoring")
+            return
+        payload = frame.value
+    else:
+        payload = msg.payload.decode("utf-8", errors="replace").strip()
+
+    if route.kind == "check-in":
+        if route.binary and _is_duplicate_checkin(seat_id, (frame.ts, frame.seq)):
+            print(f"[MQTT] Check-in request: seat={seat_id} (duplicate, ignored)")
+            return
+        print(f"[MQTT] Check-in request: seat={seat_id}")
+        future = asyncio.run_coroutine_threadsafe(_handle_checkin_message(seat_id, payload), loop)
+        lifecycle.track(future)
+    else:
+        if route.binary:
+            if not protocol.is_newer(frame, _last_ir.get(seat_id)):
+                return  # redelivered, or older than the reading already applied
+            _last_ir[seat_id] = (frame.ts, frame.seq)
         print(f"[MQTT] IR sensor update: seat={seat_id} payload={payload}")
-        asyncio.run_coroutine_threadsafe(_handle_ir_update(seat_id, payload), loop)
+        future = asyncio.run_coroutine_threadsafe(_handle_ir_update(seat_id, payload), loop)
+        lifecycle.track(future)
+
+
+def _on_gateway_batch(floor: str, payload: bytes, loop: asyncio.AbstractEventLoop) -> None:
+    """A floor gateway's debounced IR readings and check-ins in one message."""
+    try:
+        batch = protocol.decode_batch(payload)
+    except ValueError as e:
+        print(f"[MQTT] Gateway {floor}: {e}, ignoring")
+        return
+    print(f"[MQTT] Gateway {floor}: {len(batch.ir)} IR update(s), {len(batch.checkins)} check-in(s)")
+    if batch.ir:
+        lifecycle.track(asyncio.run_coroutine_threadsafe(_handle_ir_batch(batch.ir), loop))
+    for seat_id, pin_code in batch.checkins:
+        # A batch redelivered at QoS 1 repeats its check-ins; _handle_checkin_message
+        # drops those that were already accepted.
+        future = asyncio.run_coroutine_threadsafe(_handle_checkin_message(seat_id, pin_code), loop)
+        lifecycle.track(future)
 
 
 async def _handle_checkin_message(seat_id: str, pin_code: str) -> None:
     """Handle PIN check-in sent from the physical keypad over MQTT."""
+    if _is_repeat_pin(seat_id, pin_code):
+        print(f"[MQTT] Check-in: seat {seat_id} repeated an accepted PIN (duplicate, ignored)")
+        return
+    _pins_in_flight.add((seat_id, pin_code))
+    try:
+        if await _check_in(seat_id, pin_code):
+            _accepted_pins.set((seat_id, pin_code), True)
+    finally:
+        _pins_in_flight.discard((seat_id, pin_code))
+
+
+async def _check_in(seat_id: str, pin_code: str) -> bool:
+    """True if the PIN checked the student in."""
     seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
     if seat is None:
         print(f"[MQTT] Check-in: unknown seat {seat_id}")
-        return
+        return False
 
     if seat.status != "awaiting_checkin":
         print(f"[MQTT] Check-in: seat {seat_id} not awaiting check-in (status={seat.status})")
-        return
+        return False
 
-    now = datetime.now(timezone.utc)
-    current_slot = int((now.hour * 60 + now.minute) / 30)
+    current_slot = now_slot()
     booking = await BookingDocument.find_one(
         BookingDocument.seat_id == seat_id,
         BookingDocument.status == "confirmed",
@@ -62,12 +163,19 @@ async def _handle_checkin_message(seat_id: str, pin_code: str) -> None:
 
     if booking is None or not verify_pin(pin_code, booking.pin_code_hash):
         print(f"[MQTT] Check-in: incorrect PIN for seat {seat_id}")
-        return
+        return False
 
-    seat.status = "occupied"
-    await seat.save()
+    # Only status: a full save would write back today_bookings as read above.
+    result = await SeatDocument.get_motor_collection().update_one(
+        {"seat_id": seat_id, "status": "awaiting_checkin"}, {"$set": {"status": "occupied"}},
+    )
+    if result.matched_count == 0:
+        print(f"[MQTT] Check-in: seat {seat_id} stopped awaiting check-in")
+        return False
+    await seat_log.record(seat_id, "checked_in", {"status": "occupied"}, booking_id=booking.booking_id)
     publish_booking_status(seat_id, "occupied")
     print(f"[MQTT] Check-in: seat {seat_id} now occupied")
+    return True
 
 
 async def _handle_ir_update(seat_id: str, payload: str) -> None:
@@ -84,6 +192,41 @@ async def _handle_ir_update(seat_id: str, payload: str) -> None:
         print(f"[MQTT] IR: unknown seat {seat_id}")
         return
 
+    previous = seat.physical_status
     seat.physical_status = "occupied" if payload == "occupied" else "free"
-    await seat.save()
+    await SeatDocument.get_motor_collection().update_one(
+        {"seat_id": seat_id}, {"$set": {"physical_status": seat.physical_status}},
+    )
+    if seat.physical_status != previous:
+        await seat_log.record(seat_id, "ir_changed", {"physical_status": seat.physical_status})
     print(f"[MQTT] Seat {seat_id} physical_status → {seat.physical_status}")
+
+
+async def _handle_ir_batch(readings: dict[str, str]) -> None:
+    """_handle_ir_update for many seats at once: one read, one bulk write and
+    one log append for the seats whose physical_status actually changed."""
+    seats = SeatDocument.get_motor_collection()
+    current = {
+        d["seat_id"]: d.get("physical_status", "free")
+        async for d in seats.find(
+            {"seat_id": {"$in": list(readings)}}, {"_id": 0, "seat_id": 1, "physical_status": 1}
+        )
+    }
+    changed = {
+        seat_id: status for seat_id, status in readings.items()
+        if seat_id in current and current[seat_id] != status
+    }
+    for seat_id in readings.keys() - current.keys():
+        print(f"[MQTT] IR: unknown seat {seat_id}")
+    if not changed:
+        return
+    await seats.bulk_write(
+        [UpdateOne({"seat_id": seat_id}, {"$set": {"physical_status": status}})
+         for seat_id, status in changed.items()],
+        ordered=False,
+    )
+    await seat_log.append(
+        seat_log.event(seat_id, "ir_changed", {"physical_status": status})
+        for seat_id, status in changed.items()
+    )
+    print(f"[MQTT] physical_status changed on {len(changed)} seat(s)")
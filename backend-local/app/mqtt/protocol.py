@@ -0,0 +1,165 @@
+"""Seat device wire formats: the original text protocol and a compact binary one.
+
+Text (the default, what existing desks speak):
+
+    library/seat/{seatId}/booking_status   "free" | "reserved" | ... (backend → desk)
+    library/seat/{seatId}/ir               "occupied" | "free"       (desk → backend)
+    library/seat/{seatId}/check-in         "1234"                    (desk → backend)
+
+Binary, for large fleets on small MCUs: shorter topics and fixed-size
+big-endian frames, so a device never parses strings.
+
+    ls/{seatId}/s   status frame   version:u8 status:u8 seq:u16 ts:u32   (8 bytes)
+    ls/{seatId}/i   status frame   (status is free or occupied)
+    ls/{seatId}/c   check-in frame version:u8 pin:u16 seq:u16 ts:u32     (9 bytes)
+
+Floor gateways (hardware/python/gateway.py) sit between a floor's desks and
+the cloud broker and forward their debounced traffic in one message:
+
+    library/gateway/{floor}/batch  JSON  {"ir": {seatId: "occupied" | "free"},
+                                          "checkins": [[seatId, "1234"], ...]}
+
+`seq` is a per-sender counter that wraps at 65536 and `ts` the sender's Unix
+time in seconds. The backend uses (ts, seq) to drop redelivered and reordered
+device frames; a device that reboots restarts seq at 0 but its ts moves on.
+Desks only compare ts, because status frames may come from several backend
+instances, each with its own seq. The version byte is 0x81, which can never
+start a UTF-8 string, so a frame sent to a text topic by mistake is rejected
+instead of misread.
+"""
+import itertools
+import json
+import struct
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+VERSION = 0x81
+
+STATUSES = ("free", "reserved", "upcoming", "awaiting_checkin", "occupied")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+_STATUS_FRAME = struct.Struct("!BBHI")
+_CHECKIN_FRAME = struct.Struct("!BHHI")
+
+TEXT_PREFIX = "library/seat/"
+BINARY_PREFIX = "ls/"
+GATEWAY_PREFIX = "library/gateway/"
+
+# Inbound topic → (message kind, binary?), keyed by the topic levels around
+# the seat id. Built once; on_message does one split and one dict lookup per
+# message instead of a chain of prefix/suffix tests.
+_ROUTES = {
+    ("library", "seat", "ir"): ("ir", False),
+    ("library", "seat", "check-in"): ("check-in", False),
+    ("ls", "i"): ("ir", True),
+    ("ls", "c"): ("check-in", True),
+    ("library", "gateway", "batch"): ("batch", False),
+}
+
+
+class Route(NamedTuple):
+    seat_id: str  # the floor, for gateway batches
+    kind: str  # "ir" | "check-in" | "batch"
+    binary: bool
+
+
+class Frame(NamedTuple):
+    value: str  # status name, or the PIN for check-ins
+    seq: int
+    ts: int
+
+
+@lru_cache(maxsize=65_536)
+def route(topic: str) -> Route | None:
+    """Parsed once per distinct topic: a fleet only ever uses two inbound
+    topics per seat, so after warm-up this is a cache hit."""
+    levels = topic.split("/")
+    if len(levels) < 3:
+        return None
+    target = _ROUTES.get((*levels[:-2], levels[-1]))
+    if target is None:
+        return None
+    return Route(levels[-2], *target)
+
+
+def subscriptions(shared_group: str = "") -> list[str]:
+    """Backend ingest topic filters. With a group name these become
+    $share/{group}/... so the broker splits messages across every backend
+    instance in the group instead of sending each one to all of them."""
+    filters = [
+        f"{TEXT_PREFIX}+/ir",
+        f"{TEXT_PREFIX}+/check-in",
+        f"{BINARY_PREFIX}+/i",
+        f"{BINARY_PREFIX}+/c",
+        f"{GATEWAY_PREFIX}+/batch",
+    ]
+    if shared_group:
+        return [f"$share/{shared_group}/{f}" for f in filters]
+    return filters
+
+
+def status_topic(seat_id: str, binary: bool = False) -> str:
+    if binary:
+        return f"{BINARY_PREFIX}{seat_id}/s"
+    return f"{TEXT_PREFIX}{seat_id}/booking_status"
+
+
+_seq = itertools.count()
+
+
+def encode_status(status: str, seq: int | None = None, ts: int | None = None) -> bytes:
+    return _STATUS_FRAME.pack(
+        VERSION,
+        STATUS_CODES[status],
+        (next(_seq) if seq is None else seq) & 0xFFFF,
+        int(time.time()) if ts is None else ts,
+    )
+
+
+def decode_status(payload: bytes) -> Frame:
+    """Raises ValueError on a malformed frame."""
+    if len(payload) != _STATUS_FRAME.size or payload[0] != VERSION:
+        raise ValueError(f"bad status frame {payload!r}")
+    _, code, seq, ts = _STATUS_FRAME.unpack(payload)
+    if code >= len(STATUSES):
+        raise ValueError(f"unknown status code {code}")
+    return Frame(STATUSES[code], seq, ts)
+
+
+def decode_checkin(payload: bytes) -> Frame:
+    if len(payload) != _CHECKIN_FRAME.size or payload[0] != VERSION:
+        raise ValueError(f"bad check-in frame {payload!r}")
+    _, pin, seq, ts = _CHECKIN_FRAME.unpack(payload)
+    if pin > 9999:
+        raise ValueError(f"PIN out of range: {pin}")
+    return Frame(f"{pin:04d}", seq, ts)
+
+
+class Batch(NamedTuple):
+    ir: dict[str, str]  # seat id → "occupied" | "free", latest reading only
+    checkins: list[tuple[str, str]]  # (seat id, PIN), in the order typed
+
+
+def decode_batch(payload: bytes) -> Batch:
+    """Raises ValueError on anything but a well-formed gateway batch."""
+    try:
+        data = json.loads(payload)
+        ir = data.get("ir", {})
+        checkins = [(str(seat_id), str(pin)) for seat_id, pin in data.get("checkins", [])]
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"bad gateway batch: {e}") from None
+    if not isinstance(ir, dict) or any(v not in ("occupied", "free") for v in ir.values()):
+        raise ValueError("bad gateway batch: ir must map seat ids to 'occupied' or 'free'")
+    return Batch({str(k): v for k, v in ir.items()}, checkins)
+
+
+def is_newer(frame: Frame, last: tuple[int, int] | None) -> bool:
+    """Whether `frame` comes after the last accepted (ts, seq) from its sender.
+    Same second: seq decides, modulo wrap-around (up to 32767 ahead = newer)."""
+    if last is None:
+        return True
+    last_ts, last_seq = last
+    if frame.ts != last_ts:
+        return frame.ts > last_ts
+    return 0 < ((frame.seq - last_seq) & 0xFFFF) < 0x8000
@@ -0,0 +1,80 @@
+"""MongoDB connection-pool metrics, for sizing MONGO_MAX_POOL_SIZE.
+
+A pymongo ConnectionPoolListener attached to the one client in
+app/database.py. pymongo reports how long each checkout waited for a free
+connection. Here that is kept as counters plus a window of recent wait times,
+and the results are exposed as gauges on GET /metrics:
+
+  mongo_pool_checked_out      connections lent out right now
+  mongo_pool_open             connections open (idle + checked out)
+  mongo_pool_wait_ms_p50/p99/max  checkout wait over the last WAIT_WINDOW checkouts
+
+If the wait percentiles grow while checked_out sits at maxPoolSize, the pool
+is the bottleneck. Failed checkouts (e.g. waitQueueTimeoutMS hit) are counted
+per reason.
+
+pymongo calls the listener from whatever thread is using the pool, so each
+callback only does a single increment or append.
+"""
+from collections import deque
+
+from pymongo import monitoring
+
+from app import metrics
+
+WAIT_WINDOW = 2048
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.checked_out = 0
+        self.open = 0
+        self._waits_ms: deque[float] = deque(maxlen=WAIT_WINDOW)
+        metrics.register_gauge("mongo_pool_checked_out", lambda: self.checked_out)
+        metrics.register_gauge("mongo_pool_open", lambda: self.open)
+        metrics.register_gauge("mongo_pool_wait_ms_p50", lambda: self._wait_percentile(0.50))
+        metrics.register_gauge("mongo_pool_wait_ms_p99", lambda: self._wait_percentile(0.99))
+        metrics.register_gauge("mongo_pool_wait_ms_max", lambda: self._wait_percentile(1.0))
+
+    def _wait_percentile(self, p: float) -> float:
+        waits = sorted(self._waits_ms)
+        if not waits:
+            return 0.0
+        return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+        metrics.inc("mongo_pool_checkouts")
+        self._waits_ms.append(event.duration * 1000)
+
+    def connection_check_out_failed(self, event):
+        metrics.inc(f"mongo_pool_checkout_failed_{event.reason}")
+        self._waits_ms.append(event.duration * 1000)
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+
+    def pool_cleared(self, event):
+        metrics.inc("mongo_pool_cleared")
+
+    # Not needed for the metrics above.
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
@@ -0,0 +1,51 @@
+"""In-process live-update fan-out.
+
+Anything that wants to tell connected browsers about a change calls
+publish(event); every GET /events stream (app/routers/events.py) gets its own
+bounded queue. A slow client loses its oldest events rather than holding up
+the publisher or growing without bound. When the instance drains,
+close_all() ends every stream (and any opened afterwards) so browsers
+reconnect elsewhere.
+"""
+import asyncio
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+_subscribers: set[asyncio.Queue] = set()
+_closed = False
+
+
+def subscribe() -> asyncio.Queue:
+    """A queue of events; None means the stream should end."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    if _closed:
+        queue.put_nowait(None)
+    else:
+        _subscribers.add(queue)
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue) -> None:
+    _subscribers.discard(queue)
+
+
+def publish(event: dict) -> None:
+    """Queue `event` for every subscriber. Must be called on the event loop thread."""
+    for queue in _subscribers:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+def close_all() -> None:
+    global _closed
+    _closed = True
+    for queue in _subscribers:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+    _subscribers.clear()
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
@@ -0,0 +1,38 @@
+"""Tracks which subsystems have finished starting up.
+
+The API begins serving as soon as the process starts; the database, MQTT
+broker and scheduler come up in the background and flip their flag here.
+GET /ready reports this table so a load balancer only routes traffic once
+every dependency is live. On shutdown the instance starts draining (see
+app/lifecycle.py) and reports not-ready again, so the balancer moves
+traffic away before it stops.
+"""
+
+_subsystems: dict[str, bool] = {
+    "database": False,
+    "mqtt": False,
+    "scheduler": False,
+}
+
+_draining = False
+
+
+def mark(name: str, ready: bool = True) -> None:
+    _subsystems[name] = ready
+
+
+def snapshot() -> dict[str, bool]:
+    return dict(_subsystems)
+
+
+def start_draining() -> None:
+    global _draining
+    _draining = True
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def is_ready() -> bool:
+    return not _draining and all(_subsystems.values())
@@ -0,0 +1,128 @@
+"""Fast path from stored documents to response bytes.
+
+Routes used to go document → Beanie model → *Out schema → model_dump() →
+ApiResponse → FastAPI validation → json.dumps. For list endpoints that chain
+dominated CPU time. Here raw Mongo documents are mapped straight to the
+camelCase dicts of the API contract and encoded once with orjson.
+
+The output is byte-for-byte what Starlette's JSONResponse produced before
+(compact separators, UTF-8, same key order); the Pydantic schemas in
+app/schemas stay the source of truth for the contract and the OpenAPI docs.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+# Only the fields the API exposes are pulled from Mongo.
+SEAT_PROJECTION = {
+    "_id": 0, "seat_id": 1, "status": 1, "physical_status": 1,
+    "next_booking_start_time": 1, "today_bookings": 1,
+}
+BOOKING_PROJECTION = {
+    "_id": 0, "booking_id": 1, "seat_id": 1, "student_id": 1,
+    "start_slot": 1, "end_slot": 1, "created_at": 1, "status": 1,
+}
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def api_response(success: bool, message: str, data: Any = None, status_code: int = 200) -> ORJSONResponse:
+    """The universal {success, message, data} envelope, see ApiResponse."""
+    return ORJSONResponse(
+        status_code=status_code,
+        content={"success": success, "message": message, "data": data},
+    )
+
+
+def _iso(value) -> str | None:
+    return value.isoformat() if value else None
+
+
+def seat_out(doc: dict) -> dict:
+    """Raw `seats` document → SeatOut JSON shape. Defaults mirror SeatDocument."""
+    return {
+        "seatId": doc["seat_id"],
+        "status": doc.get("status", "free"),
+        "physicalStatus": doc.get("physical_status", "free"),
+        "nextBookingStartTime": _iso(doc.get("next_booking_start_time")),
+        "todayBookings": [
+            {"startSlot": b["start_slot"], "endSlot": b["end_slot"]}
+            for b in doc.get("today_bookings") or ()
+        ],
+    }
+
+
+def booking_out(doc: dict) -> dict:
+    """Raw `bookings` document → BookingOut JSON shape."""
+    return {
+        "bookingId": doc["booking_id"],
+        "seatId": doc["seat_id"],
+        "studentId": doc["student_id"],
+        "startSlot": doc["start_slot"],
+        "endSlot": doc["end_slot"],
+        "createdAt": doc["created_at"].isoformat(),
+        "status": doc.get("status", "confirmed"),
+    }
+
+
+def student_booking_out(doc: dict) -> dict:
+    """Raw `bookings` document → StudentBookingOut JSON shape."""
+    return {
+        "bookingId": doc["booking_id"],
+        "seatId": doc["seat_id"],
+        "startSlot": doc["start_slot"],
+        "endSlot": doc["end_slot"],
+        "status": doc.get("status", "confirmed"),
+    }
+
+
+def waitlist_out(doc: dict) -> dict:
+    """Raw `waitlist` document → WaitlistOut JSON shape."""
+    return {
+        "requestId": doc["request_id"],
+        "studentId": doc["student_id"],
+        "startSlot": doc["start_slot"],
+        "endSlot": doc["end_slot"],
+        "createdAt": doc["created_at"].isoformat(),
+        "status": doc.get("status", "waiting"),
+        "bookingId": doc.get("booking_id"),
+    }
+
+
+def recurring_out(doc: dict) -> dict:
+    """Raw `recurring_bookings` document → RecurringBookingOut JSON shape."""
+    return {
+        "ruleId": doc["rule_id"],
+        "seatId": doc["seat_id"],
+        "studentId": doc["student_id"],
+        "weekdays": [d for d in range(7) if doc["weekdays"] >> d & 1],
+        "startSlot": doc["start_slot"],
+        "endSlot": doc["end_slot"],
+        "startDate": doc["start_date"],
+        "endDate": doc["end_date"],
+        "exceptions": doc.get("exceptions", []),
+        "createdAt": doc["created_at"].isoformat(),
+        "status": doc.get("status", "active"),
+    }
+
+
+def block_out(doc: dict) -> dict:
+    """Raw `seat_blocks` document → SeatBlockOut JSON shape."""
+    return {
+        "blockId": doc["block_id"],
+        "seatIds": doc["seat_ids"],
+        "zone": doc.get("zone"),
+        "startSlot": doc["start_slot"],
+        "endSlot": doc["end_slot"],
+        "startDate": doc["start_date"],
+        "endDate": doc["end_date"],
+        "reason": doc.get("reason", ""),
+        "createdAt": doc["created_at"].isoformat(),
+        "status": doc.get("status", "active"),
+    }
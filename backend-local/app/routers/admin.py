@@ -0,0 +1,152 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header
+from app.allocation.autoassign import zone_of
+from app.allocation.displace import displace_bookings
+from app.config import get_settings
+from app.models.block import SeatBlockDocument
+from app.models.seat import SeatDocument
+from app.schemas.admin import BulkBookingRequest, SeatBlockOut, SeatBlockRequest, SeatSelection
+from app.schemas.common import ApiResponse
+from app.responses import api_response, block_out
+from app.utils.ids import new_block_id
+from app.utils.slots import SLOTS_PER_DAY, slot_clock
+
+router = APIRouter()
+
+
+def _denied(token: Optional[str]):
+    """None if `token` is the configured admin token, else the error response."""
+    expected = get_settings().admin_token
+    if not expected:
+        return api_response(False, "Admin API is disabled (ADMIN_TOKEN is not set)", status_code=403)
+    if token is None or not hmac.compare_digest(token.encode(), expected.encode()):
+        return api_response(False, "Invalid admin token", status_code=403)
+    return None
+
+
+async def _select_seats(req: SeatSelection):
+    """(seat ids, None) or (None, error response)."""
+    if not 0 <= req.start_slot < req.end_slot <= SLOTS_PER_DAY:
+        return None, api_response(
+            False,
+            "startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
+            status_code=422,
+        )
+    if not req.seat_ids and not req.zone:
+        return None, api_response(False, "Give seatIds, a zone, or both", status_code=422)
+
+    query = {} if req.zone else {"seat_id": {"$in": req.seat_ids}}
+    zones = {
+        d["seat_id"]: zone_of(d["seat_id"], d.get("zone"))
+        async for d in SeatDocument.get_motor_collection().find(query, {"_id": 0, "seat_id": 1, "zone": 1})
+    }
+    missing = [s for s in req.seat_ids if s not in zones]
+    if missing:
+        return None, api_response(False, f"Seat(s) {', '.join(missing)} not found", status_code=404)
+    selected = list(dict.fromkeys(
+        req.seat_ids + [seat_id for seat_id, zone in zones.items() if req.zone and zone == req.zone]
+    ))
+    if not selected:
+        return None, api_response(False, f"No seats in zone {req.zone}", status_code=404)
+    return selected, None
+
+
+def _summary(displaced: dict) -> str:
+    return f"{len(displaced['moved'])} booking(s) moved, {len(displaced['cancelled'])} cancelled"
+
+
+@router.post("/admin/blocks", status_code=201)
+async def create_block(req: SeatBlockRequest, admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Close seats (by id or zone) for a slot window over a range of days.
+    Today's affected bookings are moved to other seats or cancelled, in bulk."""
+    if denied := _denied(admin_token):
+        return denied
+    seat_ids, error = await _select_seats(req)
+    if error:
+        return error
+
+    today = slot_clock.today()
+    start_date = req.start_date or today
+    end_date = req.end_date or start_date
+    if start_date < today or end_date < start_date:
+        return api_response(False, "Need today <= startDate <= endDate", status_code=422)
+
+    block = SeatBlockDocument(
+        block_id=new_block_id(),
+        seat_ids=seat_ids,
+        zone=req.zone,
+        start_slot=req.start_slot,
+        end_slot=req.end_slot,
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
+        reason=req.reason,
+        created_at=slot_clock.now(),
+    )
+    # Stored first, so bookings arriving meanwhile are already refused.
+    await block.insert()
+    displaced = {"moved": [], "cancelled": []}
+    if start_date == today:
+        displaced = await displace_bookings(
+            seat_ids, req.start_slot, req.end_slot, req.action == "relocate", req.reason
+        )
+
+    doc = block.model_dump(exclude={"id", "revision_id"})
+    return api_response(
+        True,
+        f"{len(seat_ids)} seat(s) closed; {_summary(displaced)}",
+        {"block": block_out(doc), **displaced},
+        status_code=201,
+    )
+
+
+@router.get("/admin/blocks", response_model=ApiResponse[list[SeatBlockOut]])
+async def get_blocks(admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Active blocks that haven't ended."""
+    if denied := _denied(admin_token):
+        return denied
+    docs = await SeatBlockDocument.get_motor_collection().find(
+        {"status": "active", "end_date": {"$gte": slot_clock.today().isoformat()}}, {"_id": 0}
+    ).sort("start_date", 1).to_list(None)
+    return api_response(True, f"Found {len(docs)} active block(s)", [block_out(d) for d in docs])
+
+
+@router.post("/admin/blocks/{block_id}/lift")
+async def lift_block(block_id: str, admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Reopen the seats. Bookings already cancelled by the block stay cancelled."""
+    if denied := _denied(admin_token):
+        return denied
+    block = await SeatBlockDocument.find_one(SeatBlockDocument.block_id == block_id)
+    if block is None:
+        return api_response(False, f"Block {block_id} not found", status_code=404)
+    if block.status != "active":
+        return api_response(False, f"Block {block_id} is already {block.status}", status_code=409)
+    block.status = "lifted"
+    await block.save()
+    return api_response(True, f"Block {block_id} lifted", {"blockId": block_id, "status": "lifted"})
+
+
+@router.post("/admin/bookings/cancel")
+async def bulk_cancel(req: BulkBookingRequest, admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Cancel every booking on the seats that overlaps the window today."""
+    if denied := _denied(admin_token):
+        return denied
+    seat_ids, error = await _select_seats(req)
+    if error:
+        return error
+    displaced = await displace_bookings(seat_ids, req.start_slot, req.end_slot, False, req.reason)
+    return api_response(True, _summary(displaced), displaced)
+
+
+@router.post("/admin/bookings/reschedule")
+async def bulk_reschedule(req: BulkBookingRequest, admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Move every booking on the seats that overlaps the window today to an
+    equivalent free seat; those that can't be moved are cancelled. The seats
+    are not closed: use POST /admin/blocks for that."""
+    if denied := _denied(admin_token):
+        return denied
+    seat_ids, error = await _select_seats(req)
+    if error:
+        return error
+    displaced = await displace_bookings(seat_ids, req.start_slot, req.end_slot, True, req.reason)
+    return api_response(True, _summary(displaced), displaced)
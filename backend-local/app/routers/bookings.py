@@ -1,234 +1,180 @@
-import uuid
-from datetime import datetime, timezone
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-from app.models.seat import SeatDocument, TimeSlotEmbed
+from typing import Optional
+from fastapi import APIRouter, Header
+from app.database import read_collection
+from app.models.seat import SeatDocument
 from app.models.booking import BookingDocument
-from app.schemas.booking import BookingRequest, BookingOut, StudentBookingOut, CancelBookingRequest
-from app.schemas.common import ApiResponse
-from app.scheduler.pool import (
-    schedule_booking_upcoming,
-    schedule_booking_activation,
-    schedule_booking_timeout,
-    schedule_booking_checkin_timeout,
-    cancel_booking_jobs,
+from app.cache.students import student_bookings
+from app.schemas.booking import AutoBookingRequest, BookingRequest, CancelBookingRequest
+from app.responses import (
+    BOOKING_PROJECTION,
+    api_response,
+    booking_out,
+    student_booking_out,
 )
-from app.mqtt.client import publish_booking_status
-from app.utils.slots import hash_pin, verify_pin, slot_to_datetime, slots_overlap
+from app.allocation.autoassign import seat_timelines
+from app.allocation.blocks import closed_seats
+from app.allocation.booking import book_seat, release_booking, seat_conflict
+from app.utils.idempotency import idempotent
+from app.utils.slots import SLOTS_PER_DAY, hash_pin, verify_pin, slot_clock
 
 router = APIRouter()
 
 
-def _booking_to_out(b: BookingDocument) -> dict:
-    return BookingOut(
-        booking_id=b.booking_id,
-        seat_id=b.seat_id,
-        student_id=b.student_id,
-        start_slot=b.start_slot,
-        end_slot=b.end_slot,
-        created_at=b.created_at.isoformat(),
-        status=b.status,
-    ).model_dump(by_alias=True)
+@router.post("/bookings", status_code=201)
+async def create_booking(
+    req: BookingRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    # A retried POST with the same key replays the first response instead of
+    # booking twice (see app/utils/idempotency.py).
+    return await idempotent(
+        idempotency_key, "POST /bookings", req.model_dump_json().encode(),
+        lambda: _create_booking(req),
+    )
 
 
-@router.post("/bookings", status_code=201)
-async def create_booking(req: BookingRequest):
+async def _create_booking(req: BookingRequest):
     if req.start_slot >= req.end_slot:
-        return JSONResponse(
+        return api_response(
+            False,
+            "startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
             status_code=422,
-            content=ApiResponse(
-                success=False,
-                message="startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
-                data=None,
-            ).model_dump(),
         )
 
-    now = datetime.now(timezone.utc)
-    now_slot = int((now.hour * 60 + now.minute) / 30)
+    now = slot_clock.now()
+    now_slot = slot_clock.datetime_to_slot(now)
     if req.start_slot <= now_slot:
-        return JSONResponse(
-            status_code=422,
-            content=ApiResponse(
-                success=False,
-                message="Cannot book a time slot that has already started or passed",
-                data=None,
-            ).model_dump(),
+        return api_response(
+            False, "Cannot book a time slot that has already started or passed", status_code=422
         )
 
     seat = await SeatDocument.find_one(SeatDocument.seat_id == req.seat_id)
     if seat is None:
-        return JSONResponse(
-            status_code=404,
-            content=ApiResponse(
-                success=False, message=f"Seat {req.seat_id} not found", data=None
-            ).model_dump(),
+        return api_response(False, f"Seat {req.seat_id} not found", status_code=404)
+
+    if seat_conflict(seat, req.start_slot, req.end_slot, now_slot):
+        return api_response(
+            False, f"Seat {req.seat_id} is already booked during that period", status_code=409
+        )
+    if seat.seat_id in await closed_seats(req.start_slot, req.end_slot):
+        return api_response(
+            False, f"Seat {req.seat_id} is closed during that period", status_code=409
         )
 
-    for existing in seat.today_bookings:
-        if slots_overlap(req.start_slot, req.end_slot, existing.start_slot, existing.end_slot):
-            return JSONResponse(
-                status_code=409,
-                content=ApiResponse(
-                    success=False,
-                    message=f"Seat {req.seat_id} is already booked during that period",
-                    data=None,
-                ).model_dump(),
-            )
+    booking = await book_seat(
+        seat, req.student_id, req.start_slot, req.end_slot, hash_pin(req.pin_code), now
+    )
+    if booking is None:
+        return api_response(
+            False, f"Seat {req.seat_id} is already booked during that period", status_code=409
+        )
+    if not isinstance(booking, BookingDocument):
+        return booking
+    return api_response(
+        True, "Booking created successfully", booking_out(booking.model_dump()), status_code=201
+    )
+
+
+@router.post("/bookings/auto", status_code=201)
+async def create_auto_booking(
+    req: AutoBookingRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """Book whichever seat (optionally within a zone) the request fits best,
+    so that seats' day plans stay in long, bookable runs."""
+    return await idempotent(
+        idempotency_key, "POST /bookings/auto", req.model_dump_json().encode(),
+        lambda: _create_auto_booking(req),
+    )
+
+
+async def _create_auto_booking(req: AutoBookingRequest):
+    if not 0 <= req.start_slot < req.end_slot <= SLOTS_PER_DAY:
+        return api_response(
+            False,
+            "startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
+            status_code=422,
+        )
 
-    # Physical occupancy: if someone is detected at the seat, block bookings from
-    # now until the end of the nearest upcoming/active booking period.
-    # If no bookings exist today, the entire rest of the day is blocked.
-    if seat.physical_status == "occupied":
-        future_bookings = sorted(
-            [b for b in seat.today_bookings if b.end_slot > now_slot],
-            key=lambda b: b.start_slot,
+    now = slot_clock.now()
+    now_slot = slot_clock.datetime_to_slot(now)
+    if req.start_slot <= now_slot:
+        return api_response(
+            False, "Cannot book a time slot that has already started or passed", status_code=422
         )
-        blocked_end = future_bookings[0].end_slot if future_bookings else 48
-        if slots_overlap(req.start_slot, req.end_slot, now_slot + 1, blocked_end):
-            return JSONResponse(
-                status_code=409,
-                content=ApiResponse(
-                    success=False,
-                    message=f"Seat {req.seat_id} is already booked during that period",
-                    data=None,
-                ).model_dump(),
+
+    # The in-memory timelines rank the seats; each candidate is re-checked
+    # against its document, and book_seat claims it only if it is still free,
+    # since another request may have just taken it. Tried seats are excluded
+    # and the rest re-ranked until no candidate is left.
+    pin_code_hash = hash_pin(req.pin_code)
+    tried = await closed_seats(req.start_slot, req.end_slot)
+    while candidates := seat_timelines.rank(
+        req.start_slot, req.end_slot, now_slot, req.zone, exclude=tried
+    ):
+        for seat_id in candidates:
+            tried.add(seat_id)
+            seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
+            if seat is None or seat_conflict(seat, req.start_slot, req.end_slot, now_slot):
+                continue
+            booking = await book_seat(seat, req.student_id, req.start_slot, req.end_slot, pin_code_hash, now)
+            if booking is None:
+                continue  # taken in the meantime: try the next candidate
+            if not isinstance(booking, BookingDocument):
+                return booking
+            return api_response(
+                True, f"Seat {seat_id} booked", booking_out(booking.model_dump()), status_code=201
             )
 
-    booking_id = f"BK{uuid.uuid4().hex[:6].upper()}"
-    booking = BookingDocument(
-        booking_id=booking_id,
-        seat_id=req.seat_id,
-        student_id=req.student_id,
-        start_slot=req.start_slot,
-        end_slot=req.end_slot,
-        pin_code_hash=hash_pin(req.pin_code),
-        created_at=now,
-        status="confirmed",
-    )
-    await booking.insert()
-
-    seat.today_bookings.append(TimeSlotEmbed(start_slot=req.start_slot, end_slot=req.end_slot))
-    seat.today_bookings.sort(key=lambda x: x.start_slot)
-
-    # next_booking_start_time = earliest future booking's start time (ISO 8601 for hardware)
-    upcoming = [b for b in seat.today_bookings if b.start_slot > now_slot]
-    seat.next_booking_start_time = slot_to_datetime(upcoming[0].start_slot) if upcoming else None
-
-    if seat.status == "free":
-        seat.status = "reserved"
-    await seat.save()
-
-    start_dt = slot_to_datetime(req.start_slot)
-    end_dt = slot_to_datetime(req.end_slot)
-    schedule_booking_upcoming(booking_id, req.seat_id, start_dt)
-    schedule_booking_activation(booking_id, req.seat_id, start_dt)
-    schedule_booking_checkin_timeout(booking_id, req.seat_id, start_dt)
-    schedule_booking_timeout(booking_id, req.seat_id, end_dt)
-
-    return JSONResponse(
-        status_code=201,
-        content=ApiResponse(
-            success=True,
-            message="Booking created successfully",
-            data=_booking_to_out(booking),
-        ).model_dump(),
-    )
+    where = f" in zone {req.zone}" if req.zone else ""
+    return api_response(False, f"No seat{where} is free for that period", status_code=409)
 
 
 @router.get("/bookings")
 async def get_bookings():
-    bookings = await BookingDocument.find_all().to_list()
-    return ApiResponse(
-        success=True,
-        message="Bookings fetched successfully",
-        data=[_booking_to_out(b) for b in bookings],
-    )
+    docs = await read_collection(BookingDocument).find({}, BOOKING_PROJECTION).to_list(None)
+    return api_response(True, "Bookings fetched successfully", [booking_out(d) for d in docs])
 
 
 @router.get("/bookings/student/{student_id}")
 async def get_student_bookings(student_id: str):
-    bookings = await BookingDocument.find(
-        BookingDocument.student_id == student_id,
-        BookingDocument.status == "confirmed",
-    ).to_list()
-    data = [
-        StudentBookingOut(
-            booking_id=b.booking_id,
-            seat_id=b.seat_id,
-            start_slot=b.start_slot,
-            end_slot=b.end_slot,
-            status=b.status,
-        ).model_dump(by_alias=True)
-        for b in bookings
-    ]
+    data = student_bookings.get(student_id)
+    if data is None:
+        docs = await BookingDocument.get_motor_collection().find(
+            {"student_id": student_id, "status": "confirmed"}, BOOKING_PROJECTION
+        ).to_list(None)
+        data = [student_booking_out(d) for d in docs]
+        student_bookings.fill(student_id, data)
     count = len(data)
     message = (
         f"Found {count} booking(s) for {student_id}"
         if count > 0
         else f"No active bookings for {student_id}"
     )
-    return ApiResponse(success=True, message=message, data=data)
+    return api_response(True, message, data)
 
 
 @router.post("/bookings/cancel")
 async def cancel_booking(req: CancelBookingRequest):
     booking = await BookingDocument.find_one(BookingDocument.booking_id == req.booking_id)
     if booking is None:
-        return JSONResponse(
-            status_code=404,
-            content=ApiResponse(
-                success=False, message=f"Booking {req.booking_id} not found", data=None
-            ).model_dump(),
-        )
+        return api_response(False, f"Booking {req.booking_id} not found", status_code=404)
 
     if booking.student_id != req.student_id:
-        return JSONResponse(
-            status_code=403,
-            content=ApiResponse(
-                success=False, message="Student ID does not match this booking", data=None
-            ).model_dump(),
-        )
+        return api_response(False, "Student ID does not match this booking", status_code=403)
 
     if not verify_pin(req.pin_code, booking.pin_code_hash):
-        return JSONResponse(
-            status_code=403,
-            content=ApiResponse(
-                success=False, message="Incorrect PIN", data=None
-            ).model_dump(),
-        )
-
-    # Cancel all scheduler jobs for this booking
-    cancel_booking_jobs(req.booking_id)
-
-    # Hard-delete the booking document
-    await booking.delete()
+        return api_response(False, "Incorrect PIN", status_code=403)
 
-    # Update the seat: remove slot, recompute status and next_booking_start_time
-    seat = await SeatDocument.find_one(SeatDocument.seat_id == booking.seat_id)
-    if seat:
-        seat.today_bookings = [
-            b for b in seat.today_bookings
-            if not (b.start_slot == booking.start_slot and b.end_slot == booking.end_slot)
-        ]
-        now = datetime.now(timezone.utc)
-        now_slot = int((now.hour * 60 + now.minute) / 30)
-
-        is_active = booking.start_slot <= now_slot < booking.end_slot
-        remaining_future = [b for b in seat.today_bookings if b.end_slot > now_slot]
-        remaining_upcoming = [b for b in seat.today_bookings if b.start_slot > now_slot]
-
-        seat.next_booking_start_time = (
-            slot_to_datetime(remaining_upcoming[0].start_slot) if remaining_upcoming else None
+    if booking.status != "confirmed":
+        return api_response(
+            False, f"Booking {req.booking_id} is {booking.status}, not confirmed", status_code=409,
         )
-        # Free the seat if no future bookings remain, or if this was the currently-active booking
-        if not remaining_future or (is_active and seat.status in ("awaiting_checkin", "occupied")):
-            seat.status = "free"
-        await seat.save()
 
-        publish_booking_status(booking.seat_id, seat.status)
-
-    return ApiResponse(
-        success=True,
-        message=f"Booking {req.booking_id} cancelled successfully",
-        data={"bookingId": req.booking_id, "status": "cancelled"},
+    await release_booking(booking)
+    return api_response(
+        True,
+        f"Booking {req.booking_id} cancelled successfully",
+        {"bookingId": req.booking_id, "status": "cancelled"},
     )
+
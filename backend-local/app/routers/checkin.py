@@ -1,13 +1,14 @@
-from datetime import datetime, timezone
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, Header
 from pydantic import BaseModel, ConfigDict
 from pydantic.alias_generators import to_camel
 from app.models.seat import SeatDocument
 from app.models.booking import BookingDocument
-from app.schemas.common import ApiResponse
+from app.eventlog.seats import seat_log
+from app.responses import api_response
 from app.mqtt.client import publish_booking_status
-from app.utils.slots import verify_pin
+from app.utils.idempotency import idempotent
+from app.utils.slots import now_slot, verify_pin
 
 router = APIRouter()
 
@@ -18,26 +19,26 @@ class CheckinRequest(BaseModel):
 
 
 @router.post("/seats/{seat_id}/checkin")
-async def checkin(seat_id: str, req: CheckinRequest):
+async def checkin(
+    seat_id: str,
+    req: CheckinRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await idempotent(
+        idempotency_key, f"POST /seats/{seat_id}/checkin", req.model_dump_json().encode(),
+        lambda: _checkin(seat_id, req),
+    )
+
+
+async def _checkin(seat_id: str, req: CheckinRequest):
     seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
     if seat is None:
-        return JSONResponse(
-            status_code=404,
-            content=ApiResponse(
-                success=False, message=f"Seat {seat_id} not found", data=None
-            ).model_dump(),
-        )
+        return api_response(False, f"Seat {seat_id} not found", status_code=404)
 
     if seat.status != "awaiting_checkin":
-        return JSONResponse(
-            status_code=409,
-            content=ApiResponse(
-                success=False, message=f"Seat {seat_id} is not awaiting check-in", data=None
-            ).model_dump(),
-        )
+        return api_response(False, f"Seat {seat_id} is not awaiting check-in", status_code=409)
 
-    now = datetime.now(timezone.utc)
-    current_slot = int((now.hour * 60 + now.minute) / 30)
+    current_slot = now_slot()
     booking = await BookingDocument.find_one(
         BookingDocument.seat_id == seat_id,
         BookingDocument.status == "confirmed",
@@ -46,19 +47,19 @@ async def checkin(seat_id: str, req: CheckinRequest):
     )
 
     if booking is None or not verify_pin(req.pin_code, booking.pin_code_hash):
-        return JSONResponse(
-            status_code=403,
-            content=ApiResponse(
-                success=False, message=f"Incorrect PIN for seat {seat_id}", data=None
-            ).model_dump(),
-        )
+        return api_response(False, f"Incorrect PIN for seat {seat_id}", status_code=403)
 
-    seat.status = "occupied"
-    await seat.save()
+    # Only status: a full save would write back today_bookings as read above.
+    result = await SeatDocument.get_motor_collection().update_one(
+        {"seat_id": seat_id, "status": "awaiting_checkin"}, {"$set": {"status": "occupied"}},
+    )
+    if result.matched_count == 0:
+        return api_response(False, f"Seat {seat_id} is not awaiting check-in", status_code=409)
+    await seat_log.record(seat_id, "checked_in", {"status": "occupied"}, booking_id=booking.booking_id)
     publish_booking_status(seat_id, "occupied")
 
-    return ApiResponse(
-        success=True,
-        message=f"Check-in successful. Seat {seat_id} is now occupied.",
-        data={"seatId": seat_id, "status": "occupied"},
+    return api_response(
+        True,
+        f"Check-in successful. Seat {seat_id} is now occupied.",
+        {"seatId": seat_id, "status": "occupied"},
     )
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app import push
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("/events")
+async def events(request: Request, student_id: Optional[str] = Query(None, alias="studentId")):
+    """Server-Sent Events stream of live updates.
+
+    Events addressed to a student (waitlist_assigned, recurring_materialized,
+    bookings_displaced, ...) carry booking details, so they only go to
+    streams opened with that ?studentId=...; events without a studentId go
+    to everyone.
+    """
+    queue = push.subscribe()
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    # This instance is shutting down; the browser's EventSource
+                    # reconnects (to another instance) after `retry` ms.
+                    yield b"retry: 1000\n\n"
+                    break
+                target = event.get("studentId")
+                if target is not None and target != student_id:
+                    continue
+                yield b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+        finally:
+            push.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app import readiness
+from app.responses import api_response
+
+router = APIRouter()
+
+
+@router.get("/health")
+async def health():
+    """Liveness: the process is up and the event loop is responsive."""
+    return api_response(True, "OK")
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness: reports each subsystem; 503 until all of them are up."""
+    subsystems = readiness.snapshot()
+    if readiness.is_draining():
+        return api_response(False, "Draining: shutting down", subsystems, status_code=503)
+    if readiness.is_ready():
+        return api_response(True, "All subsystems ready", subsystems)
+    starting = ", ".join(name for name, up in subsystems.items() if not up)
+    return api_response(False, f"Waiting for: {starting}", subsystems, status_code=503)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from app import metrics
+from app.responses import api_response
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Admission counters and live gauges (in-flight requests, loop lag, ...)."""
+    return api_response(True, "Metrics fetched successfully", metrics.snapshot())
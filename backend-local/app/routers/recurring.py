@@ -0,0 +1,161 @@
+from fastapi import APIRouter
+from app.allocation.booking import release_booking
+from app.allocation.recurring import (
+    find_conflict, materialize_day, occurrence_id, shared_weekdays, skip_occurrence, slot_footprint,
+    weekday_mask,
+)
+from app.config import get_settings
+from app.models.booking import BookingDocument
+from app.models.recurring import RecurringBookingDocument
+from app.models.seat import SeatDocument
+from app.schemas.common import ApiResponse
+from app.schemas.recurring import (
+    CancelRecurringRequest, RecurringBookingOut, RecurringBookingRequest, SkipOccurrenceRequest,
+)
+from app.responses import api_response, recurring_out
+from app.utils.ids import new_rule_id
+from app.utils.slots import SLOTS_PER_DAY, hash_pin, slot_clock, verify_pin
+
+router = APIRouter()
+
+
+@router.post("/bookings/recurring", status_code=201, response_model=ApiResponse[RecurringBookingOut])
+async def create_recurring_booking(req: RecurringBookingRequest):
+    """Book a seat every week. Only today's occurrence (if any) becomes a
+    booking now; later ones are created on their day."""
+    if not 0 <= req.start_slot < req.end_slot <= SLOTS_PER_DAY:
+        return api_response(
+            False,
+            "startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
+            status_code=422,
+        )
+
+    settings = get_settings()
+    today = slot_clock.today()
+    if req.start_date < today or req.end_date < req.start_date:
+        return api_response(False, "Need today <= startDate <= endDate", status_code=422)
+    if (req.end_date - req.start_date).days >= settings.recurring_max_days:
+        return api_response(
+            False, f"A series can span at most {settings.recurring_max_days} days", status_code=422
+        )
+
+    weekdays = weekday_mask(req.weekdays)
+    if not weekdays & shared_weekdays(req.start_date.isoformat(), req.end_date.isoformat()):
+        return api_response(False, "None of the weekdays falls between startDate and endDate", status_code=422)
+
+    if not await SeatDocument.find_one(SeatDocument.seat_id == req.seat_id).exists():
+        return api_response(False, f"Seat {req.seat_id} not found", status_code=404)
+
+    active = await RecurringBookingDocument.find(
+        RecurringBookingDocument.student_id == req.student_id,
+        RecurringBookingDocument.status == "active",
+    ).count()
+    if active >= settings.max_recurring_per_student:
+        return api_response(
+            False,
+            f"Student {req.student_id} already has {active} recurring booking(s)",
+            status_code=409,
+        )
+
+    rule = RecurringBookingDocument(
+        rule_id=new_rule_id(),
+        seat_id=req.seat_id,
+        student_id=req.student_id,
+        weekdays=weekdays,
+        start_slot=req.start_slot,
+        end_slot=req.end_slot,
+        footprint=slot_footprint(req.start_slot, req.end_slot),
+        start_date=req.start_date.isoformat(),
+        end_date=req.end_date.isoformat(),
+        pin_code_hash=hash_pin(req.pin_code),
+        created_at=slot_clock.now(),
+    )
+    doc = rule.model_dump(exclude={"id", "revision_id"})
+    clash = await find_conflict(doc)
+    if clash is not None:
+        return api_response(
+            False,
+            f"Seat {req.seat_id} is already booked by recurring booking {clash['rule_id']} at that time",
+            status_code=409,
+        )
+    await rule.insert()
+    await materialize_day(today, [doc])
+
+    return api_response(
+        True, "Recurring booking created successfully", recurring_out(doc), status_code=201
+    )
+
+
+@router.get("/bookings/recurring/student/{student_id}", response_model=ApiResponse[list[RecurringBookingOut]])
+async def get_student_recurring_bookings(student_id: str):
+    docs = await RecurringBookingDocument.get_motor_collection().find(
+        {"student_id": student_id, "status": "active"}, {"_id": 0}
+    ).to_list(None)
+    return api_response(
+        True, f"Found {len(docs)} recurring booking(s) for {student_id}", [recurring_out(d) for d in docs]
+    )
+
+
+async def _authorised_rule(rule_id: str, student_id: str, pin_code: str):
+    """(rule, None) or (None, error response)."""
+    rule = await RecurringBookingDocument.find_one(RecurringBookingDocument.rule_id == rule_id)
+    if rule is None:
+        return None, api_response(False, f"Recurring booking {rule_id} not found", status_code=404)
+    if rule.student_id != student_id:
+        return None, api_response(False, "Student ID does not match this booking", status_code=403)
+    if not verify_pin(pin_code, rule.pin_code_hash):
+        return None, api_response(False, "Incorrect PIN", status_code=403)
+    if rule.status != "active":
+        return None, api_response(False, f"Recurring booking {rule_id} is already {rule.status}", status_code=409)
+    return rule, None
+
+
+@router.post("/bookings/recurring/{rule_id}/skip")
+async def skip_recurring_occurrence(rule_id: str, req: SkipOccurrenceRequest):
+    """Cancel one occurrence. Future ones are just marked as exceptions; if
+    it is today's and already booked, that booking is cancelled too, unless
+    it has started (as with cancelling the series)."""
+    rule, error = await _authorised_rule(rule_id, req.student_id, req.pin_code)
+    if error:
+        return error
+
+    today = req.date == slot_clock.today()
+    if today and rule.start_slot <= slot_clock.now_slot():
+        return api_response(False, f"Today's occurrence of {rule_id} has already started", status_code=409)
+
+    await skip_occurrence(rule_id, req.date)
+    if today:
+        booking = await BookingDocument.find_one(
+            BookingDocument.booking_id == occurrence_id(rule_id, req.date)
+        )
+        if booking is not None:
+            await release_booking(booking)
+
+    return api_response(
+        True,
+        f"Occurrence on {req.date.isoformat()} of {rule_id} cancelled",
+        {"ruleId": rule_id, "date": req.date.isoformat(), "status": "cancelled"},
+    )
+
+
+@router.post("/bookings/recurring/{rule_id}/cancel")
+async def cancel_recurring_booking(rule_id: str, req: CancelRecurringRequest):
+    """End the series. Today's occurrence is cancelled too unless it has started."""
+    rule, error = await _authorised_rule(rule_id, req.student_id, req.pin_code)
+    if error:
+        return error
+
+    await rule.set({RecurringBookingDocument.status: "cancelled"})
+    today = slot_clock.today()
+    if rule.start_slot > slot_clock.now_slot():
+        booking = await BookingDocument.find_one(
+            BookingDocument.booking_id == occurrence_id(rule_id, today)
+        )
+        if booking is not None:
+            await release_booking(booking)
+
+    return api_response(
+        True,
+        f"Recurring booking {rule_id} cancelled successfully",
+        {"ruleId": rule_id, "status": "cancelled"},
+    )
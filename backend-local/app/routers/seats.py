@@ -1,31 +1,21 @@
 from fastapi import APIRouter
+from app.cache.seats import seat_states
+from app.database import read_collection
 from app.models.seat import SeatDocument
-from app.schemas.seat import SeatOut, TimeSlotOut
+from app.schemas.seat import SeatOut
 from app.schemas.common import ApiResponse
+from app.responses import SEAT_PROJECTION, api_response, seat_out
 
 router = APIRouter()
 
 
 @router.get("/seats", response_model=ApiResponse[list[SeatOut]])
 async def get_seats():
-    seats = await SeatDocument.find_all().to_list()
-    data = [
-        SeatOut(
-            seat_id=s.seat_id,
-            status=s.status,
-            physical_status=s.physical_status,
-            next_booking_start_time=(
-                s.next_booking_start_time.isoformat() if s.next_booking_start_time else None
-            ),
-            today_bookings=[
-                TimeSlotOut(start_slot=b.start_slot, end_slot=b.end_slot)
-                for b in s.today_bookings
-            ],
-        )
-        for s in seats
-    ]
-    return ApiResponse(
-        success=True,
-        message="Seats fetched successfully",
-        data=[d.model_dump(by_alias=True) for d in data],
-    )
+    # response_model documents the contract; returning a Response skips the
+    # re-validation, and raw documents skip the Beanie/SeatOut round trip.
+    if seat_states.ready:
+        # Kept current by the seats change stream (app/cache/watcher.py).
+        return api_response(True, "Seats fetched successfully", seat_states.values())
+    # Served from a secondary when there is one (MONGO_READ_PREFERENCE).
+    docs = await read_collection(SeatDocument).find({}, SEAT_PROJECTION).to_list(None)
+    return api_response(True, "Seats fetched successfully", [seat_out(d) for d in docs])
@@ -0,0 +1,97 @@
+from fastapi import APIRouter
+from app.models.waitlist import WaitlistDocument
+from app.schemas.waitlist import WaitlistRequest, WaitlistOut, CancelWaitlistRequest
+from app.schemas.common import ApiResponse
+from app.allocation.waitlist import WaitEntry, waitlist
+from app.responses import api_response, waitlist_out
+from app.utils.ids import new_waitlist_id
+from app.utils.slots import hash_pin, slot_clock, verify_pin
+
+router = APIRouter()
+
+
+@router.post("/waitlist", status_code=201, response_model=ApiResponse[WaitlistOut])
+async def join_waitlist(req: WaitlistRequest):
+    """Wait for any seat over [startSlot, endSlot). Assigned automatically when
+    a booking is cancelled or auto-cancelled and the freed time fits."""
+    if req.start_slot >= req.end_slot:
+        return api_response(
+            False,
+            "startSlot must be less than endSlot (minimum 1 slot = 30 minutes)",
+            status_code=422,
+        )
+
+    now = slot_clock.now()
+    if req.start_slot <= slot_clock.datetime_to_slot(now):
+        return api_response(
+            False, "Cannot wait for a time slot that has already started or passed", status_code=422
+        )
+
+    if waitlist.overlapping_for_student(req.student_id, req.start_slot, req.end_slot):
+        return api_response(
+            False,
+            f"Student {req.student_id} is already waiting for an overlapping period",
+            status_code=409,
+        )
+
+    entry = WaitlistDocument(
+        request_id=new_waitlist_id(),
+        student_id=req.student_id,
+        start_slot=req.start_slot,
+        end_slot=req.end_slot,
+        pin_code_hash=hash_pin(req.pin_code),
+        created_at=now,
+    )
+    await entry.insert()
+    waitlist.add(WaitEntry(
+        entry.request_id, entry.student_id, entry.start_slot, entry.end_slot, entry.pin_code_hash
+    ))
+
+    return api_response(
+        True, "Added to waitlist", waitlist_out(entry.model_dump()), status_code=201
+    )
+
+
+@router.get("/waitlist/student/{student_id}", response_model=ApiResponse[list[WaitlistOut]])
+async def get_student_waitlist(student_id: str):
+    docs = await WaitlistDocument.get_motor_collection().find(
+        {"student_id": student_id, "status": {"$in": ["waiting", "assigned"]}}
+    ).sort("created_at", 1).to_list(None)
+    return api_response(
+        True, f"Found {len(docs)} waitlist request(s) for {student_id}", [waitlist_out(d) for d in docs]
+    )
+
+
+@router.post("/waitlist/cancel")
+async def cancel_waitlist(req: CancelWaitlistRequest):
+    entry = await WaitlistDocument.find_one(WaitlistDocument.request_id == req.request_id)
+    if entry is None:
+        return api_response(False, f"Waitlist request {req.request_id} not found", status_code=404)
+
+    if entry.student_id != req.student_id:
+        return api_response(False, "Student ID does not match this request", status_code=403)
+
+    if not verify_pin(req.pin_code, entry.pin_code_hash):
+        return api_response(False, "Incorrect PIN", status_code=403)
+
+    if entry.status != "waiting":
+        return api_response(
+            False, f"Waitlist request {req.request_id} is already {entry.status}", status_code=409
+        )
+
+    # Only if still waiting: reallocation may be assigning it right now.
+    result = await WaitlistDocument.get_motor_collection().update_one(
+        {"request_id": entry.request_id, "status": "waiting"}, {"$set": {"status": "cancelled"}},
+    )
+    if result.matched_count == 0:
+        entry = await WaitlistDocument.find_one(WaitlistDocument.request_id == req.request_id)
+        return api_response(
+            False, f"Waitlist request {req.request_id} is already {entry.status}", status_code=409
+        )
+    waitlist.discard(entry.request_id)
+
+    return api_response(
+        True,
+        f"Waitlist request {req.request_id} cancelled successfully",
+        {"requestId": req.request_id, "status": "cancelled"},
+    )
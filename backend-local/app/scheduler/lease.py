@@ -0,0 +1,98 @@
+"""Scheduler lease: one instance runs the scheduled transitions.
+
+Every instance schedules the same jobs, but slot boundaries, the status
+broadcast and recurring materialisation only do anything on the instance
+holding the lease, a single document in `scheduler_leases`. Taking or
+renewing it is one conditional upsert: it succeeds if nobody holds the
+lease, it has expired, or we already hold it; otherwise the insert of the
+same _id fails with a duplicate key.
+
+Every instance tries to take it every third of the lease time, so if the
+holder dies another one takes over within one lease period. A holder that shuts
+down releases it explicitly (app/lifecycle.py), so the hand-off is
+immediate. Whoever takes over re-runs the current slot's boundaries (see
+scheduler/pool.py), which are idempotent, so a boundary that fell into
+the gap is not lost.
+"""
+import functools
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.models.lease import SchedulerLeaseDocument
+
+LEASE_ID = "scheduler"
+
+
+def _holder_id() -> str:
+    # Per process, not per host: two instances on one box are two holders.
+    return f"{get_settings().instance_id or socket.gethostname()}:{os.getpid()}"
+
+
+class SchedulerLease:
+    def __init__(self, lease_id: str = LEASE_ID):
+        self.lease_id = lease_id
+        self._holder: str | None = None
+        self._valid_until = 0.0  # time.monotonic(); a margin short of expires_at
+
+    @property
+    def holder(self) -> str:
+        if self._holder is None:
+            self._holder = _holder_id()
+        return self._holder
+
+    @property
+    def held(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease. Returns whether this instance holds it."""
+        seconds = get_settings().scheduler_lease_seconds
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        try:
+            await SchedulerLeaseDocument.get_motor_collection().find_one_and_update(
+                {
+                    "_id": self.lease_id,
+                    "$or": [{"holder": self.holder}, {"expires_at": {"$lte": now}}],
+                },
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            self._valid_until = 0.0
+            return False
+        # Count from before the request, and stop trusting the lease a third
+        # early, so clock drift between instances can't make two leaders.
+        self._valid_until = started + seconds * 2 / 3
+        return True
+
+    async def release(self) -> None:
+        if not self.held:
+            return
+        self._valid_until = 0.0
+        await SchedulerLeaseDocument.get_motor_collection().delete_one(
+            {"_id": self.lease_id, "holder": self.holder}
+        )
+        print("[Scheduler] Lease released")
+
+
+scheduler_lease = SchedulerLease()
+
+
+def leader_only(job):
+    """Wrap a scheduled coroutine so it only runs on the lease holder.
+
+    Only the renewal job (scheduler/pool.py) takes the lease, so whoever
+    takes it over always runs the catch-up there first."""
+    @functools.wraps(job)
+    async def run(*args):
+        if scheduler_lease.held:
+            await job(*args)
+    return run
@@ -1,150 +1,282 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+from datetime import datetime, timedelta
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from beanie.operators import In, Set
+from pymongo import UpdateOne
+from app import readiness
 from app.models.seat import SeatDocument
 from app.models.booking import BookingDocument
-from app.mqtt.client import publish_booking_status
-from app.utils.slots import slot_to_datetime
+from app.cache.students import student_bookings
+from app.config import get_settings
+from app.eventlog.seats import seat_log
+from app.mqtt.client import publish_booking_statuses
+from app.scheduler.lease import leader_only, scheduler_lease
+from app.utils.slots import SLOTS_PER_DAY, slot_clock
 
 scheduler = AsyncIOScheduler()
 
-
-def schedule_booking_upcoming(booking_id: str, seat_id: str, start_time: datetime) -> None:
-    """At start_time - 10 min: transition seat to 'upcoming'."""
-    scheduler.add_job(
-        _upcoming_booking,
-        trigger="date",
-        run_date=start_time - timedelta(minutes=10),
-        args=[booking_id, seat_id],
-        id=f"upcoming_{booking_id}",
-        replace_existing=True,
-    )
-
-
-def schedule_booking_activation(booking_id: str, seat_id: str, start_time: datetime) -> None:
-    """At start_time: mark seat awaiting_checkin and turn LED red."""
+# Jobs handed to the executor and not finished yet, so shutdown can wait for
+# them (drain_scheduler). The listener runs on the event loop.
+_running_jobs = 0
+
+
+def _count_jobs(event) -> None:
+    global _running_jobs
+    _running_jobs += 1 if event.code == EVENT_JOB_SUBMITTED else -1
+
+
+scheduler.add_listener(_count_jobs, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
+# ---------------------------------------------------------------------------
+# Slot-boundary engine
+#
+# Seat transitions only ever happen on the 30-minute slot grid, so instead of
+# four date jobs per booking there are two jobs per slot for the whole day:
+#
+#   T - 10 min  _upcoming_boundary(T)  reserved/free → upcoming
+#   T           _slot_boundary(T)      expire bookings ending at T,
+#                                      auto-cancel no-shows that started at T-1,
+#                                      activate bookings starting at T
+#
+# Each handler reads every affected booking/seat in one query and writes with
+# one update_many / bulk_write, then publishes all MQTT updates as a batch —
+# a constant number of round trips per boundary however many bookings share
+# it. Handlers work from the database, so a booking cancelled in the meantime
+# simply isn't found; nothing needs to be unscheduled on cancellation.
+#
+# Every instance schedules these jobs, but only the scheduler-lease holder
+# runs them (scheduler/lease.py).
+# ---------------------------------------------------------------------------
+
+UPCOMING_LEAD = timedelta(minutes=10)
+CHECKIN_WINDOW_SLOTS = 1  # auto-cancel when the student hasn't checked in after 30 min
+BOUNDARY_MISFIRE_GRACE = 60  # seconds: a boundary that fires late still runs
+MATERIALIZE_DELAY = timedelta(minutes=1)
+
+
+def schedule_day_boundaries() -> None:
+    """Schedule boundary jobs for every remaining slot today, and re-run at midnight."""
+    now = slot_clock.now()
+    today = slot_clock.today()
+    day = today.isoformat()
+    for slot, at in enumerate(slot_clock.slots_to_datetimes(range(SLOTS_PER_DAY + 1), today)):
+        if slot == 0:
+            continue  # nothing can be booked to start at midnight
+        if at - UPCOMING_LEAD > now and slot < SLOTS_PER_DAY:
+            scheduler.add_job(
+                leader_only(_upcoming_boundary),
+                trigger="date",
+                run_date=at - UPCOMING_LEAD,
+                args=[slot],
+                id=f"upcoming_{day}_{slot}",
+                replace_existing=True,
+                misfire_grace_time=BOUNDARY_MISFIRE_GRACE,
+            )
+        if at > now:
+            scheduler.add_job(
+                leader_only(_slot_boundary),
+                trigger="date",
+                run_date=at,
+                args=[slot],
+                id=f"boundary_{day}_{slot}",
+                replace_existing=True,
+                misfire_grace_time=BOUNDARY_MISFIRE_GRACE,
+            )
+    # Today's recurring-booking occurrences. At midnight this waits a minute,
+    # until the previous day's last boundary has cleared the seats.
     scheduler.add_job(
-        _activate_booking,
+        leader_only(_materialize_recurring),
         trigger="date",
-        run_date=start_time,
-        args=[booking_id, seat_id],
-        id=f"activate_{booking_id}",
+        run_date=max(now, slot_clock.midnight(today) + MATERIALIZE_DELAY),
+        args=[today],
+        id=f"recurring_{day}",
         replace_existing=True,
+        misfire_grace_time=None,  # late is fine, as long as it runs
     )
-
-
-def schedule_booking_checkin_timeout(booking_id: str, seat_id: str, start_time: datetime) -> None:
-    """At start_time + 30 min: auto-cancel if student never checked in."""
+    # Waiting requests are for one day's slots: every instance drops
+    # yesterday's from memory, and the lease holder expires them in Mongo.
     scheduler.add_job(
-        _checkin_timeout,
+        _roll_waitlist,
         trigger="date",
-        run_date=start_time + timedelta(minutes=30),
-        args=[booking_id, seat_id],
-        id=f"checkin_timeout_{booking_id}",
+        run_date=max(now, slot_clock.midnight(today)),
+        id=f"waitlist_{day}",
         replace_existing=True,
+        misfire_grace_time=None,
     )
-
-
-def schedule_booking_timeout(booking_id: str, seat_id: str, end_time: datetime) -> None:
-    """At end_time: free seat, turn LED off, cancel booking if still active."""
     scheduler.add_job(
-        _expire_booking,
-        trigger="date",
-        run_date=end_time,
-        args=[booking_id, seat_id],
-        id=f"expire_{booking_id}",
+        schedule_day_boundaries,
+        trigger="cron",
+        hour=0,
+        minute=0,
+        timezone=slot_clock.tz,  # the library's midnight, not UTC's
+        id="day_boundaries",
         replace_existing=True,
     )
-
-
-async def _upcoming_booking(booking_id: str, seat_id: str) -> None:
-    print(f"[Scheduler] Upcoming: {booking_id} seat {seat_id}")
-    seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
-    if seat and seat.status in ("reserved", "free"):
-        seat.status = "upcoming"
-        await seat.save()
-        publish_booking_status(seat_id, "upcoming")
-
-
-async def _activate_booking(booking_id: str, seat_id: str) -> None:
-    print(f"[Scheduler] Activating: {booking_id} seat {seat_id}")
-    seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
-    if seat:
-        seat.status = "awaiting_checkin"
-        await seat.save()
-        publish_booking_status(seat_id, "awaiting_checkin")
-
-
-async def _checkin_timeout(booking_id: str, seat_id: str) -> None:
-    """30 min after booking start: auto-cancel if no check-in has occurred."""
-    print(f"[Scheduler] Check-in timeout for {booking_id} seat {seat_id}")
-    seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
-    if seat is None or seat.status != "awaiting_checkin":
+    print(f"[Scheduler] Slot boundaries scheduled for {day}")
+
+
+async def _materialize_recurring(day) -> None:
+    if not readiness.snapshot()["database"]:
+        return  # still starting up: init_db_with_retry() does it once connected
+    from app.allocation.recurring import materialize_day
+    await materialize_day(day)
+
+
+async def _roll_waitlist() -> None:
+    if not readiness.snapshot()["database"]:
+        return  # init_db() loads today's requests once connected
+    from app.allocation.waitlist import expire_waitlist, load_waitlist
+    if scheduler_lease.held:
+        await expire_waitlist()
+    await load_waitlist()
+
+
+def _next_start_time(bookings: list[dict], after_slot: int) -> datetime | None:
+    upcoming = [b["start_slot"] for b in bookings if b["start_slot"] > after_slot]
+    return slot_clock.slot_to_datetime(min(upcoming)) if upcoming else None
+
+
+async def _upcoming_boundary(slot: int) -> None:
+    """10 min before `slot`: every reserved/free seat with a booking starting then → upcoming."""
+    seats = SeatDocument.get_motor_collection()
+    seat_ids = [
+        doc["seat_id"]
+        async for doc in seats.find(
+            {
+                "today_bookings.start_slot": slot,
+                "status": {"$in": ["reserved", "free"]},
+            },
+            {"_id": 0, "seat_id": 1},
+        )
+    ]
+    if not seat_ids:
         return
-
-    booking = await BookingDocument.find_one(BookingDocument.booking_id == booking_id)
-    if booking is None or booking.status != "confirmed":
+    await SeatDocument.find(
+        In(SeatDocument.seat_id, seat_ids),
+        In(SeatDocument.status, ["reserved", "free"]),
+    ).update_many(Set({SeatDocument.status: "upcoming"}))
+    await seat_log.append(
+        seat_log.event(seat_id, "upcoming", {"status": "upcoming"}, slot=slot) for seat_id in seat_ids
+    )
+    publish_booking_statuses((seat_id, "upcoming") for seat_id in seat_ids)
+    print(f"[Scheduler] Slot {slot} upcoming: {len(seat_ids)} seat(s)")
+
+
+async def _slot_boundary(slot: int) -> None:
+    """At the start of `slot`: expire, auto-cancel no-shows, then activate."""
+    bookings = BookingDocument.get_motor_collection()
+    seats = SeatDocument.get_motor_collection()
+    timeout_start = slot - CHECKIN_WINDOW_SLOTS
+
+    affected = await bookings.find(
+        {
+            "status": "confirmed",
+            "$or": [
+                {"end_slot": slot},
+                {"start_slot": {"$in": [slot, timeout_start]}},
+            ],
+        },
+        {"_id": 0, "booking_id": 1, "seat_id": 1, "student_id": 1, "start_slot": 1, "end_slot": 1},
+    ).to_list(None)
+    if not affected:
         return
 
-    booking.status = "cancelled"
-    await booking.save()
-
-    seat.today_bookings = [
-        b for b in seat.today_bookings
-        if not (b.start_slot == booking.start_slot and b.end_slot == booking.end_slot)
-    ]
-    seat.status = "free"
-    now = datetime.now(timezone.utc)
-    now_slot = int((now.hour * 60 + now.minute) / 30)
-    remaining = [b for b in seat.today_bookings if b.start_slot > now_slot]
-    seat.next_booking_start_time = slot_to_datetime(remaining[0].start_slot) if remaining else None
-    await seat.save()
-
-    try:
-        scheduler.remove_job(f"expire_{booking_id}")
-    except Exception:
-        pass
-
-    publish_booking_status(seat_id, "free")
-    print(f"[Scheduler] Auto-cancelled {booking_id}: no check-in within 30 min")
-
-
-async def _expire_booking(booking_id: str, seat_id: str) -> None:
-    print(f"[Scheduler] Expiring: {booking_id} seat {seat_id}")
-    booking = await BookingDocument.find_one(BookingDocument.booking_id == booking_id)
-    if booking and booking.status != "cancelled":
-        booking.status = "cancelled"
-        await booking.save()
-
-    seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id)
-    if seat:
-        if booking:
-            seat.today_bookings = [
-                b for b in seat.today_bookings
-                if not (b.start_slot == booking.start_slot and b.end_slot == booking.end_slot)
-            ]
-        seat.status = "free"
-        now = datetime.now(timezone.utc)
-        now_slot = int((now.hour * 60 + now.minute) / 30)
-        remaining = [b for b in seat.today_bookings if b.start_slot > now_slot]
-        seat.next_booking_start_time = slot_to_datetime(remaining[0].start_slot) if remaining else None
-        await seat.save()
-
-    publish_booking_status(seat_id, "free")
-
-
-def cancel_booking_jobs(booking_id: str) -> None:
-    """Remove all scheduler jobs for a booking (called on manual cancellation)."""
-    for prefix in ("upcoming", "activate", "checkin_timeout", "expire"):
-        try:
-            scheduler.remove_job(f"{prefix}_{booking_id}")
-        except Exception:
-            pass
+    seat_docs = {
+        doc["seat_id"]: doc
+        async for doc in seats.find(
+            {"seat_id": {"$in": list({b["seat_id"] for b in affected})}},
+            {"_id": 0, "seat_id": 1, "status": 1, "today_bookings": 1},
+        )
+    }
+
+    ended: list[dict] = []      # booking finished normally at `slot`
+    no_shows: list[dict] = []   # started a slot ago, seat still awaiting check-in
+    activating: list[str] = []  # seat ids whose booking starts now
+    for b in affected:
+        seat = seat_docs.get(b["seat_id"])
+        if b["end_slot"] == slot:
+            ended.append(b)
+        elif b["start_slot"] == timeout_start:
+            if seat and seat.get("status") == "awaiting_checkin":
+                no_shows.append(b)
+        elif b["start_slot"] == slot:
+            if seat and seat.get("status", "free") in ("free", "reserved", "upcoming"):
+                activating.append(b["seat_id"])
+
+    # Bookings: one update_many for everything that stops being active.
+    cancelled = ended + no_shows
+    if cancelled:
+        await bookings.update_many(
+            {"booking_id": {"$in": [b["booking_id"] for b in cancelled]}},
+            {"$set": {"status": "cancelled"}},
+        )
+        for b in cancelled:
+            student_bookings.remove(b["student_id"], b["booking_id"])
+
+    # Seats being freed: drop the finished slot, recompute next start time.
+    seat_ops = []
+    seat_events = []
+    freed: list[str] = []
+    for b in cancelled:
+        seat = seat_docs.get(b["seat_id"])
+        if seat is None:
+            continue
+        remaining = [
+            tb for tb in seat.get("today_bookings", [])
+            if not (tb["start_slot"] == b["start_slot"] and tb["end_slot"] == b["end_slot"])
+        ]
+        seat["today_bookings"] = remaining
+        changes = {
+            "status": "free",
+            "today_bookings": remaining,
+            "next_booking_start_time": _next_start_time(remaining, slot),
+        }
+        seat_ops.append(UpdateOne({"seat_id": b["seat_id"]}, {"$set": changes}))
+        seat_events.append(seat_log.event(
+            b["seat_id"], "expired" if b["end_slot"] == slot else "no_show", changes,
+            booking_id=b["booking_id"], start_slot=b["start_slot"], end_slot=b["end_slot"],
+        ))
+        freed.append(b["seat_id"])
+    if seat_ops:
+        await seats.bulk_write(seat_ops, ordered=False)
+        await seat_log.append(seat_events)
+
+    # No-shows free the rest of their interval: hand it to the waitlist in the
+    # same transition, so the published status already reflects the new booking.
+    reassigned: dict[str, str] = {}
+    if no_shows:
+        from app.allocation.waitlist import reallocate_freed
+        reassigned = await reallocate_freed(
+            (b["seat_id"], b["start_slot"], b["end_slot"]) for b in no_shows
+        )
+
+    # Seats whose booking starts now: one update_many.
+    if activating:
+        await SeatDocument.find(
+            In(SeatDocument.seat_id, activating),
+            In(SeatDocument.status, ["free", "reserved", "upcoming"]),
+        ).update_many(Set({SeatDocument.status: "awaiting_checkin"}))
+        await seat_log.append(
+            seat_log.event(seat_id, "activated", {"status": "awaiting_checkin"}, slot=slot)
+            for seat_id in activating
+        )
+
+    publish_booking_statuses(
+        [(seat_id, reassigned.get(seat_id, "free")) for seat_id in freed]
+        + [(seat_id, "awaiting_checkin") for seat_id in activating]
+    )
+    print(
+        f"[Scheduler] Slot {slot} boundary: {len(ended)} expired, "
+        f"{len(no_shows)} auto-cancelled (no check-in), {len(activating)} activated"
+    )
 
 
 def schedule_status_broadcast() -> None:
     """Every 30 s: publish all seat statuses to MQTT for hardware subscribers."""
     scheduler.add_job(
-        _broadcast_seat_status,
+        leader_only(_broadcast_seat_status),
         trigger="interval",
         seconds=30,
         id="status_broadcast",
@@ -154,14 +286,95 @@ def schedule_status_broadcast() -> None:
 
 async def _broadcast_seat_status() -> None:
     try:
-        seats = await SeatDocument.find_all().to_list()
-        for seat in seats:
-            publish_booking_status(seat.seat_id, seat.status)
+        seats = await SeatDocument.get_motor_collection().find(
+            {}, {"_id": 0, "seat_id": 1, "status": 1}
+        ).to_list(None)
+        publish_booking_statuses((seat["seat_id"], seat["status"]) for seat in seats)
         print(f"[Scheduler] Broadcast seat statuses ({len(seats)} seats)")
     except Exception as e:
         print(f"[Scheduler] Status broadcast failed: {e}")
 
 
+def schedule_seat_snapshots() -> None:
+    """Periodically snapshot seats whose event log grew, to keep replay short."""
+    scheduler.add_job(
+        leader_only(seat_log.snapshot),
+        trigger="interval",
+        seconds=get_settings().seat_snapshot_interval_seconds,
+        id="seat_snapshots",
+        replace_existing=True,
+    )
+
+
+def schedule_lease_renewal() -> None:
+    """Take or keep the scheduler lease, on every instance."""
+    scheduler.add_job(
+        _renew_lease,
+        trigger="interval",
+        seconds=get_settings().scheduler_lease_seconds / 3,
+        next_run_time=datetime.now(slot_clock.tz),
+        id="scheduler_lease",
+        replace_existing=True,
+    )
+
+
+async def _renew_lease() -> None:
+    if not readiness.snapshot()["database"]:
+        return
+    was_leader = scheduler_lease.held
+    try:
+        leader = await scheduler_lease.acquire()
+    except Exception as e:
+        print(f"[Scheduler] Lease renewal failed: {e}")
+        return
+    if leader and not was_leader:
+        print(f"[Scheduler] Took the scheduler lease ({scheduler_lease.holder})")
+        await _catch_up()
+    elif was_leader and not leader:
+        print("[Scheduler] Lost the scheduler lease")
+
+
+async def _catch_up() -> None:
+    """Re-run the boundaries around now after taking over the lease.
+
+    The previous holder may have stopped (or died) just before a boundary.
+    The handlers work from the database and skip what was already done, so
+    running them again is harmless: the current and previous slot's
+    boundaries, the next slot's "upcoming" if it is due, and today's
+    recurring bookings.
+    """
+    now = slot_clock.now()
+    slot = slot_clock.datetime_to_slot(now)
+    for boundary in (slot - 1, slot):
+        if boundary >= 1:
+            await _slot_boundary(boundary)
+    if slot + 1 < SLOTS_PER_DAY and slot_clock.slot_to_datetime(slot + 1) - UPCOMING_LEAD <= now:
+        await _upcoming_boundary(slot + 1)
+    await _materialize_recurring(slot_clock.today())
+
+
+async def drain_scheduler(deadline: float) -> None:
+    """Shutdown: start no more jobs, let running ones finish until `deadline`
+    (time.monotonic()), take a last seat snapshot if we hold the lease, then
+    hand the lease to the next instance."""
+    scheduler.pause()
+    while _running_jobs > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if _running_jobs > 0:
+        print(f"[Scheduler] {_running_jobs} job(s) still running at the shutdown deadline")
+    if readiness.snapshot()["database"]:
+        if scheduler_lease.held:
+            try:
+                await seat_log.snapshot()  # so the next start replays from here
+            except Exception as e:
+                print(f"[Scheduler] Final seat snapshot failed: {e}")
+        try:
+            await scheduler_lease.release()
+        except Exception as e:
+            print(f"[Scheduler] Lease release failed: {e}")
+    scheduler.shutdown(wait=False)
+
+
 # --- Future stub ---
 async def schedule_auto_release(booking_id: str, seat_id: str) -> None:
     """Future: auto-release desk after 40 mins of no IR presence."""
@@ -0,0 +1,41 @@
+from datetime import date
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+
+class SeatSelection(BaseModel):
+    """Seats named by id, all seats of a zone, or both; and a slot window today."""
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    seat_ids: List[str] = []
+    zone: Optional[str] = None
+    start_slot: int = 0
+    end_slot: int = 48
+    reason: str = ""
+
+
+class BulkBookingRequest(SeatSelection):
+    """POST /admin/bookings/cancel and /admin/bookings/reschedule."""
+
+
+class SeatBlockRequest(SeatSelection):
+    """POST /admin/blocks: close the seats for the slot window on every day
+    from startDate to endDate (default: today only). Today's bookings in the
+    window are moved elsewhere ("relocate") or cancelled ("cancel")."""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    action: Literal["relocate", "cancel"] = "relocate"
+
+
+class SeatBlockOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    block_id: str
+    seat_ids: List[str]
+    zone: Optional[str]
+    start_slot: int
+    end_slot: int
+    start_date: str
+    end_date: str
+    reason: str
+    created_at: str
+    status: str
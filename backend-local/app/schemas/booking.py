@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, ConfigDict, field_validator
 from pydantic.alias_generators import to_camel
 
@@ -18,6 +19,23 @@ class BookingRequest(BaseModel):
         return v
 
 
+class AutoBookingRequest(BaseModel):
+    """POST /bookings/auto: like BookingRequest, but the backend picks the seat."""
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    student_id: str
+    start_slot: int
+    end_slot: int
+    pin_code: str
+    zone: Optional[str] = None  # e.g. "A"; any zone if omitted
+
+    @field_validator("pin_code")
+    @classmethod
+    def pin_must_be_4_digits(cls, v: str) -> str:
+        if not (len(v) == 4 and v.isdigit()):
+            raise ValueError("pinCode must be exactly 4 decimal digits")
+        return v
+
+
 class BookingOut(BaseModel):
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
     booking_id: str
@@ -0,0 +1,73 @@
+"""Row schemas for the bulk loader (app/loader/bulk.py).
+
+Column names may be camelCase (as in the API) or snake_case (as in Mongo).
+"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, field_validator, model_validator
+from pydantic.alias_generators import to_camel
+
+SEAT_STATUSES = {"free", "reserved", "upcoming", "awaiting_checkin", "occupied"}
+BOOKING_STATUSES = {"confirmed", "pending", "cancelled", "completed"}
+
+
+class SeatImportRow(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel, extra="ignore")
+    seat_id: str
+    status: str = "free"
+    physical_status: str = "free"
+    zone: Optional[str] = None
+
+    @field_validator("status")
+    @classmethod
+    def known_status(cls, v: str) -> str:
+        if v not in SEAT_STATUSES:
+            raise ValueError(f"status must be one of {sorted(SEAT_STATUSES)}")
+        return v
+
+    @field_validator("physical_status")
+    @classmethod
+    def known_physical_status(cls, v: str) -> str:
+        if v not in ("free", "occupied"):
+            raise ValueError("physicalStatus must be 'free' or 'occupied'")
+        return v
+
+
+class BookingImportRow(BaseModel):
+    """A booking from the old system. Give either the plain pinCode or its
+    pinCodeHash; without a bookingId one is generated (so re-importing such
+    rows is not idempotent). Imported rows are history: without a status
+    they are "completed", since a "confirmed" booking counts as live today
+    (seat conflicts, quotas, check-in)."""
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel, extra="ignore")
+    booking_id: Optional[str] = None
+    seat_id: str
+    student_id: str
+    start_slot: int
+    end_slot: int
+    pin_code: Optional[str] = None
+    pin_code_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+    status: str = "completed"
+
+    @field_validator("pin_code")
+    @classmethod
+    def pin_must_be_4_digits(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not (len(v) == 4 and v.isdigit()):
+            raise ValueError("pinCode must be exactly 4 decimal digits")
+        return v
+
+    @field_validator("status")
+    @classmethod
+    def known_status(cls, v: str) -> str:
+        if v not in BOOKING_STATUSES:
+            raise ValueError(f"status must be one of {sorted(BOOKING_STATUSES)}")
+        return v
+
+    @model_validator(mode="after")
+    def check_slots_and_pin(self) -> "BookingImportRow":
+        if not 0 <= self.start_slot < self.end_slot <= 48:
+            raise ValueError("need 0 <= startSlot < endSlot <= 48")
+        if (self.pin_code is None) == (self.pin_code_hash is None):
+            raise ValueError("give exactly one of pinCode and pinCodeHash")
+        return self
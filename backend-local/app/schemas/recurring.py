@@ -0,0 +1,60 @@
+from datetime import date
+from typing import List
+from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic.alias_generators import to_camel
+
+
+class RecurringBookingRequest(BaseModel):
+    """Book the same seat and slots every week on the given weekdays
+    (0 = Monday … 6 = Sunday) from startDate to endDate inclusive."""
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    seat_id: str
+    student_id: str
+    weekdays: List[int]
+    start_slot: int
+    end_slot: int
+    start_date: date
+    end_date: date
+    pin_code: str
+
+    @field_validator("pin_code")
+    @classmethod
+    def pin_must_be_4_digits(cls, v: str) -> str:
+        if not (len(v) == 4 and v.isdigit()):
+            raise ValueError("pinCode must be exactly 4 decimal digits")
+        return v
+
+    @field_validator("weekdays")
+    @classmethod
+    def valid_weekdays(cls, v: List[int]) -> List[int]:
+        if not v or any(d < 0 or d > 6 for d in v):
+            raise ValueError("weekdays must be a non-empty list of 0 (Monday) to 6 (Sunday)")
+        return sorted(set(v))
+
+
+class RecurringBookingOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    rule_id: str
+    seat_id: str
+    student_id: str
+    weekdays: List[int]
+    start_slot: int
+    end_slot: int
+    start_date: str
+    end_date: str
+    exceptions: List[str]
+    created_at: str
+    status: str
+
+
+class SkipOccurrenceRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    student_id: str
+    pin_code: str
+    date: date
+
+
+class CancelRecurringRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    student_id: str
+    pin_code: str
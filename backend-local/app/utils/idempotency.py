@@ -0,0 +1,125 @@
+"""Idempotency-Key support and short-lived dedupe sets.
+
+Clients on flaky Wi-Fi retry POSTs. A request carrying an Idempotency-Key
+header runs once; retries with the same key get the stored response back
+without touching Mongo. A retry that arrives while the first attempt is
+still running waits for it instead of running concurrently.
+
+Storage is in-process, bounded (oldest entries evicted first) and expires
+after a TTL.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+from fastapi.responses import Response
+
+from app.config import get_settings
+from app.responses import api_response
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl_seconds` after insertion."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: Hashable):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return item[1]
+
+    def set(self, key: Hashable, value) -> None:
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def seen(self, key: Hashable) -> bool:
+        """True if `key` was seen within the TTL; records it otherwise."""
+        if self.get(key) is not None:
+            return True
+        self.set(key, True)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        # key -> (fingerprint, status_code, body)
+        self._responses = TTLCache(ttl_seconds, max_entries)
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: Hashable,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        while True:
+            stored = self._responses.get(key)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    return api_response(
+                        False,
+                        "Idempotency-Key was already used with a different request",
+                        status_code=422,
+                    )
+                return Response(
+                    content=stored[2],
+                    status_code=stored[1],
+                    media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            await asyncio.shield(pending)  # first attempt still running
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = done
+        try:
+            response = await handler()
+            # Server errors are not remembered, so a retry gets a fresh attempt.
+            if response.status_code < 500:
+                self._responses.set(key, (fingerprint, response.status_code, response.body))
+            return response
+        finally:
+            del self._in_flight[key]
+            done.set_result(None)
+
+
+_store: IdempotencyStore | None = None
+
+
+def _get_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = IdempotencyStore(
+            settings.idempotency_ttl_seconds, settings.idempotency_max_entries
+        )
+    return _store
+
+
+async def idempotent(
+    key: str | None,
+    scope: str,
+    payload: bytes,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    """Run `handler` once per (scope, Idempotency-Key). No key → just run it."""
+    if not key:
+        return await handler()
+    fingerprint = hashlib.sha256(payload).hexdigest()
+    return await _get_store().run((scope, key), fingerprint, handler)
@@ -0,0 +1,72 @@
+"""Collision-free, time-sortable identifiers (ULID layout).
+
+26 Crockford base32 characters: 48-bit millisecond timestamp followed by
+80 random bits. Within one millisecond the random part is incremented, so
+ids from this process are strictly increasing. Because the timestamp comes
+first, string order is creation order and a creation-time window is a
+plain range scan on the id:
+
+    {"booking_id": {"$gte": id_floor("BK", t0), "$lt": id_floor("BK", t1)}}
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def ulid() -> str:
+    global _last_ms, _last_random
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _last_ms:
+            ms = _last_ms  # same millisecond (or clock stepped back): stay monotonic
+            _last_random += 1
+        else:
+            _last_random = secrets.randbits(_RANDOM_BITS)
+        _last_ms = ms
+        return _encode((ms << _RANDOM_BITS) | (_last_random & ((1 << _RANDOM_BITS) - 1)))
+
+
+def new_booking_id() -> str:
+    return f"BK{ulid()}"
+
+
+def new_waitlist_id() -> str:
+    return f"WL{ulid()}"
+
+
+def new_rule_id() -> str:
+    return f"RB{ulid()}"
+
+
+def new_block_id() -> str:
+    return f"SB{ulid()}"
+
+
+def id_floor(prefix: str, at: datetime) -> str:
+    """Smallest id with `prefix` created at or after `at` (for range scans)."""
+    ms = int(at.timestamp() * 1000)
+    return prefix + _encode(ms << _RANDOM_BITS)
+
+
+def id_time(identifier: str) -> datetime:
+    """Creation time encoded in an id from this module."""
+    value = 0
+    for ch in identifier[-26:]:
+        value = (value << 5) | _ALPHABET.index(ch)
+    return datetime.fromtimestamp((value >> _RANDOM_BITS) / 1000, tz=timezone.utc)
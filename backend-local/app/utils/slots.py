@@ -1,10 +1,127 @@
 import hashlib
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Protocol
+from zoneinfo import ZoneInfo
+
+SLOTS_PER_DAY = 48
+
+
+# ---------------------------------------------------------------------------
+# Slot clock
+#
+# Slots are half-hours of the library's *local* day (Settings.library_timezone),
+# so slot 28 is 14:00 in London in both GMT and BST. Everything that needs "now"
+# or converts between slots and datetimes goes through `slot_clock`; datetimes
+# handed out are timezone-aware UTC, as stored in Mongo and sent to hardware.
+#
+# The clock source is injectable: tests install a FrozenClock with set_clock()
+# and advance it to step the scheduler through a day without waiting.
+# ---------------------------------------------------------------------------
+
+class Clock(Protocol):
+    def now(self) -> datetime: ...
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+
+class FrozenClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, at: datetime):
+        self._now = at.astimezone(timezone.utc)
+
+    def now(self) -> datetime:
+        return self._now
+
+    def set(self, at: datetime) -> None:
+        self._now = at.astimezone(timezone.utc)
+
+    def advance(self, **delta) -> datetime:
+        self._now += timedelta(**delta)
+        return self._now
+
+
+@lru_cache(maxsize=16)
+def _day_grid(tz: ZoneInfo, day: date) -> tuple[datetime, ...]:
+    """UTC start of each slot of `day` (plus index 48 = next local midnight).
+
+    Built from local wall-clock times, so on DST change days the grid stays
+    aligned with the library's clocks. Cached: the anchor for a day is computed
+    once, not on every conversion.
+    """
+    grid = [
+        datetime.combine(day, time(slot // 2, (slot % 2) * 30), tzinfo=tz).astimezone(timezone.utc)
+        for slot in range(SLOTS_PER_DAY)
+    ]
+    next_day = datetime.combine(day + timedelta(days=1), time(0), tzinfo=tz)
+    grid.append(next_day.astimezone(timezone.utc))
+    return tuple(grid)
+
+
+class SlotClock:
+    def __init__(self, tz_name: str | None = None, clock: Clock | None = None):
+        # None → Settings.library_timezone, resolved on first use so importing
+        # this module doesn't require the environment to be loaded.
+        self._tz_name = tz_name
+        self._tz: ZoneInfo | None = None
+        self.clock: Clock = clock or SystemClock()
+
+    @property
+    def tz(self) -> ZoneInfo:
+        if self._tz is None:
+            if self._tz_name is None:
+                from app.config import get_settings
+                self._tz_name = get_settings().library_timezone
+            self._tz = ZoneInfo(self._tz_name)
+        return self._tz
+
+    def now(self) -> datetime:
+        return self.clock.now()
+
+    def today(self) -> date:
+        return self.now().astimezone(self.tz).date()
+
+    def midnight(self, day: date | None = None) -> datetime:
+        return _day_grid(self.tz, day or self.today())[0]
+
+    def now_slot(self) -> int:
+        return self.datetime_to_slot(self.now())
+
+    def slot_to_datetime(self, slot: int, day: date | None = None) -> datetime:
+        return _day_grid(self.tz, day or self.today())[slot]
+
+    def datetime_to_slot(self, dt: datetime) -> int:
+        local = dt.astimezone(self.tz)
+        return (local.hour * 60 + local.minute) // 30
+
+    def slots_to_datetimes(self, slots: Iterable[int], day: date | None = None) -> list[datetime]:
+        """Vectorised slot_to_datetime: one grid lookup, then plain indexing."""
+        grid = _day_grid(self.tz, day or self.today())
+        return [grid[s] for s in slots]
+
+    def datetimes_to_slots(self, dts: Iterable[datetime]) -> list[int]:
+        tz = self.tz
+        return [(lt.hour * 60 + lt.minute) // 30 for lt in (dt.astimezone(tz) for dt in dts)]
+
+
+slot_clock = SlotClock()
+
+
+def set_clock(clock: Clock) -> None:
+    """Swap the time source (e.g. a FrozenClock in tests)."""
+    slot_clock.clock = clock
+
+
+def now_slot() -> int:
+    return slot_clock.now_slot()
 
 
 def slot_to_datetime(slot: int) -> datetime:
-    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    return today + timedelta(minutes=slot * 30)
+    return slot_clock.slot_to_datetime(slot)
 
 
 def slots_overlap(a_start: int, a_end: int, b_start: int, b_end: int) -> bool:
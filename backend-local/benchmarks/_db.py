@@ -0,0 +1,33 @@
+"""Database setup shared by the benchmarks.
+
+With --mongo-uri the benchmark talks to a real MongoDB (use a scratch
+database — collections are dropped). Without it, an in-memory mongomock
+database is used, which is enough for CPU-side measurements but says
+nothing about server round-trip times.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import DOCUMENT_MODELS  # noqa: E402
+
+
+async def init_bench_db(mongo_uri: str | None, db_name: str = "library_seats_bench", models=None):
+    import beanie
+
+    if mongo_uri:
+        import motor.motor_asyncio
+        client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+    else:
+        from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+        # mongomock-motor's with_options() hands back a synchronous collection;
+        # read preferences mean nothing in memory, so keep the async wrapper.
+        AsyncMongoMockCollection.with_options = lambda self, **kwargs: self
+        client = AsyncMongoMockClient()
+    db = client[db_name]
+    models = models or DOCUMENT_MODELS
+    for model in models:
+        await db.drop_collection(model.Settings.name)
+    await beanie.init_beanie(database=db, document_models=models)
+    return db
@@ -0,0 +1,129 @@
+"""Closing seats: one cancellation at a time vs. one bulk displacement.
+
+A floor of --seats seats in eight zones, each seat holding a random day of
+bookings. Zone A (--closed zones, A first) is then cleared three ways:
+
+    one-by-one   release_booking() per booking, what calling
+                 POST /bookings/cancel for each of them costs,
+    bulk cancel  displace_bookings(..., relocate=False),
+    relocate     displace_bookings(..., relocate=True): moved to free seats
+                 elsewhere on the floor where possible.
+
+The data is reset between runs. Reports wall time, bookings handled and,
+for relocation, how many found a new seat. mongomock unless --mongo-uri:
+it hides round trips, which is where one-by-one loses most, and scans the
+whole collection for every write, which inflates both bulk runs.
+
+    cd backend-local
+    python benchmarks/bench_admin_bulk.py [--seats 400] [--closed 1] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from _db import init_bench_db
+
+from app.allocation.autoassign import seat_timelines
+from app.allocation.booking import release_booking
+from app.allocation.displace import displace_bookings
+from app.cache.students import student_bookings
+from app.eventlog.seats import seat_log
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument
+from app.utils.slots import FrozenClock, set_clock, slot_clock, slots_overlap
+
+ZONES = "ABCDEFGH"
+OPEN, CLOSE = 17, 44  # bookable from 08:30, clock frozen at 08:05
+
+
+def day_of_bookings(rng: random.Random) -> list[tuple[int, int]]:
+    bookings: list[tuple[int, int]] = []
+    for _ in range(rng.randrange(0, 7)):
+        length = rng.choice((1, 2, 2, 3, 4, 4, 6, 8))
+        start = rng.randrange(OPEN, CLOSE - length + 1)
+        if not any(slots_overlap(start, start + length, s, e) for s, e in bookings):
+            bookings.append((start, start + length))
+    return sorted(bookings)
+
+
+async def load_floor(seats: int, seed: int) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    now = slot_clock.now()
+    seat_docs, booking_docs = [], []
+    by_zone: dict[str, list[str]] = {}
+    for i in range(seats):
+        zone = ZONES[i % len(ZONES)]
+        seat_id = f"{zone}{i // len(ZONES) + 1}"
+        by_zone.setdefault(zone, []).append(seat_id)
+        bookings = day_of_bookings(rng)
+        seat_docs.append(SeatDocument(
+            seat_id=seat_id,
+            status="reserved" if bookings else "free",
+            today_bookings=[{"start_slot": s, "end_slot": e} for s, e in bookings],
+        ))
+        for n, (s, e) in enumerate(bookings):
+            booking_docs.append({
+                "booking_id": f"BK{seat_id}-{n}",
+                "seat_id": seat_id,
+                "student_id": f"s{rng.randrange(seats * 2)}",
+                "start_slot": s,
+                "end_slot": e,
+                "pin_code_hash": "x",
+                "created_at": now,
+                "status": "confirmed",
+            })
+    await SeatDocument.get_motor_collection().delete_many({})
+    await BookingDocument.get_motor_collection().delete_many({})
+    await SeatDocument.insert_many(seat_docs)
+    await BookingDocument.get_motor_collection().insert_many(booking_docs)
+    seat_log.states.clear()
+    await seat_log.adopt(seat_docs)
+    await seat_timelines.load()
+    await student_bookings.warm()
+    return by_zone
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=400)
+    parser.add_argument("--closed", type=int, default=1, help="zones closed, of 8")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri)
+    set_clock(FrozenClock(datetime(2026, 10, 19, 8, 5, tzinfo=ZoneInfo("Europe/London"))))
+
+    async def one_by_one(seat_ids):
+        docs = await BookingDocument.find({"seat_id": {"$in": seat_ids}, "status": "confirmed"}).to_list()
+        for booking in docs:
+            await release_booking(booking)
+        return f"{len(docs)} cancelled"
+
+    async def bulk_cancel(seat_ids):
+        r = await displace_bookings(seat_ids, 0, 48, relocate=False)
+        return f"{len(r['cancelled'])} cancelled"
+
+    async def relocate(seat_ids):
+        r = await displace_bookings(seat_ids, 0, 48, relocate=True)
+        return f"{len(r['moved'])} moved, {len(r['cancelled'])} cancelled"
+
+    print(f"{args.seats} seats, closing {args.closed} of {len(ZONES)} zone(s)")
+    for name, run in (("one-by-one", one_by_one), ("bulk cancel", bulk_cancel), ("relocate", relocate)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            by_zone = await load_floor(args.seats, args.seed)
+        closed = [seat_id for zone in ZONES[:args.closed] for seat_id in by_zone[zone]]
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            outcome = await run(closed)
+            elapsed = time.perf_counter() - started
+        print(f"  {name:12s} {elapsed * 1e3:9.1f} ms   {outcome}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""Latency of legitimate traffic while one client floods the API.
+
+A "bot" client hammers GET /seats from many concurrent connections while a
+"dashboard" client polls it at a steady 5 requests/s. The same run is made
+with admission control off and on; with it on, the bot gets 429s once its
+read budget is gone, the dashboard stays inside its own budget, and its
+latency should stay close to the idle baseline.
+
+Everything runs in one process over ASGI (no sockets), so numbers show
+event-loop contention, not network cost.
+
+    cd backend-local
+    python benchmarks/bench_admission.py [--seats 200] [--flood 64] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://unused")
+os.environ.setdefault("HIVEMQ_HOST", "unused")
+os.environ.setdefault("HIVEMQ_USERNAME", "unused")
+os.environ.setdefault("HIVEMQ_PASSWORD", "unused")
+
+from _db import init_bench_db  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app import metrics  # noqa: E402
+from app.admission.middleware import AdmissionMiddleware  # noqa: E402
+from app.admission.shedding import start_lag_monitor, stop_lag_monitor  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.models.seat import SeatDocument  # noqa: E402
+from app.routers import metrics as metrics_router, seats  # noqa: E402
+
+
+DASHBOARD_INTERVAL = 0.2  # 5 requests/s, well inside the read budget
+
+
+def build_app(admission: bool) -> FastAPI:
+    os.environ["ADMISSION_ENABLED"] = "true" if admission else "false"
+    get_settings.cache_clear()
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+    app.include_router(seats.router)
+    app.include_router(metrics_router.router)
+    return app
+
+
+def client_for(app: FastAPI, ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 50000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+
+
+async def flood(client: httpx.AsyncClient, deadline: float, codes: dict) -> None:
+    while time.perf_counter() < deadline:
+        r = await client.get("/seats")
+        codes[r.status_code] = codes.get(r.status_code, 0) + 1
+        await asyncio.sleep(0)
+
+
+async def dashboard(client: httpx.AsyncClient, deadline: float, latencies: list, codes: dict) -> None:
+    # Latency is measured from when the request was *due*, so time spent
+    # waiting for a busy event loop to even send it is counted too.
+    due = time.perf_counter()
+    while due < deadline:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        r = await client.get("/seats")
+        latencies.append(time.perf_counter() - due)
+        codes[r.status_code] = codes.get(r.status_code, 0) + 1
+        due += DASHBOARD_INTERVAL
+
+
+def report(label: str, latencies: list, legit_codes: dict, bot_codes: dict) -> None:
+    ordered = sorted(latencies)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    print(
+        f"{label:22s} dashboard p50 {pct(0.5):7.1f} ms  p95 {pct(0.95):7.1f} ms  "
+        f"max {ordered[-1] * 1000:7.1f} ms  mean {statistics.mean(ordered) * 1000:7.1f} ms  "
+        f"codes {legit_codes}  | bot codes {bot_codes}"
+    )
+
+
+async def run_phase(label: str, admission: bool, flood_workers: int, duration: float) -> None:
+    app = build_app(admission)
+    start_lag_monitor()
+    latencies, legit_codes, bot_codes = [], {}, {}
+    async with client_for(app, "10.0.0.1") as legit, client_for(app, "10.0.0.66") as bot:
+        deadline = time.perf_counter() + duration
+        tasks = [asyncio.create_task(dashboard(legit, deadline, latencies, legit_codes))]
+        tasks += [asyncio.create_task(flood(bot, deadline, bot_codes)) for _ in range(flood_workers)]
+        await asyncio.gather(*tasks)
+    stop_lag_monitor()
+    report(label, latencies, legit_codes, bot_codes)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=200)
+    parser.add_argument("--flood", type=int, default=64, help="concurrent bot connections")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--mongo-uri", help="real MongoDB (scratch database); default in-memory")
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri)
+    await SeatDocument.insert_many([SeatDocument(seat_id=f"S{i:05d}") for i in range(args.seats)])
+
+    await run_phase("idle (no flood)", True, 0, args.duration)
+    await run_phase("flood, admission off", False, args.flood, args.duration)
+    await run_phase("flood, admission on", True, args.flood, args.duration)
+    print("metrics:", metrics.snapshot()["counters"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Auto-assignment: ranking latency and seat utilisation vs. random choice.
+
+Latency: SeatTimelines.rank() over --seats seats (comma-separated sizes),
+each seat pre-filled with a random day of bookings, for random requests.
+
+Utilisation: a simulated day of booking requests arriving in random order,
+each placed by one of three policies:
+
+    random     any seat that is free for the period (a student picking from
+               the map),
+    first-fit  the free seat with the lowest id,
+    best-fit   SeatTimelines.rank() (what POST /bookings/auto does).
+
+Reports the share of requests that found no seat, the booked seat-hours,
+and the dead one-slot gaps left between bookings. Pure in-memory; no
+database needed.
+
+    cd backend-local
+    python benchmarks/bench_autoassign.py [--seats 1000,5000,10000] [--sim-seats 200] [--load 1.2]
+"""
+import argparse
+import random
+import statistics
+import time
+
+import _db  # noqa: F401  (puts backend-local on sys.path)
+
+from app.allocation.autoassign import SeatTimelines
+from app.allocation.recurring import slot_footprint
+from app.utils.slots import SLOTS_PER_DAY, slots_overlap
+
+OPEN, CLOSE = 16, 44  # 08:00–22:00
+
+
+def random_request(rng: random.Random) -> tuple[int, int]:
+    length = rng.choice((1, 2, 2, 3, 4, 4, 6, 8))
+    start = rng.randrange(OPEN, CLOSE - length + 1)
+    return start, start + length
+
+
+def fill(rng: random.Random, bookings: list[tuple[int, int]], tries: int) -> None:
+    for _ in range(tries):
+        start, end = random_request(rng)
+        if not any(slots_overlap(start, end, s, e) for s, e in bookings):
+            bookings.append((start, end))
+
+
+def state(bookings: list[tuple[int, int]]) -> dict:
+    return {"today_bookings": [{"start_slot": s, "end_slot": e} for s, e in bookings]}
+
+
+def bench_latency(sizes: list[int], queries: int) -> None:
+    rng = random.Random(1)
+    for n in sizes:
+        timelines = SeatTimelines()
+        for i in range(n):
+            bookings = []
+            fill(rng, bookings, rng.randrange(0, 6))
+            timelines.update(f"{'ABCDEFGH'[i % 8]}{i:05d}", state(bookings))
+        requests = [random_request(rng) for _ in range(queries)]
+        samples = []
+        for start, end in requests:
+            zone = rng.choice((None, None, "C"))
+            t0 = time.perf_counter()
+            timelines.rank(start, end, OPEN - 1, zone)
+            samples.append(time.perf_counter() - t0)
+        samples.sort()
+        print(f"  {n:6d} seats   p50 {statistics.median(samples) * 1e3:6.2f} ms   "
+              f"p99 {samples[int(len(samples) * 0.99)] * 1e3:6.2f} ms")
+
+
+def dead_gaps(bookings: list[tuple[int, int]]) -> int:
+    """One-slot holes between bookings (or the opening hours) nobody can book."""
+    mask = slot_footprint(0, OPEN - 1) | slot_footprint(CLOSE, SLOTS_PER_DAY)
+    for s, e in bookings:
+        mask |= slot_footprint(s, e)
+    free = ~mask & ((1 << (SLOTS_PER_DAY + 1)) - 1)
+    return bin(free & ~(free << 1) & ~(free >> 1)).count("1")
+
+
+def simulate(policy: str, seats: int, requests: list[tuple[int, int]], seed: int) -> tuple[float, float, int]:
+    rng = random.Random(seed)
+    timelines = SeatTimelines()
+    plans: dict[str, list[tuple[int, int]]] = {}
+    for i in range(seats):
+        plans[f"S{i:04d}"] = []
+        timelines.update(f"S{i:04d}", state([]))
+    rejected = booked = 0
+    for start, end in requests:
+        if policy == "best-fit":
+            choice = timelines.rank(start, end, OPEN - 1, limit=1)
+        else:
+            free = sorted(timelines.rank(start, end, OPEN - 1, limit=seats))
+            choice = free[:1] if policy == "first-fit" or not free else [rng.choice(free)]
+        if not choice:
+            rejected += 1
+            continue
+        plans[choice[0]].append((start, end))
+        timelines.update(choice[0], state(plans[choice[0]]))
+        booked += end - start
+    return rejected / len(requests), booked / 2, sum(dead_gaps(p) for p in plans.values())
+
+
+def bench_utilisation(seats: int, load: float, days: int) -> None:
+    # Enough requested seat-time to cover `load` x the day's capacity.
+    mean_len = statistics.mean((1, 2, 2, 3, 4, 4, 6, 8))
+    n = int(seats * (CLOSE - OPEN) * load / mean_len)
+    print(f"  {seats} seats, {n} requests/day ({load:.1f}x capacity), {days} day(s)")
+    for policy in ("random", "first-fit", "best-fit"):
+        results = []
+        for day in range(days):
+            rng = random.Random(100 + day)
+            results.append(simulate(policy, seats, [random_request(rng) for _ in range(n)], day))
+        rejected = statistics.mean(r[0] for r in results)
+        hours = statistics.mean(r[1] for r in results)
+        gaps = statistics.mean(r[2] for r in results)
+        print(f"    {policy:10s} rejected {rejected:6.1%}   booked {hours:8.0f} seat-h   "
+              f"dead gaps {gaps:6.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", default="1000,5000,10000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--sim-seats", type=int, default=200)
+    parser.add_argument("--load", type=float, default=1.2)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args()
+
+    print("rank() latency")
+    bench_latency([int(x) for x in args.seats.split(",")], args.queries)
+    print("utilisation")
+    bench_utilisation(args.sim_seats, args.load, args.days)
+
+
+if __name__ == "__main__":
+    main()
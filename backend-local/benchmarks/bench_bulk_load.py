@@ -0,0 +1,105 @@
+"""Bulk loader memory and throughput: streaming chunks vs. load-everything.
+
+Generates a bookings file of each size, imports it with app.loader.bulk
+and with a naive loader (read every row, validate them all, one
+insert_many), and reports rows/s plus the loader's transient memory: the
+tracemalloc peak minus what is still allocated afterwards. Subtracting the
+retained part matters on mongomock, where the "database" itself lives in
+this process and grows with every row. The streaming loader's transient
+memory should stay flat as the file grows; the naive one's grows with it.
+
+    cd backend-local
+    python benchmarks/bench_bulk_load.py [--rows 10000,50000] [--chunk-size 1000] [--concurrency 4]
+    python benchmarks/bench_bulk_load.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from _db import init_bench_db
+
+from app.loader.bulk import load, read_rows
+from app.models.booking import BookingDocument
+from app.schemas.imports import BookingImportRow
+from app.utils.slots import hash_pin
+
+
+def write_file(path: str, rows: int) -> None:
+    rng = random.Random(rows)
+    with open(path, "w") as f:
+        for i in range(rows):
+            start = rng.randrange(0, 44)
+            f.write(json.dumps({
+                "bookingId": f"IMP{i:08d}",
+                "seatId": f"S{rng.randrange(1, 2000):05d}",
+                "studentId": f"{rng.randrange(10_000_000, 99_999_999)}",
+                "startSlot": start,
+                "endSlot": start + rng.randrange(1, 5),
+                "pinCode": f"{rng.randrange(10_000):04d}",
+                "createdAt": "2026-01-15T09:00:00+00:00",
+                "status": "cancelled",
+            }) + "\n")
+
+
+async def naive_load(path: str) -> None:
+    rows = [BookingImportRow.model_validate(row) for _, row in read_rows(path)]
+    docs = [
+        {**r.model_dump(exclude={"pin_code"}), "pin_code_hash": hash_pin(r.pin_code)}
+        for r in rows
+    ]
+    await BookingDocument.get_motor_collection().insert_many(docs, ordered=False)
+
+
+async def measure(label: str, run) -> None:
+    await BookingDocument.get_motor_collection().delete_many({})
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = await run()
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    transient = (peak - current) / 2**20
+    print(f"  {label:10s} {rows / elapsed:10,.0f} rows/s   transient peak {transient:7.1f} MiB")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--rows", default="10000,50000")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri)
+    if not args.mongo_uri:
+        # mongomock checks unique indexes by scanning the whole collection on
+        # every insert, which would swamp the loader's own cost. The generated
+        # booking ids are unique anyway.
+        await BookingDocument.get_motor_collection().drop_indexes()
+    backend = "MongoDB" if args.mongo_uri else "mongomock"
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.rows.split(",")):
+            path = os.path.join(tmp, f"bookings_{n}.jsonl")
+            write_file(path, n)
+            print(f"{n} rows ({backend}, chunk {args.chunk_size}, concurrency {args.concurrency})")
+
+            async def streaming():
+                stats = await load("bookings", path, args.chunk_size, args.concurrency, restart=True)
+                assert stats.written == n and stats.invalid == 0
+                return n
+
+            async def naive():
+                await naive_load(path)
+                return n
+
+            await measure("streaming", streaming)
+            await measure("naive", naive)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
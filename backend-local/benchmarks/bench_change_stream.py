@@ -0,0 +1,72 @@
+"""Cross-instance convergence through change streams.
+
+A second Motor client plays "another API instance" and updates seats
+directly; this process runs the real watchers (app/cache/watcher.py) and
+measures how long each write takes to show up in the seat-state cache.
+Needs a replica set (mongomock has no change streams); a single node is fine:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+    cd backend-local
+    python benchmarks/bench_change_stream.py --mongo-uri "mongodb://localhost:27017/?replicaSet=rs0"
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://unused")
+os.environ.setdefault("HIVEMQ_HOST", "unused")
+os.environ.setdefault("HIVEMQ_USERNAME", "unused")
+os.environ.setdefault("HIVEMQ_PASSWORD", "unused")
+
+from _db import init_bench_db  # noqa: E402
+import motor.motor_asyncio  # noqa: E402
+
+from app.cache.seats import seat_states  # noqa: E402
+from app.cache.watcher import start_change_streams, stop_change_streams  # noqa: E402
+from app.models.seat import SeatDocument  # noqa: E402
+
+DB_NAME = "library_seats_bench"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", required=True, help="replica set URI (scratch database)")
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=1000)
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri, DB_NAME)
+    await SeatDocument.insert_many([SeatDocument(seat_id=f"S{i:05d}") for i in range(args.seats)])
+    start_change_streams()
+    while not seat_states.ready:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.5)  # let both streams settle
+
+    other = motor.motor_asyncio.AsyncIOMotorClient(args.mongo_uri)[DB_NAME]["seats"]
+    latencies = []
+    statuses = ("reserved", "free")
+    for i in range(args.writes):
+        seat_id, status = f"S{i % args.seats:05d}", statuses[(i // args.seats) % 2]
+        t0 = time.perf_counter()
+        await other.update_one({"seat_id": seat_id}, {"$set": {"status": status}})
+        while seat_states.get(seat_id)["status"] != status:
+            await asyncio.sleep(0.0005)
+            if time.perf_counter() - t0 > 5:
+                raise SystemExit(f"{seat_id} did not converge within 5 s")
+        latencies.append(time.perf_counter() - t0)
+    await stop_change_streams()
+
+    ordered = sorted(latencies)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    print(f"{args.writes} writes from another client, {args.seats} seats")
+    print(
+        f"write → cache  p50 {pct(0.5):6.2f} ms  p95 {pct(0.95):6.2f} ms  p99 {pct(0.99):6.2f} ms  "
+        f"max {ordered[-1] * 1000:6.2f} ms  mean {statistics.mean(ordered) * 1000:6.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
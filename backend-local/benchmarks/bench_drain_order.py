@@ -0,0 +1,196 @@
+"""Shutdown order with a scheduler job still running: a check, not a load test.
+
+Runs the app's real lifespan in-process, takes the scheduler lease, starts a
+job that is still running when shutdown begins (it sleeps --job-seconds,
+then broadcasts every seat's status as the 30-second broadcast does), and
+shuts down. The MQTT client is a recorder standing in for paho, so no
+broker is needed; the database is mongomock unless --mongo-uri.
+
+Checked, from the recorded timeline:
+  * the job finished, and its publishes were queued before the disconnect,
+  * the final seat snapshot ran while the lease was still held,
+  * the lease was released (its document is gone) before the disconnect.
+
+Prints the timeline and exits non-zero if any check fails; with
+SHUTDOWN_TIMEOUT_SECONDS=0.5 the job outlives the deadline and it does.
+bench_rolling_restart.py measures the same shutdown across real processes,
+but needs a real MongoDB.
+
+    cd backend-local
+    python benchmarks/bench_drain_order.py [--seats 50] [--job-seconds 1.0] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import _db  # noqa: F401  (puts backend-local on sys.path)
+
+DB_NAME = "library_seats_bench"
+
+trace: list[tuple[float, str]] = []
+_started = time.monotonic()
+
+
+def mark(what: str) -> None:
+    trace.append((time.monotonic() - _started, what))
+
+
+class _PublishInfo:
+    rc = 0
+
+    def wait_for_publish(self, timeout=None) -> None:
+        pass
+
+    def is_published(self) -> bool:
+        return True
+
+
+class RecordingClient:
+    """The parts of paho.mqtt.client.Client the app uses, recorded."""
+
+    def __init__(self, *args, **kwargs):
+        self.connected = False
+
+    def username_pw_set(self, *args) -> None:
+        pass
+
+    def tls_set(self, **kwargs) -> None:
+        pass
+
+    def user_data_set(self, userdata) -> None:
+        pass
+
+    def reconnect_delay_set(self, **kwargs) -> None:
+        pass
+
+    def connect_async(self, host, port) -> None:
+        self.connected = True
+
+    def loop_start(self) -> None:
+        pass
+
+    def loop_stop(self) -> None:
+        pass
+
+    def subscribe(self, topics) -> None:
+        pass
+
+    def unsubscribe(self, topics) -> None:
+        mark("mqtt unsubscribe")
+
+    def publish(self, topic, payload) -> _PublishInfo:
+        if not self.connected:
+            raise RuntimeError("publish after disconnect")
+        mark(f"publish {topic}")
+        return _PublishInfo()
+
+    def disconnect(self) -> None:
+        self.connected = False
+        mark("mqtt disconnect")
+
+
+def recorded(name: str, coro_fn):
+    async def run(*args, **kwargs):
+        result = await coro_fn(*args, **kwargs)
+        mark(name)
+        return result
+    return run
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=50)
+    parser.add_argument("--job-seconds", type=float, default=1.0)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    os.environ.update(
+        MONGO_URI=args.mongo_uri or "mongodb://in-memory",
+        DB_NAME=DB_NAME,
+        SCHEDULER_LEASE_SECONDS="3",
+        INSTANCE_ID="bench-drain",
+    )
+    for name in ("HIVEMQ_HOST", "HIVEMQ_USERNAME", "HIVEMQ_PASSWORD"):
+        os.environ.setdefault(name, "bench")
+
+    import paho.mqtt.client
+    paho.mqtt.client.Client = RecordingClient
+
+    from app import database, readiness
+    from app.eventlog.seats import seat_log
+    from app.scheduler import pool
+    from app.scheduler.lease import scheduler_lease
+
+    if args.mongo_uri:
+        import motor.motor_asyncio
+        client = motor.motor_asyncio.AsyncIOMotorClient(args.mongo_uri)
+        await client.drop_database(DB_NAME)
+    else:
+        from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+        AsyncMongoMockCollection.with_options = lambda self, **kwargs: self
+        client = AsyncMongoMockClient()
+        database.get_client = lambda: client
+    db = client[DB_NAME]
+    await db.seats.insert_many([
+        {"seat_id": f"S{i:03d}", "status": "free", "physical_status": "free",
+         "next_booking_start_time": None, "today_bookings": []}
+        for i in range(args.seats)
+    ])
+
+    seat_log.snapshot = recorded("seat snapshot", seat_log.snapshot)
+    scheduler_lease.release = recorded("lease released", scheduler_lease.release)
+
+    async def running_job() -> None:
+        mark("job started")
+        await asyncio.sleep(args.job_seconds)
+        await pool._broadcast_seat_status()
+        mark("job finished")
+
+    import main as app_main
+    app = app_main.app
+    async with app.router.lifespan_context(app):
+        deadline = time.monotonic() + 15
+        while not (readiness.snapshot()["database"] and scheduler_lease.held):
+            if time.monotonic() > deadline:
+                raise SystemExit("database not ready or lease not taken within 15 s")
+            await asyncio.sleep(0.1)
+        pool.scheduler.add_job(running_job, id="bench_running_job")
+        while not any(what == "job started" for _, what in trace):
+            await asyncio.sleep(0.01)
+        mark("shutdown begins")
+    mark("shutdown complete")
+
+    lease_doc = await db.scheduler_leases.find_one({"_id": "scheduler"})
+    at = {what: t for t, what in reversed(trace)}
+    publishes = [t for t, what in trace if what.startswith("publish") and t > at["shutdown begins"]]
+    checks = [
+        ("job finished during shutdown", "job finished" in at and at["job finished"] > at["shutdown begins"]),
+        ("its publishes were sent before the disconnect",
+         len(publishes) >= args.seats and max(publishes) < at.get("mqtt disconnect", 0.0)),
+        ("snapshot ran before the lease was released",
+         at.get("seat snapshot", float("inf")) < at.get("lease released", 0.0)),
+        ("lease released before the disconnect", at.get("lease released", float("inf")) < at["mqtt disconnect"]),
+        ("lease document removed", lease_doc is None),
+    ]
+
+    backend = "MongoDB" if args.mongo_uri else "mongomock"
+    print(f"\n{args.seats} seats ({backend}), job running {args.job_seconds:.1f}s into shutdown")
+    shown = set()
+    for t, what in trace:
+        if what.startswith("publish"):
+            if "publish" in shown:
+                continue
+            shown.add("publish")
+            what = f"publish x{sum(w.startswith('publish') for _, w in trace)}"
+        print(f"  {t * 1e3:9.1f} ms  {what}")
+    print(f"shutdown took {(at['shutdown complete'] - at['shutdown begins']) * 1e3:.0f} ms")
+    failed = [name for name, ok in checks if not ok]
+    for name, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if failed:
+        raise SystemExit(f"{len(failed)} check(s) failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
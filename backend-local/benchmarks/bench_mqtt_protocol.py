@@ -0,0 +1,89 @@
+"""Desk MQTT traffic: text vs. binary wire format, and inbound topic dispatch.
+
+Reports bytes on the wire per message (topic + payload; MQTT fixed header
+and packet id are the same for both) and the cost of turning an inbound
+message into (seat, kind, payload): the old startswith/endswith slicing
+plus decode().strip(), against protocol.route() and the frame decoders.
+
+    cd backend-local
+    python benchmarks/bench_mqtt_protocol.py [--seats 5000] [--messages 200000]
+"""
+import argparse
+import random
+import struct
+import time
+
+import _db  # noqa: F401  (puts backend-local on sys.path)
+
+from app.mqtt import protocol
+
+TEXT_PREFIX = "library/seat/"
+
+
+def old_dispatch(topic: str, payload: bytes):
+    text = payload.decode("utf-8").strip()
+    if topic.startswith(TEXT_PREFIX) and topic.endswith("/check-in"):
+        return topic[len(TEXT_PREFIX):-len("/check-in")], "check-in", text
+    if topic.startswith(TEXT_PREFIX) and topic.endswith("/ir"):
+        return topic[len(TEXT_PREFIX):-len("/ir")], "ir", text
+    return None
+
+
+def new_dispatch(topic: str, payload: bytes):
+    route = protocol.route(topic)
+    if route is None:
+        return None
+    if not route.binary:
+        return route.seat_id, route.kind, payload.decode("utf-8").strip()
+    decode = protocol.decode_checkin if route.kind == "check-in" else protocol.decode_status
+    return route.seat_id, route.kind, decode(payload).value
+
+
+def messages(n: int, seats: int, binary: bool, rng: random.Random):
+    out = []
+    for i in range(n):
+        seat = f"S{rng.randrange(1, seats + 1):05d}"
+        if rng.random() < 0.9:
+            state = rng.choice(("free", "occupied"))
+            if binary:
+                out.append((f"ls/{seat}/i", protocol.encode_status(state, seq=i, ts=1_800_000_000)))
+            else:
+                out.append((f"{TEXT_PREFIX}{seat}/ir", state.encode()))
+        else:
+            pin = rng.randrange(10_000)
+            if binary:
+                out.append((f"ls/{seat}/c", struct.pack("!BHHI", protocol.VERSION, pin, i & 0xFFFF, 1_800_000_000)))
+            else:
+                out.append((f"{TEXT_PREFIX}{seat}/check-in", f"{pin:04d}".encode()))
+    return out
+
+
+def timed(fn, msgs) -> float:
+    t0 = time.perf_counter()
+    for topic, payload in msgs:
+        fn(topic, payload)
+    return (time.perf_counter() - t0) / len(msgs) * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    text = messages(args.messages, args.seats, False, random.Random(1))
+    binary = messages(args.messages, args.seats, True, random.Random(1))
+    size = lambda msgs: sum(len(t) + len(p) for t, p in msgs) / len(msgs)
+    print(f"{args.messages} inbound messages (90% IR, 10% check-in), {args.seats} seats")
+    print(f"bytes/message   text {size(text):6.1f}   binary {size(binary):6.1f}")
+    status_text = len(protocol.status_topic("S00001")) + len("awaiting_checkin")
+    status_bin = len(protocol.status_topic("S00001", binary=True)) + len(protocol.encode_status("awaiting_checkin"))
+    print(f"booking_status  text {status_text:6d}   binary {status_bin:6d}   (longest status)")
+
+    assert [old_dispatch(*m) for m in text[:1000]] == [new_dispatch(*m) for m in text[:1000]]
+    print(f"dispatch ns/msg old text {timed(old_dispatch, text):6.0f}   "
+          f"route() text {timed(new_dispatch, text):6.0f}   route() binary {timed(new_dispatch, binary):6.0f}")
+
+
+if __name__ == "__main__":
+    main()
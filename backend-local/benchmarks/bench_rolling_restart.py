@@ -0,0 +1,254 @@
+"""Rolling restart under load: no failed requests, no latency spike, no
+scheduler gap.
+
+Starts --instances uvicorn processes against one MongoDB (a real one: the
+instances must share it), puts a small load balancer in front of them that
+only routes to instances whose GET /ready says so (what a real balancer's
+health check does), and drives a mix of reads (GET /seats) and writes
+(POST /bookings/auto, then cancel). Once the load is steady, each instance
+in turn gets SIGTERM, drains, exits and is started again.
+
+Reported:
+  * requests and failures (5xx or connection errors; 4xx such as "no seat
+    free" are answers, not failures) while steady and while restarting,
+  * latency p50/p99 in both phases,
+  * scheduler-lease hand-offs and the longest time nobody held the lease.
+
+Without an MQTT broker /ready never turns green (MQTT is a subsystem), so by
+default an instance counts as routable once its database is up and it is
+not draining; pass --strict-ready with a broker to require a plain 200.
+
+    cd backend-local
+    python benchmarks/bench_rolling_restart.py --mongo-uri mongodb://localhost:27017 \\
+        [--instances 3] [--concurrency 32] [--grace 3] [--settle 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+import motor.motor_asyncio
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_NAME = "library_seats_bench"
+
+
+class Instance:
+    def __init__(self, index: int, port: int, args):
+        self.index = index
+        self.port = port
+        self.args = args
+        self.url = f"http://127.0.0.1:{port}"
+        self.process: subprocess.Popen | None = None
+        self.routable = False
+
+    def start(self) -> None:
+        env = {
+            **os.environ,
+            "MONGO_URI": self.args.mongo_uri,
+            "DB_NAME": DB_NAME,
+            "INSTANCE_ID": f"bench-{self.index}",
+            "DRAIN_GRACE_SECONDS": str(self.args.grace),
+            "ADMISSION_ENABLED": "false",  # one client IP; don't rate limit it
+            "SCHEDULER_LEASE_SECONDS": str(self.args.lease),
+        }
+        env.setdefault("HIVEMQ_HOST", "127.0.0.1")
+        env.setdefault("HIVEMQ_USERNAME", "bench")
+        env.setdefault("HIVEMQ_PASSWORD", "bench")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL if not self.args.verbose else None,
+        )
+
+    async def stop(self) -> float:
+        started = time.perf_counter()
+        self.process.send_signal(signal.SIGTERM)
+        while self.process.poll() is None:
+            await asyncio.sleep(0.05)
+        return time.perf_counter() - started
+
+
+class LoadBalancer:
+    def __init__(self, instances: list[Instance], strict: bool):
+        self.instances = instances
+        self.strict = strict
+        self.client = httpx.AsyncClient(timeout=10)
+        self._next = 0
+
+    async def check(self, instance: Instance) -> None:
+        try:
+            r = await self.client.get(f"{instance.url}/ready", timeout=1)
+            body = r.json()
+        except (httpx.HTTPError, ValueError):
+            instance.routable = False
+            return
+        if self.strict:
+            instance.routable = r.status_code == 200
+        else:
+            instance.routable = body["data"]["database"] and not body["message"].startswith("Draining")
+
+    async def health_checks(self, interval: float) -> None:
+        while True:
+            await asyncio.gather(*(self.check(i) for i in self.instances))
+            await asyncio.sleep(interval)
+
+    def pick(self) -> Instance | None:
+        live = [i for i in self.instances if i.routable]
+        if not live:
+            return None
+        self._next += 1
+        return live[self._next % len(live)]
+
+
+class Stats:
+    def __init__(self):
+        self.phase = "warmup"
+        self.latencies: dict[str, list[float]] = {}
+        self.requests: dict[str, int] = {}
+        self.failures: dict[str, dict[str, int]] = {}
+
+    def record(self, latency: float, failure: str | None) -> None:
+        if self.phase == "warmup":
+            return
+        self.requests[self.phase] = self.requests.get(self.phase, 0) + 1
+        self.latencies.setdefault(self.phase, []).append(latency)
+        if failure:
+            by_kind = self.failures.setdefault(self.phase, {})
+            by_kind[failure] = by_kind.get(failure, 0) + 1
+
+
+async def worker(lb: LoadBalancer, stats: Stats, rng: random.Random, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        instance = lb.pick()
+        if instance is None:
+            await asyncio.sleep(0.05)
+            continue
+        started = time.perf_counter()
+        failure = None
+        try:
+            if rng.random() < 0.8:
+                r = await lb.client.get(f"{instance.url}/seats")
+            else:
+                student = f"bench{rng.randrange(10**9)}"
+                start = rng.randrange(30, 46)
+                r = await lb.client.post(f"{instance.url}/bookings/auto", json={
+                    "studentId": student, "startSlot": start, "endSlot": start + 1, "pinCode": "1234",
+                })
+                if r.status_code == 201:
+                    r = await lb.client.post(f"{instance.url}/bookings/cancel", json={
+                        "bookingId": r.json()["data"]["bookingId"], "studentId": student, "pinCode": "1234",
+                    })
+            if r.status_code >= 500:
+                failure = f"HTTP {r.status_code}"
+        except httpx.HTTPError as e:
+            failure = type(e).__name__
+        stats.record(time.perf_counter() - started, failure)
+
+
+async def watch_lease(db, events: list, stop: asyncio.Event) -> None:
+    holder, gap_started = None, None
+    while not stop.is_set():
+        doc = await db.scheduler_leases.find_one({"_id": "scheduler"})
+        now = time.perf_counter()
+        current = doc["holder"] if doc else None
+        if current != holder:
+            if current is None:
+                gap_started = now
+            else:
+                events.append((current, now - gap_started if gap_started else 0.0))
+                gap_started = None
+            holder = current
+        await asyncio.sleep(0.1)
+
+
+def pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--instances", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--grace", type=float, default=3.0, help="DRAIN_GRACE_SECONDS of the instances")
+    parser.add_argument("--lease", type=float, default=6.0, help="SCHEDULER_LEASE_SECONDS")
+    parser.add_argument("--settle", type=float, default=5.0, help="steady load before/between restarts")
+    parser.add_argument("--strict-ready", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the instances' output")
+    args = parser.parse_args()
+
+    mongo = motor.motor_asyncio.AsyncIOMotorClient(args.mongo_uri)
+    await mongo.drop_database(DB_NAME)
+    db = mongo[DB_NAME]
+    await db.seats.insert_many([
+        {"seat_id": f"{row}{n}", "status": "free", "physical_status": "free",
+         "next_booking_start_time": None, "today_bookings": []}
+        for row in "ABCD" for n in range(1, 26)
+    ])
+
+    instances = [Instance(i, args.base_port + i, args) for i in range(args.instances)]
+    for instance in instances:
+        instance.start()
+    lb = LoadBalancer(instances, args.strict_ready)
+    stats = Stats()
+    stop = asyncio.Event()
+    lease_events: list = []
+    tasks = [asyncio.create_task(lb.health_checks(0.5)), asyncio.create_task(watch_lease(db, lease_events, stop))]
+    try:
+        deadline = time.perf_counter() + 60
+        while not all(i.routable for i in instances):
+            if time.perf_counter() > deadline:
+                raise SystemExit("instances did not become ready within 60 s")
+            await asyncio.sleep(0.2)
+        rng = random.Random(1)
+        tasks += [
+            asyncio.create_task(worker(lb, stats, random.Random(rng.random()), stop))
+            for _ in range(args.concurrency)
+        ]
+        await asyncio.sleep(1)
+        stats.phase = "steady"
+        await asyncio.sleep(args.settle)
+
+        for instance in instances:
+            stats.phase = "restarting"
+            drain = await instance.stop()
+            print(f"instance {instance.index}: drained and exited in {drain:.1f}s")
+            instance.start()
+            while not instance.routable:
+                await asyncio.sleep(0.1)
+            stats.phase = "steady"
+            await asyncio.sleep(args.settle)
+    finally:
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for instance in instances:
+            if instance.process and instance.process.poll() is None:
+                await instance.stop()
+        await lb.client.aclose()
+
+    for phase in ("steady", "restarting"):
+        lat = stats.latencies.get(phase, [])
+        failures = stats.failures.get(phase, {})
+        print(
+            f"{phase:10s} {stats.requests.get(phase, 0):7d} requests  "
+            f"{sum(failures.values()):4d} failed {failures or ''}  "
+            f"p50 {pct(lat, 0.5):6.1f} ms  p99 {pct(lat, 0.99):6.1f} ms"
+        )
+    gaps = [gap for _, gap in lease_events[1:]]
+    print(
+        f"scheduler lease: {len(lease_events) - 1} hand-off(s), "
+        f"longest without a holder {max(gaps, default=0.0):.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""Startup replay of the seat event log: snapshots + tail vs. the full log.
+
+Builds a log for N seats (a "created" event plus --events-per-seat changes
+each), snapshots it, appends --tail more events per seat, then times
+seat_log.replay(). With --compare-full it also replays with the snapshots
+deleted. Every replay must fold to the same state as the log was built with.
+
+The "fold only" line is the in-process share: the same documents replayed
+from memory. Against mongomock the rest is mongomock's own scan and copy
+cost, which is far slower than a real server — use --mongo-uri for
+representative totals.
+
+    cd backend-local
+    python benchmarks/bench_seat_replay.py [--seats 5000] [--events-per-seat 20] [--tail 2] [--compare-full]
+    python benchmarks/bench_seat_replay.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from _db import init_bench_db
+
+from app.eventlog.seats import fold, seat_log
+from app.models.seat_event import SeatEventDocument, SeatSnapshotDocument
+
+STATUSES = ("free", "reserved", "upcoming", "awaiting_checkin", "occupied")
+
+
+def random_event(rng: random.Random, seat_id: str) -> dict:
+    kind = rng.choice(("booked", "cancelled", "upcoming", "activated", "checked_in", "ir_changed", "expired"))
+    if kind == "ir_changed":
+        changes = {"physical_status": rng.choice(("free", "occupied"))}
+    elif kind in ("booked", "cancelled", "expired"):
+        start = rng.randrange(0, 44)
+        changes = {
+            "status": rng.choice(STATUSES),
+            "today_bookings": [{"start_slot": start, "end_slot": start + rng.randrange(1, 4)}],
+            "next_booking_start_time": None,
+        }
+    else:
+        changes = {"status": rng.choice(STATUSES)}
+    return seat_log.event(seat_id, kind, changes)
+
+
+async def append_round(seat_ids: list[str], make) -> None:
+    # Bulk-load straight into the collection; appending is not what's measured.
+    events = [make(seat_id) for seat_id in seat_ids]
+    await SeatEventDocument.get_motor_collection().insert_many(events, ordered=False)
+    for event in events:
+        seat_log._apply(event)
+
+
+async def timed_replay() -> float:
+    t0 = time.perf_counter()
+    await seat_log.replay()
+    return (time.perf_counter() - t0) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--events-per-seat", type=int, default=20)
+    parser.add_argument("--tail", type=int, default=2, help="events per seat after the snapshot")
+    parser.add_argument("--compare-full", action="store_true", help="also replay without snapshots (slow)")
+    parser.add_argument("--mongo-uri", help="real MongoDB (scratch database); default in-memory")
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri, models=[SeatEventDocument, SeatSnapshotDocument])
+    rng = random.Random(7)
+    seat_ids = [f"S{i:05d}" for i in range(args.seats)]
+
+    await append_round(seat_ids, lambda s: seat_log.event(s, "created", {
+        "status": "free", "physical_status": "free", "today_bookings": [], "next_booking_start_time": None,
+    }))
+    for _ in range(args.events_per_seat):
+        await append_round(seat_ids, lambda s: random_event(rng, s))
+    await seat_log.snapshot(settle_seconds=0)
+    for _ in range(args.tail):
+        await append_round(seat_ids, lambda s: random_event(rng, s))
+    expected = {k: dict(v) for k, v in seat_log.states.items()}
+    total = args.seats * (1 + args.events_per_seat + args.tail)
+
+    with_snapshots = await timed_replay()
+    assert seat_log.states == expected, "replay from snapshots diverged"
+
+    # Same work minus the database: fold the documents replay() read.
+    snaps = await SeatSnapshotDocument.get_motor_collection().find({}).to_list(None)
+    floor = max(s["watermark"] for s in snaps)
+    tail = await SeatEventDocument.get_motor_collection().find({"_id": {"$gt": floor}}).sort("_id", 1).to_list(None)
+    t0 = time.perf_counter()
+    states = {s["_id"]: s["state"] for s in snaps}
+    last = {s["_id"]: s["last_event_id"] for s in snaps}
+    for event in tail:
+        if event["_id"] > last.get(event["seat_id"], ""):
+            states[event["seat_id"]] = fold(states.get(event["seat_id"], {}), event)
+    fold_only = (time.perf_counter() - t0) * 1000
+    assert states == expected
+
+    backend = "MongoDB" if args.mongo_uri else "mongomock"
+    print(f"{args.seats} seats, {total} events in the log ({backend}); replay matches")
+    print(f"snapshots + {args.tail} event(s)/seat  {with_snapshots:8.1f} ms")
+    print(f"  fold only                {fold_only:8.1f} ms")
+
+    if args.compare_full:
+        await SeatSnapshotDocument.get_motor_collection().delete_many({})
+        full_log = await timed_replay()
+        assert seat_log.states == expected, "full replay diverged"
+        print(f"full log                   {full_log:8.1f} ms   ({full_log / with_snapshots:.1f}x slower)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""GET /seats serialization: Pydantic round trip vs. the orjson fast path.
+
+Both paths start from the raw documents Mongo hands back and end at the
+response body bytes; the benchmark asserts the bytes are identical.
+
+    cd backend-local
+    python benchmarks/bench_serialization.py [--seats 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from _db import init_bench_db
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.models.seat import SeatDocument
+from app.responses import api_response, seat_out
+from app.schemas.common import ApiResponse
+from app.schemas.seat import SeatOut, TimeSlotOut
+
+
+def make_raw_seats(n: int) -> list[dict]:
+    rng = random.Random(42)
+    docs = []
+    for i in range(n):
+        bookings, slot = [], rng.randrange(0, 10)
+        while slot < 44 and rng.random() < 0.7:
+            end = slot + rng.randrange(1, 5)
+            bookings.append({"start_slot": slot, "end_slot": end})
+            slot = end + rng.randrange(1, 6)
+        docs.append({
+            "seat_id": f"S{i:05d}",
+            "status": rng.choice(("free", "reserved", "upcoming", "awaiting_checkin", "occupied")),
+            "physical_status": rng.choice(("free", "occupied")),
+            # Mongo hands datetimes back naive and millisecond-truncated.
+            "next_booking_start_time": datetime(2026, 2, 21, 9, 30, 0, 123000) if bookings else None,
+            "today_bookings": bookings,
+        })
+    return docs
+
+
+def old_path(raw: list[dict]) -> bytes:
+    seats = [SeatDocument.model_validate(d) for d in raw]  # what find_all().to_list() does
+    data = [
+        SeatOut(
+            seat_id=s.seat_id,
+            status=s.status,
+            physical_status=s.physical_status,
+            next_booking_start_time=(
+                s.next_booking_start_time.isoformat() if s.next_booking_start_time else None
+            ),
+            today_bookings=[
+                TimeSlotOut(start_slot=b.start_slot, end_slot=b.end_slot)
+                for b in s.today_bookings
+            ],
+        )
+        for s in seats
+    ]
+    envelope = ApiResponse(
+        success=True,
+        message="Seats fetched successfully",
+        data=[d.model_dump(by_alias=True) for d in data],
+    )
+    # FastAPI: validate against response_model, then jsonable_encoder + JSONResponse.
+    validated = ApiResponse[list[SeatOut]].model_validate(envelope.model_dump())
+    return JSONResponse(jsonable_encoder(validated, by_alias=True)).body
+
+
+def new_path(raw: list[dict]) -> bytes:
+    return api_response(True, "Seats fetched successfully", [seat_out(d) for d in raw]).body
+
+
+def bench(fn, raw, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(raw)
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await init_bench_db(None)  # Beanie must be initialised to build SeatDocuments
+    raw = make_raw_seats(args.seats)
+    assert old_path(raw) == new_path(raw), "fast path changed the response bytes"
+
+    old_ms = bench(old_path, raw, args.repeat)
+    new_ms = bench(new_path, raw, args.repeat)
+    print(f"{args.seats} seats, best of {args.repeat}; response bodies identical")
+    print(f"pydantic round trip  {old_ms:8.1f} ms")
+    print(f"orjson fast path     {new_ms:8.1f} ms   ({old_ms / new_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""1,000 bookings starting on the same slot: per-booking jobs vs. boundary handlers.
+
+"legacy" replays what the old per-booking jobs did (find_one + save + one
+publish per booking for upcoming, activation and check-in timeout); "boundary"
+runs the slot-boundary handlers from app/scheduler/pool.py. Every seat is
+left a no-show so the timeout path does real work too.
+
+    cd backend-local
+    python benchmarks/bench_slot_boundary.py [--bookings 1000] [--mongo-uri mongodb://localhost:27017]
+
+Without --mongo-uri an in-memory mongomock database is used: that measures
+the Python side only, and the round-trip counts are the interesting number.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from _db import init_bench_db
+
+import app.scheduler.pool as pool
+from app.models.booking import BookingDocument
+from app.models.seat import SeatDocument, TimeSlotEmbed
+
+SLOT = 20
+published: list[tuple[str, str]] = []
+round_trips = 0
+
+
+def _count(n: int = 1) -> None:
+    global round_trips
+    round_trips += n
+
+
+async def populate(n: int) -> None:
+    await SeatDocument.get_motor_collection().delete_many({})
+    await BookingDocument.get_motor_collection().delete_many({})
+    await SeatDocument.insert_many([
+        SeatDocument(
+            seat_id=f"S{i:05d}", status="reserved",
+            today_bookings=[TimeSlotEmbed(start_slot=SLOT, end_slot=SLOT + 4)],
+        )
+        for i in range(n)
+    ])
+    now = datetime.now(timezone.utc)
+    await BookingDocument.insert_many([
+        BookingDocument(
+            booking_id=f"BK{i:06d}", seat_id=f"S{i:05d}", student_id=f"s{i}",
+            start_slot=SLOT, end_slot=SLOT + 4, pin_code_hash="x", created_at=now,
+        )
+        for i in range(n)
+    ])
+
+
+async def legacy(n: int) -> None:
+    """The old _upcoming_booking / _activate_booking / _checkin_timeout, once per booking."""
+    ids = [(f"BK{i:06d}", f"S{i:05d}") for i in range(n)]
+    for _, seat_id in ids:
+        seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id); _count()
+        if seat and seat.status in ("reserved", "free"):
+            seat.status = "upcoming"
+            await seat.save(); _count()
+            published.append((seat_id, "upcoming"))
+    for _, seat_id in ids:
+        seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id); _count()
+        seat.status = "awaiting_checkin"
+        await seat.save(); _count()
+        published.append((seat_id, "awaiting_checkin"))
+    for booking_id, seat_id in ids:
+        seat = await SeatDocument.find_one(SeatDocument.seat_id == seat_id); _count()
+        booking = await BookingDocument.find_one(BookingDocument.booking_id == booking_id); _count()
+        booking.status = "cancelled"
+        await booking.save(); _count()
+        seat.today_bookings = []
+        seat.status = "free"
+        seat.next_booking_start_time = None
+        await seat.save(); _count()
+        published.append((seat_id, "free"))
+
+
+async def boundary(n: int) -> None:
+    await pool._upcoming_boundary(SLOT)
+    await pool._slot_boundary(SLOT)
+    await pool._slot_boundary(SLOT + 1)
+
+
+async def check_final_state(n: int) -> None:
+    free = await SeatDocument.find(SeatDocument.status == "free").count()
+    cancelled = await BookingDocument.find(BookingDocument.status == "cancelled").count()
+    assert free == n and cancelled == n, (free, cancelled)
+
+
+def _count_motor_calls() -> None:
+    """Count round trips made by the boundary handlers via the collection methods they use."""
+    from motor.motor_asyncio import AsyncIOMotorCollection
+    try:
+        from mongomock_motor import AsyncMongoMockCollection
+        classes = [AsyncIOMotorCollection, AsyncMongoMockCollection]
+    except ImportError:
+        classes = [AsyncIOMotorCollection]
+    for cls in classes:
+        for name in ("find", "update_many", "bulk_write", "insert_many"):  # insert_many: seat log
+            original = getattr(cls, name)
+
+            def wrapper(self, *a, __original=original, **kw):
+                _count()
+                return __original(self, *a, **kw)
+            setattr(cls, name, wrapper)
+
+
+async def main() -> None:
+    global round_trips
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    await init_bench_db(args.mongo_uri)
+    pool.publish_booking_statuses = lambda updates: published.extend(updates)
+
+    await populate(args.bookings)
+    t0 = time.perf_counter()
+    await legacy(args.bookings)
+    legacy_s, legacy_trips, legacy_msgs = time.perf_counter() - t0, round_trips, len(published)
+    await check_final_state(args.bookings)
+
+    await populate(args.bookings)
+    published.clear()
+    round_trips = 0
+    _count_motor_calls()
+    t0 = time.perf_counter()
+    await boundary(args.bookings)
+    boundary_s = time.perf_counter() - t0
+    await check_final_state(args.bookings)
+
+    print(f"{args.bookings} bookings starting at slot {SLOT} ({'mongodb' if args.mongo_uri else 'mongomock'})")
+    print(f"per-booking jobs  {legacy_s * 1000:9.1f} ms  {legacy_trips:6d} round trips  {legacy_msgs} publishes")
+    print(f"slot boundaries   {boundary_s * 1000:9.1f} ms  {round_trips:6d} round trips  {len(published)} publishes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""Startup-time benchmark: how long until the API answers GET /health?
+
+Runs each measurement in a fresh interpreter so module imports are cold.
+Points MongoDB and MQTT at unreachable hosts on purpose — startup must not
+wait on either of them.
+
+    cd backend-local
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = r"""
+import asyncio, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+import httpx
+
+async def probe():
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            resp = await client.get("/health")
+            assert resp.status_code == 200, resp.status_code
+            t_health = time.perf_counter() - t0
+            ready = (await client.get("/ready")).json()["data"]
+    return t_health, ready
+
+t_health, ready = asyncio.run(probe())
+print(f"{t_import:.6f} {t_health:.6f} {ready}")
+"""
+
+_ENV = {
+    "MONGO_URI": "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100",
+    "HIVEMQ_HOST": "127.0.0.1",
+    "HIVEMQ_PORT": "1",
+    "HIVEMQ_USERNAME": "bench",
+    "HIVEMQ_PASSWORD": "bench",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, **_ENV}
+    imports, healths = [], []
+    ready = None
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        t_import, t_health, ready = out.split(" ", 2)
+        imports.append(float(t_import) * 1000)
+        healths.append(float(t_health) * 1000)
+
+    print(f"runs: {args.runs}")
+    print(f"import main        median {statistics.median(imports):8.1f} ms")
+    print(f"first /health 200  median {statistics.median(healths):8.1f} ms")
+    print(f"/ready at that point: {ready}")
+
+
+if __name__ == "__main__":
+    main()
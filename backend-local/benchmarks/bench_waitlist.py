@@ -0,0 +1,57 @@
+"""Waitlist matching throughput with a large queue.
+
+Fills the in-memory index with --waiting requests (random 30 min–3 h
+intervals), then offers --gaps freed seat gaps of random size and reports
+how fast they are matched.
+
+    cd backend-local
+    python benchmarks/bench_waitlist.py [--waiting 10000] [--gaps 2000]
+"""
+import argparse
+import random
+import time
+
+import _db  # noqa: F401  (puts backend-local on sys.path)
+from app.allocation.waitlist import WaitEntry, WaitlistIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--waiting", type=int, default=10_000)
+    parser.add_argument("--gaps", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    index = WaitlistIndex()
+    t0 = time.perf_counter()
+    for i in range(args.waiting):
+        start = rng.randrange(18, 44)
+        end = min(48, start + rng.randrange(1, 7))
+        index.add(WaitEntry(f"WL{i:06d}", f"s{rng.randrange(args.waiting)}", start, end, "x"))
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    gaps = []
+    for _ in range(args.gaps):
+        lo = rng.randrange(18, 46)
+        gaps.append((lo, min(48, lo + rng.randrange(1, 9))))
+
+    latencies, matched = [], 0
+    t0 = time.perf_counter()
+    for lo, hi in gaps:
+        g0 = time.perf_counter()
+        matched += len(index.match(lo, hi))
+        latencies.append(time.perf_counter() - g0)
+    total = time.perf_counter() - t0
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+    print(f"{args.waiting} waiting requests indexed in {load_ms:.1f} ms")
+    print(f"{args.gaps} freed gaps -> {matched} assignments in {total * 1000:.1f} ms "
+          f"({args.gaps / total:,.0f} gaps/s, {matched / total:,.0f} assignments/s)")
+    print(f"per-gap latency p50 {p(0.5):.0f} us  p99 {p(0.99):.0f} us  max {latencies[-1] * 1e6:.0f} us")
+    print(f"{len(index)} requests still waiting")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,76 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import init_db
-from app.mqtt.client import connect_and_loop_start, disconnect
-from app.scheduler.pool import scheduler, schedule_status_broadcast
-from app.routers import seats, bookings, checkin
+from app import lifecycle, readiness
+from app.admission.middleware import AdmissionMiddleware
+from app.admission.shedding import start_lag_monitor, stop_lag_monitor
+from app.cache.watcher import stop_change_streams
+from app.database import close_db, init_db_with_retry
+from app.config import get_settings
+from app.mqtt.client import connect_and_loop_start, disconnect, stop_ingest
+from app.scheduler.pool import (
+    drain_scheduler, scheduler, schedule_day_boundaries, schedule_lease_renewal,
+    schedule_seat_snapshots, schedule_status_broadcast,
+)
+from app.routers import seats, bookings, checkin, health, waitlist, events, metrics, recurring, admin
 
 # ---------------------------------------------------------------------------
-# Demo mode toggle
-# Set to True  → wipe DB on startup and load rich mock data for the pitch demo.
-# Set to False → leave any existing data in place; seed 12 clean seats only if
-#                the collection is empty (production / fresh-install behaviour).
+# Startup runs in readiness phases so /health answers immediately:
+#   1. MQTT    — connect_async(); paho's thread connects and retries on its own.
+#   2. Database — init_db_with_retry() runs as a background task.
+#   3. Scheduler — started in-process (cheap, no I/O).
+# GET /ready reports which of these are up.
+#
+# Shutdown drains in order (app/lifecycle.py): not-ready and a grace period
+# for the load balancer, stop taking requests and device messages, let
+# running work and scheduler jobs finish, hand off the scheduler lease,
+# flush MQTT publishes, then close connections.
+#
+# Seeding is no longer part of startup. Run it explicitly when needed:
+#   python seed.py           → seed 12 clean seats if the collection is empty
+#   python seed.py --demo    → wipe DB and load rich mock data for the pitch demo
 # ---------------------------------------------------------------------------
-USE_DEMO_DATA: bool = True
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     # --- Startup ---
-    await init_db(use_demo_data=USE_DEMO_DATA)
+    start_lag_monitor()
     connect_and_loop_start()
+    db_task = asyncio.create_task(init_db_with_retry())
     scheduler.start()
+    schedule_day_boundaries()
     schedule_status_broadcast()
-    print("[App] Startup complete.")
+    schedule_seat_snapshots()
+    schedule_lease_renewal()
+    readiness.mark("scheduler")
+    lifecycle.install_signal_handlers(get_settings().drain_grace_seconds)
+    print("[App] Serving; subsystems starting in background.")
     yield
     # --- Shutdown ---
-    disconnect()
-    scheduler.shutdown()
+    deadline = time.monotonic() + get_settings().shutdown_timeout_seconds
+    lifecycle.start_draining()
+    lifecycle.stop_accepting()
+    stop_ingest()
+    left = await lifecycle.wait_idle(deadline)
+    if left:
+        print(f"[App] {left} device message handler(s) still running at the shutdown deadline")
+    await drain_scheduler(deadline)
+    db_task.cancel()
+    await stop_change_streams()
+    disconnect(max(0.0, deadline - time.monotonic()))
+    close_db()
+    stop_lag_monitor()
     print("[App] Shutdown complete.")
 
 
 app = FastAPI(title="Smart Library Seat Reservation", lifespan=lifespan)
 
+# Added first so it sits inside CORS: rejections still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -41,6 +79,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(health.router)
 app.include_router(seats.router)
 app.include_router(bookings.router)
+app.include_router(recurring.router)
 app.include_router(checkin.router)
+app.include_router(waitlist.router)
+app.include_router(events.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
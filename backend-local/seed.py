@@ -0,0 +1,45 @@
+"""Seed the database from the command line (no longer done at API startup).
+
+    python seed.py           # seed 12 clean seats if the collection is empty
+    python seed.py --demo    # wipe everything and load the rich pitch-demo data
+    python seed.py --seats seats.csv --bookings history.jsonl
+                             # stream large files in (see app/loader/bulk.py)
+"""
+import argparse
+import asyncio
+
+from app.database import close_db, init_db, seed_seats, seed_demo_data
+from app.loader.bulk import load
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await init_db()
+    try:
+        if args.seats or args.bookings:
+            # Seats first: imported bookings refer to them.
+            for kind, path in (("seats", args.seats), ("bookings", args.bookings)):
+                if path:
+                    await load(kind, path, args.chunk_size, args.concurrency, args.restart)
+        elif args.demo:
+            await seed_demo_data()
+        else:
+            await seed_seats()
+    finally:
+        close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the library seat database.")
+    parser.add_argument(
+        "--demo", action="store_true",
+        help="wipe seats/bookings and load the pitch-demo data set",
+    )
+    parser.add_argument("--seats", metavar="FILE", help="provision seats from a .csv or .jsonl file")
+    parser.add_argument("--bookings", metavar="FILE", help="import bookings from a .csv or .jsonl file")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per write (default 1000)")
+    parser.add_argument("--concurrency", type=int, default=4, help="chunk writes in flight (default 4)")
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="ignore the .checkpoint file and start from the first row",
+    )
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,283 @@
+"""Fleet simulator: thousands of virtual seat devices against one broker.
+
+Each virtual seat is an asyncio task that behaves like hardware/python/main.py:
+it publishes IR edges to library/seat/{id}/ir, types PINs to
+library/seat/{id}/check-in, and listens on library/seat/{id}/booking_status.
+Seats share a small pool of MQTT connections (paho runs one network thread
+per connection), so 5,000 seats don't need 5,000 sockets.
+
+What gets measured:
+  * publish ack latency   — device publish -> broker PUBACK (QoS 1)
+  * check-in echo latency — correct-PIN check-in publish -> the seat's next
+                            "occupied" booking_status (the backend only
+                            answers correct PINs for seats that are
+                            awaiting_checkin; pass --pins so the simulator
+                            types the right ones). Other statuses (the 30 s
+                            broadcast, boundary transitions) don't count, and
+                            wrong PINs are only counted.
+  * booking_status fan-out — statuses received per second across the fleet
+
+Run against a local broker (mosquitto -p 1883) and a backend pointed at it:
+
+    python fleet_sim.py --seats 5000 --duration 60
+    python fleet_sim.py --ramp 500,1000,2000,5000 --duration 30   # find saturation
+    python fleet_sim.py --seats 200 --pins pins.json              # {"S00001": "1234", ...}
+    python fleet_sim.py --protocol binary   # compact frames (backend: MQTT_PROTOCOL=binary)
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import ssl
+import statistics
+import struct
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.enums import CallbackAPIVersion
+
+TOPICS = {
+    # status (subscribe), ir, check-in
+    "text": ("library/seat/{}/booking_status", "library/seat/{}/ir", "library/seat/{}/check-in"),
+    "binary": ("ls/{}/s", "ls/{}/i", "ls/{}/c"),
+}
+FRAME_VERSION = 0x81
+STATUS_FRAME = struct.Struct("!BBHI")
+CHECKIN_FRAME = struct.Struct("!BHHI")
+IR_CODES = {"free": 0, "occupied": 4}
+OCCUPIED_CODE = 4  # STATUS_CODES["occupied"] in backend-local/app/mqtt/protocol.py
+
+
+class Stats:
+    def __init__(self):
+        self.published = 0
+        self.ack_latencies = []
+        self.echo_latencies = []
+        self.echo_timeouts = 0
+        self.wrong_pins = 0
+        self.statuses_received = 0
+        self.started = time.perf_counter()
+
+    def report(self, label, seats):
+        elapsed = time.perf_counter() - self.started
+        print(f"--- {label}: {seats} seats, {elapsed:.1f}s ---")
+        print(f"published        {self.published:8d}  ({self.published / elapsed:8.1f} msg/s)")
+        print(f"status received  {self.statuses_received:8d}  ({self.statuses_received / elapsed:8.1f} msg/s)")
+        _print_latency("publish ack", self.ack_latencies)
+        _print_latency("check-in echo", self.echo_latencies)
+        if self.echo_timeouts:
+            print(f"check-in echo timeouts: {self.echo_timeouts}")
+        if self.wrong_pins:
+            print(f"wrong-PIN check-ins:    {self.wrong_pins}")
+
+
+def _print_latency(name, samples):
+    if not samples:
+        print(f"{name:16s} no samples")
+        return
+    ordered = sorted(samples)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    print(
+        f"{name:16s} n={len(ordered):<7d} p50 {pct(0.50):7.1f} ms  p95 {pct(0.95):7.1f} ms  "
+        f"p99 {pct(0.99):7.1f} ms  max {ordered[-1] * 1000:7.1f} ms  mean {statistics.mean(ordered) * 1000:7.1f} ms"
+    )
+
+
+class Connection:
+    """One paho client carrying a slice of the fleet."""
+
+    def __init__(self, index, args, loop, fleet):
+        self.loop = loop
+        self.fleet = fleet
+        self.pending_acks = {}
+        self.ready = asyncio.Event()
+        self.client = mqtt.Client(CallbackAPIVersion.VERSION2, client_id=f"fleet-sim-{index}-{random.getrandbits(24):06x}")
+        if args.username:
+            self.client.username_pw_set(args.username, args.password)
+        if args.tls:
+            self.client.tls_set(tls_version=ssl.PROTOCOL_TLS_CLIENT)
+        self.client.max_inflight_messages_set(1000)
+        self.client.max_queued_messages_set(0)
+        self.client.on_connect = self._on_connect
+        self.client.on_publish = self._on_publish
+        self.client.on_message = self._on_message
+        self.client.connect_async(args.host, args.port, keepalive=60)
+        self.client.loop_start()
+        self.seat_ids = []
+        self.status_topic = TOPICS[args.protocol][0]
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code == 0:
+            for seat_id in self.seat_ids:
+                client.subscribe(self.status_topic.format(seat_id), 0)
+            self.loop.call_soon_threadsafe(self.ready.set)
+        else:
+            print(f"[fleet] connection refused: {reason_code}")
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        now = time.perf_counter()
+        self.loop.call_soon_threadsafe(self._record_ack, mid, now)
+
+    def _record_ack(self, mid, now):
+        sent = self.pending_acks.pop(mid, None)
+        if sent is not None:
+            self.fleet.stats.ack_latencies.append(now - sent)
+
+    def _on_message(self, client, userdata, msg):
+        now = time.perf_counter()
+        seat_id = msg.topic.split("/")[-2]
+        self.loop.call_soon_threadsafe(self.fleet.on_status, seat_id, msg.payload, now)
+
+    def publish(self, topic, payload):
+        sent = time.perf_counter()
+        info = self.client.publish(topic, payload, qos=1)
+        self.pending_acks[info.mid] = sent
+        self.fleet.stats.published += 1
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class Fleet:
+    def __init__(self, args, seat_ids, pins):
+        self.args = args
+        self.seat_ids = seat_ids
+        self.pins = pins
+        self.stats = Stats()
+        self.awaiting_echo = {}
+        self.occupied = set()  # seats whose last status was "occupied"
+        self.connections = []
+
+    def on_status(self, seat_id, payload, received_at):
+        self.stats.statuses_received += 1
+        if self.args.protocol == "binary":
+            occupied = len(payload) == STATUS_FRAME.size and payload[1] == OCCUPIED_CODE
+        else:
+            occupied = payload == b"occupied"
+        was_occupied = seat_id in self.occupied
+        if not occupied:
+            self.occupied.discard(seat_id)
+            return
+        self.occupied.add(seat_id)
+        if was_occupied:
+            return  # the backend's 30-second re-broadcast, not a check-in's echo
+        sent = self.awaiting_echo.pop(seat_id, None)
+        if sent is not None:
+            self.stats.echo_latencies.append(received_at - sent)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        n_conn = max(1, min(self.args.connections, len(self.seat_ids)))
+        self.connections = [Connection(i, self.args, loop, self) for i in range(n_conn)]
+        for seat_id, conn in zip(self.seat_ids, itertools.cycle(self.connections)):
+            conn.seat_ids.append(seat_id)
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(c.ready.wait() for c in self.connections)), timeout=30
+            )
+        except asyncio.TimeoutError:
+            raise SystemExit(f"[fleet] could not connect to {self.args.host}:{self.args.port}")
+        # Let the SUBSCRIBEs land before the traffic starts.
+        await asyncio.sleep(1)
+
+        self.stats = Stats()
+        deadline = time.perf_counter() + self.args.duration
+        seats = [
+            asyncio.create_task(self._seat(seat_id, conn, deadline))
+            for seat_id, conn in zip(self.seat_ids, itertools.cycle(self.connections))
+        ]
+        await asyncio.gather(*seats)
+        await asyncio.sleep(self.args.echo_timeout)
+        self.stats.echo_timeouts += len(self.awaiting_echo)
+        for conn in self.connections:
+            conn.close()
+        return self.stats
+
+    async def _seat(self, seat_id, conn, deadline):
+        """Presence pattern of one desk: arrive, maybe check in, stay with short
+        breaks, leave, stay empty for a while. Durations are exponential and
+        compressed by --time-scale so minutes of library time pass in seconds."""
+        rng = random.Random(f"{self.args.seed}:{seat_id}")
+        scale = self.args.time_scale
+        _, ir_topic, checkin_topic = (t.format(seat_id) for t in TOPICS[self.args.protocol])
+        binary = self.args.protocol == "binary"
+        seq = itertools.count()
+
+        def ir(state):
+            if not binary:
+                return state
+            return STATUS_FRAME.pack(FRAME_VERSION, IR_CODES[state], next(seq) & 0xFFFF, int(time.time()))
+
+        def checkin(pin):
+            if not binary:
+                return pin
+            return CHECKIN_FRAME.pack(FRAME_VERSION, int(pin), next(seq) & 0xFFFF, int(time.time()))
+
+        # Stagger start so the whole fleet doesn't fire in the same millisecond.
+        await asyncio.sleep(rng.uniform(0, min(5.0, self.args.duration / 4)))
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(rng.expovariate(1 / (20 * 60)) / scale)  # desk empty
+            if time.perf_counter() >= deadline:
+                break
+            conn.publish(ir_topic, ir("occupied"))
+
+            if rng.random() < self.args.checkin_probability:
+                await asyncio.sleep(rng.uniform(5, 40) / scale)  # sits down, finds keypad
+                pin = self.pins.get(seat_id)
+                if pin is None or rng.random() < 0.1:
+                    pin = f"{rng.randrange(10000):04d}"  # typo or no booking
+                if pin == self.pins.get(seat_id):
+                    self.awaiting_echo.setdefault(seat_id, time.perf_counter())
+                else:
+                    self.stats.wrong_pins += 1
+                conn.publish(checkin_topic, checkin(pin))
+
+            stay_until = time.perf_counter() + rng.expovariate(1 / (45 * 60)) / scale
+            while time.perf_counter() < min(stay_until, deadline):
+                await asyncio.sleep(rng.expovariate(1 / (15 * 60)) / scale)
+                if rng.random() < 0.2:  # short break: IR sees the desk empty
+                    conn.publish(ir_topic, ir("free"))
+                    await asyncio.sleep(rng.uniform(60, 300) / scale)
+                    conn.publish(ir_topic, ir("occupied"))
+            conn.publish(ir_topic, ir("free"))
+
+
+def _load_pins(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return {str(k): str(v) for k, v in json.load(f).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of seat devices over MQTT.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--seats", type=int, default=1000)
+    parser.add_argument("--ramp", help="comma-separated seat counts, run one phase each")
+    parser.add_argument("--seat-prefix", default="S")
+    parser.add_argument("--connections", type=int, default=16, help="MQTT connections shared by the fleet")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per phase")
+    parser.add_argument("--time-scale", type=float, default=300, help="library seconds per real second")
+    parser.add_argument("--checkin-probability", type=float, default=0.5)
+    parser.add_argument("--echo-timeout", type=float, default=5)
+    parser.add_argument("--pins", help="JSON file mapping seat id -> PIN to type")
+    parser.add_argument("--seed", default="fleet")
+    parser.add_argument("--protocol", choices=("text", "binary"), default="text")
+    args = parser.parse_args()
+
+    pins = _load_pins(args.pins)
+    phases = [int(n) for n in args.ramp.split(",")] if args.ramp else [args.seats]
+    for n in phases:
+        seat_ids = [f"{args.seat_prefix}{i:05d}" for i in range(1, n + 1)]
+        stats = asyncio.run(Fleet(args, seat_ids, pins).run())
+        stats.report(f"phase {n}", n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Floor gateway: one uplink to the cloud broker for a whole floor of desks.
+
+Desks on the floor connect to a local broker (mosquitto on the gateway box)
+instead of HiveMQ, using the same topics as ever (main.py with
+SEAT_BROKER_HOST pointing at the gateway). The gateway
+
+  * collects their IR readings and check-ins from the local broker,
+  * debounces IR: a seat's reading is only forwarded once it has held for
+    --debounce seconds, so someone shifting in their chair or a short break
+    never leaves the floor,
+  * forwards what is left every --flush-interval seconds as one message on
+    library/gateway/{floor}/batch (see backend-local/app/mqtt/protocol.py),
+  * relays booking_status from the cloud back to the local broker as retained
+    messages, and keeps the last status per seat on disk, so desks that
+    reboot while the uplink is down still show the right thing.
+
+Hundreds of desk connections and their chatter become one connection and a
+couple of messages a second. While the uplink is down, IR state keeps
+collapsing to the latest reading per seat and check-ins wait (up to
+--checkin-max-age seconds; an older PIN is no use to anyone).
+
+    mosquitto -p 1884 &
+    python gateway.py --floor F1 --seats 'A*,B*' --local-port 1884 \\
+        --upstream-host localhost --upstream-port 1883
+    SEAT_BROKER_HOST=localhost SEAT_BROKER_PORT=1884 python main.py
+
+Upstream credentials come from HIVEMQ_HOST / HIVEMQ_PORT / HIVEMQ_USERNAME /
+HIVEMQ_PASSWORD when not given on the command line; port 8883 means TLS.
+"""
+import argparse
+import collections
+import fnmatch
+import json
+import os
+import ssl
+import struct
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.enums import CallbackAPIVersion
+
+# Device topics, as in main.py and the backend's protocol.py.
+IR_TOPICS = ("library/seat/+/ir", "ls/+/i")
+CHECKIN_TOPICS = ("library/seat/+/check-in", "ls/+/c")
+STATUS_TOPICS = ("library/seat/+/booking_status", "ls/+/s")
+
+FRAME_VERSION = 0x81
+STATUS_FRAME = struct.Struct("!BBHI")
+CHECKIN_FRAME = struct.Struct("!BHHI")
+IR_STATES = {0: "free", 4: "occupied"}  # desks only send these two codes
+
+CHECKIN_DEDUPE_SECONDS = 10  # how long a check-in's QoS 1 redelivery is recognised
+MAX_BATCH = 500  # seats + check-ins per upstream message
+
+
+def parse_device_message(topic, payload):
+    """(seat_id, kind, value) for a desk message, or None. kind is "ir" or
+    "check-in"; binary frames are decoded so the batch is format-neutral."""
+    levels = topic.split("/")
+    if len(levels) < 3:
+        return None
+    seat_id, leaf = levels[-2], levels[-1]
+    if levels[0] == "ls":
+        try:
+            if leaf == "i" and len(payload) == STATUS_FRAME.size and payload[0] == FRAME_VERSION:
+                state = IR_STATES.get(STATUS_FRAME.unpack(payload)[1])
+                return (seat_id, "ir", state) if state else None
+            if leaf == "c" and len(payload) == CHECKIN_FRAME.size and payload[0] == FRAME_VERSION:
+                return seat_id, "check-in", f"{CHECKIN_FRAME.unpack(payload)[1]:04d}"
+        except struct.error:
+            pass
+        return None
+    value = payload.decode("utf-8", errors="replace").strip()
+    if leaf == "ir" and value in ("occupied", "free"):
+        return seat_id, "ir", value
+    if leaf == "check-in":
+        return seat_id, "check-in", value
+    return None
+
+
+class Debouncer:
+    """Latest IR reading per seat; a reading is due once it has held for
+    `hold` seconds and differs from what was last forwarded."""
+
+    def __init__(self, hold):
+        self.hold = hold
+        self.pending = {}    # seat -> (state, first seen)
+        self.forwarded = {}  # seat -> state the backend has
+
+    def reading(self, seat_id, state, now):
+        current = self.pending.get(seat_id)
+        if current is None or current[0] != state:
+            self.pending[seat_id] = (state, now)
+
+    def due(self, now):
+        ready = {}
+        for seat_id, (state, since) in list(self.pending.items()):
+            if state == self.forwarded.get(seat_id):
+                del self.pending[seat_id]  # flapped back before it was sent
+            elif now - since >= self.hold:
+                ready[seat_id] = state
+        return ready
+
+    def sent(self, readings):
+        for seat_id, state in readings.items():
+            self.forwarded[seat_id] = state
+            if self.pending.get(seat_id, (None,))[0] == state:
+                del self.pending[seat_id]
+
+    def forget_forwarded(self):
+        """After an uplink outage the backend may have missed a batch; send the
+        current state of every seat again."""
+        for seat_id, state in self.forwarded.items():
+            self.pending.setdefault(seat_id, (state, 0.0))
+        self.forwarded.clear()
+
+
+class Gateway:
+    def __init__(self, args):
+        self.args = args
+        self.patterns = [p.strip() for p in args.seats.split(",") if p.strip()]
+        self.lock = threading.Lock()
+        self.debouncer = Debouncer(args.debounce)
+        self.checkins = collections.deque()  # (seat, pin, received), bounded by --checkin-max-age
+        self.recent_pins = {}
+        self.statuses = self._load_cache()  # status topic -> payload (str or bytes)
+        self.uplink_up = False
+        self.counts = collections.Counter()
+        self.batch_topic = f"library/gateway/{args.floor}/batch"
+
+        self.local = mqtt.Client(CallbackAPIVersion.VERSION2, client_id=f"gateway-{args.floor}-local")
+        self.local.on_connect = self._on_local_connect
+        self.local.on_message = self._on_local_message
+        self.local.reconnect_delay_set(min_delay=1, max_delay=10)
+
+        self.upstream = mqtt.Client(CallbackAPIVersion.VERSION2, client_id=f"gateway-{args.floor}")
+        if args.upstream_username:
+            self.upstream.username_pw_set(args.upstream_username, args.upstream_password)
+        if args.upstream_port == 8883:
+            self.upstream.tls_set(tls_version=ssl.PROTOCOL_TLS_CLIENT)
+        self.upstream.on_connect = self._on_upstream_connect
+        self.upstream.on_disconnect = self._on_upstream_disconnect
+        self.upstream.on_message = self._on_upstream_message
+        self.upstream.reconnect_delay_set(min_delay=1, max_delay=60)
+
+    def serves(self, seat_id):
+        return not self.patterns or any(fnmatch.fnmatchcase(seat_id, p) for p in self.patterns)
+
+    # --- status cache -----------------------------------------------------
+    def _load_cache(self):
+        try:
+            with open(self.args.cache_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # binary frames are stored as hex
+        return {t: bytes.fromhex(v[4:]) if v.startswith("hex:") else v for t, v in cached.items()}
+
+    def _save_cache(self):
+        with self.lock:
+            snapshot = {
+                t: "hex:" + v.hex() if isinstance(v, bytes) else v for t, v in self.statuses.items()
+            }
+        tmp = self.args.cache_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self.args.cache_file)
+        except OSError as e:
+            print(f"[gateway] couldn't save status cache: {e}")
+
+    # --- local broker (desks) ----------------------------------------------
+    def _on_local_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code != 0:
+            print(f"[gateway] local broker refused: {reason_code}")
+            return
+        client.subscribe([(t, 1) for t in IR_TOPICS + CHECKIN_TOPICS])
+        # Re-seed retained statuses (the local broker may have restarted too).
+        with self.lock:
+            cached = list(self.statuses.items())
+        for topic, payload in cached:
+            client.publish(topic, payload, qos=1, retain=True)
+        print(f"[gateway] local broker connected, {len(cached)} cached status(es) republished")
+
+    def _on_local_message(self, client, userdata, msg):
+        parsed = parse_device_message(msg.topic, msg.payload)
+        if parsed is None:
+            return
+        seat_id, kind, value = parsed
+        if not self.serves(seat_id):
+            return
+        now = time.monotonic()
+        with self.lock:
+            self.counts["in"] += 1
+            if kind == "ir":
+                self.debouncer.reading(seat_id, value, now)
+                return
+            # Only a QoS 1 redelivery of a check-in already queued is dropped.
+            # A student retyping a PIN (perhaps after it was refused) is
+            # forwarded; the backend ignores repeats of an accepted one.
+            if msg.dup and now - self.recent_pins.get((seat_id, value), -1e9) < CHECKIN_DEDUPE_SECONDS:
+                return
+            self.recent_pins[(seat_id, value)] = now
+            self.checkins.append((seat_id, value, now))
+
+    # --- upstream broker (cloud) ---------------------------------------------
+    def _on_upstream_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code != 0:
+            print(f"[gateway] upstream refused: {reason_code}")
+            return
+        client.subscribe([(t, 1) for t in STATUS_TOPICS])
+        with self.lock:
+            self.uplink_up = True
+            self.debouncer.forget_forwarded()
+        print(f"[gateway] uplink to {self.args.upstream_host}:{self.args.upstream_port} up")
+
+    def _on_upstream_disconnect(self, client, userdata, flags, reason_code, properties):
+        with self.lock:
+            self.uplink_up = False
+        print(f"[gateway] uplink down ({reason_code}), serving cached statuses")
+
+    def _on_upstream_message(self, client, userdata, msg):
+        if not self.serves(msg.topic.split("/")[-2]):
+            return
+        payload = msg.payload if msg.topic.startswith("ls/") else msg.payload.decode("utf-8", errors="replace")
+        with self.lock:
+            if self.statuses.get(msg.topic) == payload:
+                return  # the backend re-broadcasts statuses; desks already have it
+            self.statuses[msg.topic] = payload
+            self.counts["status"] += 1
+        # Retained, so a desk that (re)connects gets it at once.
+        self.local.publish(msg.topic, payload, qos=1, retain=True)
+
+    # --- batching --------------------------------------------------------------
+    def flush(self):
+        now = time.monotonic()
+        with self.lock:
+            # Expire first, uplink or not: nothing else bounds the queue.
+            while self.checkins and now - self.checkins[0][2] > self.args.checkin_max_age:
+                self.checkins.popleft()
+                self.counts["expired"] += 1
+            self.recent_pins = {
+                k: t for k, t in self.recent_pins.items() if now - t < CHECKIN_DEDUPE_SECONDS
+            }
+            if not self.uplink_up:
+                return
+            ir = dict(list(self.debouncer.due(now).items())[:MAX_BATCH])
+            checkins = [self.checkins[i][:2] for i in range(min(len(self.checkins), MAX_BATCH - len(ir)))]
+        if not ir and not checkins:
+            return
+        payload = json.dumps({"ir": ir, "checkins": checkins}, separators=(",", ":"))
+        info = self.upstream.publish(self.batch_topic, payload, qos=1)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            return  # uplink went away; everything stays queued
+        with self.lock:
+            self.debouncer.sent(ir)
+            for _ in checkins:
+                self.checkins.popleft()
+            self.counts["batches"] += 1
+            self.counts["out"] += len(ir) + len(checkins)
+
+    def run(self):
+        self.local.connect_async(self.args.local_host, self.args.local_port, keepalive=30)
+        self.local.loop_start()
+        self.upstream.connect_async(self.args.upstream_host, self.args.upstream_port, keepalive=60)
+        self.upstream.loop_start()
+        print(f"[gateway] floor {self.args.floor}, seats {self.args.seats or '*'}")
+        last_report = last_save = time.monotonic()
+        saved_statuses = self.counts["status"]
+        try:
+            while True:
+                time.sleep(self.args.flush_interval)
+                self.flush()
+                now = time.monotonic()
+                if self.counts["status"] != saved_statuses and now - last_save >= 5:
+                    saved_statuses = self.counts["status"]
+                    self._save_cache()
+                    last_save = now
+                if now - last_report >= self.args.report_interval:
+                    c = self.counts
+                    print(
+                        f"[gateway] desk msgs in {c['in']}, forwarded {c['out']} in {c['batches']} "
+                        f"batch(es), statuses relayed {c['status']}, stale check-ins dropped {c['expired']}"
+                    )
+                    last_report = now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._save_cache()
+            for client in (self.local, self.upstream):
+                client.loop_stop()
+                client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-floor MQTT gateway for seat devices.")
+    parser.add_argument("--floor", required=True, help="gateway id, e.g. F1")
+    parser.add_argument("--seats", default="", help="seat id patterns served, e.g. 'A*,B*' (default: all)")
+    parser.add_argument("--local-host", default="localhost")
+    parser.add_argument("--local-port", type=int, default=1883)
+    parser.add_argument("--upstream-host", default=os.environ.get("HIVEMQ_HOST", "localhost"))
+    parser.add_argument("--upstream-port", type=int, default=int(os.environ.get("HIVEMQ_PORT", "8883")))
+    parser.add_argument("--upstream-username", default=os.environ.get("HIVEMQ_USERNAME"))
+    parser.add_argument("--upstream-password", default=os.environ.get("HIVEMQ_PASSWORD"))
+    parser.add_argument("--debounce", type=float, default=2.0, help="seconds an IR reading must hold")
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--checkin-max-age", type=float, default=60)
+    parser.add_argument("--report-interval", type=float, default=30)
+    parser.add_argument("--cache-file", default=None, help="default: gateway_{floor}_status.json here")
+    args = parser.parse_args()
+    if args.cache_file is None:
+        args.cache_file = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), f"gateway_{args.floor}_status.json"
+        )
+    Gateway(args).run()
+
+
+if __name__ == "__main__":
+    main()
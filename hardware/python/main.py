@@ -1,19 +1,32 @@
+import collections
+import itertools
+import json
+import os
+import statistics
+import struct
+import threading
 import time
 import paho.mqtt.client as mqtt
 from paho.mqtt.enums import CallbackAPIVersion
-import json
 
-from arduino.app_utils import App, Bridge
-
-current_reservation_status = "reserved"
+try:
+    from arduino.app_utils import App, Bridge
+except ImportError:
+    # Not running on the board: simulated IR sensor / display / keypad.
+    from sim_bridge import App, Bridge
 
 statuses = ("free", "reserved", "upcoming", "awaiting_checkin", "occupied")
 
 detect_distance = 60
-DETECT_SENSITIVITY_COUNT = 5
+DETECT_SENSITIVITY_COUNT = 5      # median window: this many samples decide "detected"
+SAMPLE_INTERVAL = 0.1             # seconds between IR samples (10 Hz)
+DISPLAY_REFRESH_INTERVAL = 1.0    # re-send the display state even if unchanged
+OUTBOX_MAX = 200                  # messages kept while the broker is unreachable
 
-host = "2299016638da456eaadc1dd4befc8bdd.s1.eu.hivemq.cloud"
-port = 8883
+# SEAT_BROKER_HOST / SEAT_BROKER_PORT point the desk at its floor gateway's
+# local broker instead (gateway.py); plain MQTT unless the port is 8883
+host = os.environ.get("SEAT_BROKER_HOST", "2299016638da456eaadc1dd4befc8bdd.s1.eu.hivemq.cloud")
+port = int(os.environ.get("SEAT_BROKER_PORT", "8883"))
 
 keep_alive = 200
 
@@ -22,65 +35,220 @@ password = "HackLondon-2026" #im too lazy to do the os.environ thing whatever it
 #also idk ive never done it before
 
 device_id = "A1"
-booking_stat_topic = "library/seat/"+device_id+"/booking_status"
-detect_stat_topic = "library/seat/"+device_id+"/ir"
-check_in_topic = "library/seat/"+device_id+"/check-in"
+
+# "text" talks the original plain-string topics. "binary" uses the compact
+# frames from backend-local/app/mqtt/protocol.py (the backend has to publish
+# them too: MQTT_PROTOCOL=binary or both)
+PROTOCOL = os.environ.get("SEAT_PROTOCOL", "text")
+
+if PROTOCOL == "binary":
+    booking_stat_topic = "ls/"+device_id+"/s"
+    detect_stat_topic = "ls/"+device_id+"/i"
+    check_in_topic = "ls/"+device_id+"/c"
+else:
+    booking_stat_topic = "library/seat/"+device_id+"/booking_status"
+    detect_stat_topic = "library/seat/"+device_id+"/ir"
+    check_in_topic = "library/seat/"+device_id+"/check-in"
+
+# binary frames: version, status code / pin, seq, unix time (big endian)
+FRAME_VERSION = 0x81
+status_frame = struct.Struct("!BBHI")
+checkin_frame = struct.Struct("!BHHI")
+seq = itertools.count()
+last_status_ts = 0
+
+
+def ir_payload(detected):
+    if PROTOCOL != "binary":
+        return "occupied" if detected else "free"
+    code = statuses.index("occupied" if detected else "free")
+    return status_frame.pack(FRAME_VERSION, code, next(seq) & 0xFFFF, int(time.time()))
+
+
+def checkin_payload(code):
+    if PROTOCOL != "binary":
+        return code
+    return checkin_frame.pack(FRAME_VERSION, int(code), next(seq) & 0xFFFF, int(time.time()))
+
+
+def parse_status(payload):
+    """booking_status payload -> status name, or None to ignore it"""
+    global last_status_ts
+    if PROTOCOL != "binary":
+        return payload.decode("utf-8").strip()
+    if len(payload) != status_frame.size or payload[0] != FRAME_VERSION:
+        return None
+    _, code, _, ts = status_frame.unpack(payload)
+    if code >= len(statuses) or ts < last_status_ts:
+        return None  # garbage, or older than what we already show
+    last_status_ts = ts
+    return statuses[code]
+
+# last booking_status we heard, kept on disk so a reboot while offline still
+# shows the right thing on the display
+STATUS_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "booking_status_cache.json")
+
+
+def load_cached_status():
+    try:
+        with open(STATUS_CACHE_FILE) as f:
+            cached = json.load(f).get(device_id)
+        if cached in statuses:
+            return cached
+    except (OSError, ValueError):
+        pass
+    return "free"
+
+
+def save_cached_status(status):
+    try:
+        with open(STATUS_CACHE_FILE, "w") as f:
+            json.dump({device_id: status}, f)
+    except OSError as e:
+        print(f"couldnt save status cache: {e}")
+
+
+current_reservation_status = load_cached_status()
+
+# --- outbound queue -------------------------------------------------------
+# Everything we publish goes through here. While disconnected messages wait in
+# `outbox`, where a newer IR state replaces an older one. Once handed to paho
+# at QoS 1 a message is paho's: it keeps it until the broker acks it and
+# resends it after a reconnect, so it is never queued here again (that sent
+# every unacked message twice).
+# Only the sensor loop calls client.publish, and outbox_lock is never held
+# while calling into paho, so paho's callbacks can't deadlock against us.
+outbox = collections.deque()
+outbox_lock = threading.Lock()
+connected = False
+
+
+def enqueue(topic, payload):
+    with outbox_lock:
+        if topic == detect_stat_topic:
+            # only the latest IR state matters, drop any older one still waiting
+            for queued in [m for m in outbox if m[0] == topic]:
+                outbox.remove(queued)
+        if len(outbox) >= OUTBOX_MAX:
+            dropped = outbox.popleft()
+            print(f"outbox full, dropping oldest: {dropped}")
+        outbox.append((topic, payload))
+
+
+def flush_outbox():
+    while connected:
+        with outbox_lock:
+            if not outbox:
+                return
+            msg = outbox.popleft()
+        info = client.publish(msg[0], msg[1], qos=1)
+        if info.rc == mqtt.MQTT_ERR_QUEUE_SIZE:
+            # paho's queue is full (broker not acking): the only case where
+            # paho didn't keep the message, so it waits here
+            with outbox_lock:
+                outbox.appendleft(msg)
+            return
+        # anything else, MQTT_ERR_NO_CONN included, is queued inside paho
+
 
 def on_message(cl, userdata, msg):
     global current_reservation_status
-    data = msg.payload.decode("utf-8")
-
-    if data in statuses:
+    data = parse_status(msg.payload)
 
+    if data in statuses and data != current_reservation_status:
         current_reservation_status = data
+        save_cached_status(data)
         print(data)
-    
+
 
 def on_connect(cl, userdata, flags, reason_code, prop):
-    
+    global connected
     print(f"connected with res code {reason_code}")
-    client.subscribe(booking_stat_topic, 2)
-    
+    if reason_code != 0:
+        return
+    client.subscribe(booking_stat_topic, 1)
+    with outbox_lock:
+        queued = len(outbox)
+    if queued:
+        print(f"replaying {queued} queued message(s)")
+    connected = True  # the sensor loop flushes the outbox on its next tick
+
+
+def on_disconnect(cl, userdata, flags, reason_code, prop):
+    global connected
+    connected = False
+    # unacked messages stay in paho's queue and are resent on reconnect
+    print(f"disconnected ({reason_code}), will keep retrying")
+
 
 client = mqtt.Client(CallbackAPIVersion.VERSION2)
 client.on_connect = on_connect
+client.on_disconnect = on_disconnect
 client.on_message = on_message
+client.max_queued_messages_set(OUTBOX_MAX)
 
-client.tls_set()
+if port == 8883:
+    client.tls_set()
 
 client.username_pw_set(username, password)
+client.reconnect_delay_set(min_delay=1, max_delay=30)
 
-client.connect(host, port, keep_alive)
+# connect_async + loop_start: paho's own thread does the network I/O and the
+# reconnecting, so the sensor loop below never blocks on the broker
+client.connect_async(host, port, keep_alive)
+client.loop_start()
 
-print("Hello world AAAAAAAAAAAAAAA!")
+print(f"seat {device_id} starting, cached status: {current_reservation_status}")
 
-last_detected = False
+samples = collections.deque(maxlen=DETECT_SENSITIVITY_COUNT)
+last_detected = None
+next_sample_at = time.monotonic()
+last_display_at = 0.0
+last_display_status = None
 
 
 def send_checkin_code(code):
     print(code)
-    client.publish(check_in_topic, code)
+    if PROTOCOL == "binary" and not (len(code) == 4 and code.isdigit()):
+        print("pin must be 4 digits")
+        return
+    enqueue(check_in_topic, checkin_payload(code))
 
 Bridge.provide("sendCheckInCode", send_checkin_code)
 
+
+def read_detected():
+    """Median of the last DETECT_SENSITIVITY_COUNT distance readings, so a
+    single bad IR sample can't flip the seat state."""
+    samples.append(Bridge.call("distInCm"))
+    if len(samples) < DETECT_SENSITIVITY_COUNT:
+        return None
+    return statistics.median(samples) <= detect_distance
+
+
 def loop():
-    global current_reservation_status, last_detected
     """This function is called repeatedly by the App framework."""
-    # You can replace this with any code you want your App to run repeatedly.
-    
-    # time.sleep(1)
-    client.loop()
-    
-    Bridge.notify("updateDisplay", current_reservation_status)
-
-    detected = Bridge.call("distInCm") <= detect_distance
-    
-    if last_detected != detected:
+    global last_detected, next_sample_at, last_display_at, last_display_status
+
+    # fixed-rate sampling: sleep until the next tick instead of spinning
+    now = time.monotonic()
+    if now < next_sample_at:
+        time.sleep(next_sample_at - now)
+    next_sample_at = max(next_sample_at + SAMPLE_INTERVAL, time.monotonic())
+
+    status = current_reservation_status
+    if status != last_display_status or now - last_display_at >= DISPLAY_REFRESH_INTERVAL:
+        Bridge.notify("updateDisplay", status)
+        last_display_status = status
+        last_display_at = now
+
+    detected = read_detected()
+    if detected is not None and last_detected != detected:
         print("occupied!" if detected else "free!")
-        client.publish(detect_stat_topic, "occupied" if detected else "free")
-    last_detected = detected
+        enqueue(detect_stat_topic, ir_payload(detected))
+        last_detected = detected
 
-    
+    flush_outbox()
 
 
 # See: https://docs.arduino.cc/software/app-lab/tutorials/getting-started/#app-run
@@ -0,0 +1,76 @@
+"""Stand-in for arduino.app_utils so main.py runs on a Linux box.
+
+    cd hardware/python
+    python main.py            # picks this module up when arduino.app_utils is missing
+
+The simulated desk alternates between empty and occupied every
+SIM_PHASE_SECONDS, with sensor noise and the odd bogus spike so the median
+filter in main.py has something to do. Type a PIN on stdin and press enter to
+simulate the keypad.
+"""
+import os
+import random
+import threading
+import time
+
+SIM_PHASE_SECONDS = float(os.environ.get("SIM_PHASE_SECONDS", "20"))
+SIM_SEED = os.environ.get("SIM_SEED")
+
+_rng = random.Random(SIM_SEED)
+
+
+class Bridge:
+    _provided = {}
+    _started = time.monotonic()
+    _display = None
+
+    @classmethod
+    def provide(cls, name, fn):
+        cls._provided[name] = fn
+
+    @classmethod
+    def notify(cls, name, *args):
+        if name == "updateDisplay":
+            if args[0] != cls._display:
+                cls._display = args[0]
+                print(f"[sim] display -> {args[0]}")
+        else:
+            print(f"[sim] notify {name} {args}")
+
+    @classmethod
+    def call(cls, name, *args):
+        if name == "distInCm":
+            return cls._distance()
+        raise KeyError(f"sim bridge has no method {name!r}")
+
+    @classmethod
+    def _distance(cls):
+        phase = int((time.monotonic() - cls._started) / SIM_PHASE_SECONDS)
+        seated = phase % 2 == 1
+        if _rng.random() < 0.05:
+            # IR sensors occasionally return a wild reading; one sample must not flip state
+            return _rng.choice((5, 400))
+        base = 35 if seated else 150
+        return max(0, base + _rng.gauss(0, 8))
+
+
+def _keypad():
+    try:
+        while True:
+            code = input().strip()
+            fn = Bridge._provided.get("sendCheckInCode")
+            if code and fn:
+                fn(code)
+    except EOFError:
+        pass
+
+
+class App:
+    @staticmethod
+    def run(user_loop):
+        threading.Thread(target=_keypad, daemon=True).start()
+        try:
+            while True:
+                user_loop()
+        except KeyboardInterrupt:
+            pass